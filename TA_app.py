@@ -10,6 +10,13 @@ Use the sidebar to navigate through:
 - Portfolio dashboard
 - CRREM stranding analysis
 - Transition planning
+- Portfolio transition optimization under a CapEx budget
 - Stakeholder insights
 - AI-based ESG summaries
 """)
+
+# Timings, counters and cache statistics; intentionally not listed in the navigation
+if st.query_params.get("diagnostics") == "1":
+    from backend.utils.diagnostics import render_diagnostics
+
+    render_diagnostics()
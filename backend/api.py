@@ -0,0 +1,177 @@
+"""
+Headless entry points for the toolkit calculators.
+
+The functions here run the same calculators as the Streamlit pages
+(CRREM batch stranding, batch ROI and transition plans) on DataFrames or
+batch files, without importing streamlit or matplotlib:
+
+    from backend.api import run_file
+    run_file("assets.csv", "crrem", output_dir="results", fmt="parquet")
+
+See backend/cli.py for the command-line wrapper.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from backend.calculators.crrem_batch import DEFAULT_CAPEX_PER_M2, DEFAULT_TENANT_RATIO, compute_batch_stranding
+from backend.calculators.pathways import load_pathway_grid
+from backend.calculators.roi import DEFAULT_HORIZON_YEARS, DEFAULT_PRICE_SCENARIO, compute_roi_batch
+from backend.calculators.transition import compute_transition_batch
+from backend.utils.exports import write_export
+from backend.utils.instrumentation import timed
+from backend.utils.parallel import ParallelExecutor
+from backend.utils.reference_data import load_reference
+from backend.utils.result_store import default_store
+
+INPUT_SUFFIXES = (".csv", ".parquet", ".xlsx", ".xls")
+OUTPUT_FORMATS = ("parquet", "csv", "json", "ndjson", "xlsx")
+
+
+def run_crrem(df: pd.DataFrame, tenant_ratio: float = DEFAULT_TENANT_RATIO,
+              capex_per_m2: float = DEFAULT_CAPEX_PER_M2, workers: int = 1) -> pd.DataFrame:
+    """
+    CRREM stranding for a batch of assets, as in the CRREM calculator's batch mode.
+    With workers > 1 the batch is partitioned over a process pool.
+    """
+    return ParallelExecutor(workers).map_partitions(
+        compute_batch_stranding, df, country_reference=load_reference("crrem_country_reference.csv"),
+        grid=load_pathway_grid(), tenant_ratio=tenant_ratio, capex_per_m2=capex_per_m2,
+    )
+
+
+def run_roi(df: pd.DataFrame, horizon_years: int = DEFAULT_HORIZON_YEARS,
+            scenario: str = DEFAULT_PRICE_SCENARIO, workers: int = 1) -> pd.DataFrame:
+    """
+    NPV, IRR, payback and ROI for a retrofit batch, as on the ROI page.
+    With workers > 1 the batch is partitioned over a process pool.
+    """
+    return ParallelExecutor(workers).map_partitions(compute_roi_batch, df, horizon_years=horizon_years,
+                                                    scenario=scenario)
+
+
+def run_transition(df: pd.DataFrame, workers: int = 1) -> pd.DataFrame:
+    """
+    Valuation uplift and CRREM compliance for a batch of transition plans.
+    With workers > 1 the batch is partitioned over a process pool.
+    """
+    return ParallelExecutor(workers).map_partitions(compute_transition_batch, df)
+
+
+ANALYSES = {
+    "crrem": run_crrem,
+    "roi": run_roi,
+    "transition": run_transition,
+}
+
+
+@timed("load", "read batch")
+def read_batch(path: str) -> pd.DataFrame:
+    """
+    Reads a batch file (CSV, Parquet or Excel) into a DataFrame.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def write_results(df: pd.DataFrame, path: str, fmt: str = None) -> str:
+    """
+    Streams results to a Parquet, CSV, JSON records, NDJSON or Excel file
+    (see exports.write_export); the format defaults to the file suffix.
+
+    Returns:
+        str: The path written.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as handle:
+        write_export(df, handle, fmt)
+    return path
+
+
+def expand_inputs(paths) -> list:
+    """
+    Lists the batch files to process: files as given, directories expanded
+    to their batch files (non-recursive, sorted by name).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(INPUT_SUFFIXES) and not name.startswith((".", "~$"))
+            ))
+        else:
+            files.append(path)
+    return files
+
+
+def run_file(path: str, analysis: str, output_dir: str = None, fmt: str = "csv", db: str = None, **options) -> dict:
+    """
+    Runs one analysis on one batch file and writes the results next to it
+    (or into output_dir) as '<name>_<analysis>_results.<fmt>'.
+
+    Args:
+        path (str): Batch file.
+        analysis (str): One of ANALYSES ('crrem', 'roi', 'transition').
+        output_dir (str): Directory for the results; defaults to the input's.
+        fmt (str): One of OUTPUT_FORMATS.
+        db (str): Result database file (see result_store); when given, the
+            results are also stored there as a run.
+        **options: Passed to the analysis (e.g. horizon_years for 'roi').
+
+    Returns:
+        dict: {'input', 'output', 'rows', 'errors', 'seconds', 'status',
+        'message', 'run_id'}; status is 'error' when the file could not be
+        processed, run_id is None unless db is given.
+    """
+    start = time.perf_counter()
+    summary = {"input": path, "output": None, "rows": 0, "errors": 0, "status": "error", "message": "", "run_id": None}
+    try:
+        results = ANALYSES[analysis](read_batch(path), **options)
+        name = os.path.splitext(os.path.basename(path))[0]
+        output = os.path.join(output_dir or os.path.dirname(path), f"{name}_{analysis}_results.{fmt}")
+        summary.update(
+            output=write_results(results, output, fmt),
+            rows=len(results),
+            errors=int(results["error"].notna().sum()),
+        )
+        if db:
+            parameters = {"input": path, **{key: value for key, value in options.items() if key != "workers"}}
+            summary["run_id"] = default_store(db).save_run(analysis, results, parameters=parameters,
+                                                           seconds=time.perf_counter() - start)
+        summary["status"] = "success"
+    except Exception as e:
+        summary["message"] = str(e)
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def run_paths(paths, analysis: str, output_dir: str = None, fmt: str = "csv", workers: int = 1, db: str = None,
+              **options) -> list:
+    """
+    Runs an analysis over files and directories, optionally in parallel.
+
+    Several files are processed one per worker process; a single file is
+    instead partitioned over the workers. Summaries are returned in input
+    order (see run_file).
+    """
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis: {analysis} (expected one of {', '.join(ANALYSES)})")
+    files = expand_inputs(paths)
+    if len(files) == 1:
+        return [run_file(files[0], analysis, output_dir=output_dir, fmt=fmt, db=db, workers=workers, **options)]
+    worker = partial(run_file, analysis=analysis, output_dir=output_dir, fmt=fmt, db=db, **options)
+    if workers and workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(worker, files))
+    return [worker(path) for path in files]
@@ -2,11 +2,24 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from io import BytesIO
+import sys
+
+# Allow running this script directly with `streamlit run backend/calculators/crrem.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from backend.calculators.crrem_batch import compute_batch_stranding, pathway_bands, RESULT_COLUMNS, RETROFIT_LEAD_YEARS
+from backend.calculators.pathways import load_pathway_grid, pathway_version, trajectory_stranding_years
+from backend.calculators.trajectories import EMISSION_FACTORS, FUEL_COLUMNS, carbon_trajectories, load_emission_factor_grid
+from backend.utils.charts import draw_pathway_bands, show_chart
+from backend.utils.downloads import download_buttons
+from backend.utils.exports import result_hash
+from backend.utils.incremental import IncrementalResults
+from backend.utils.job_panel import follow_job
+from backend.utils.jobs import JOB_MIN_ROWS, default_runner
+from backend.utils.parallel import PARALLEL_MIN_ROWS
+from backend.utils.reference_data import DATA_DIR, load_reference, lookup_index, reference_version, region_index
+from backend.utils.reference_keys import format_unresolved, unresolved_keys
+from backend.utils.result_store import default_store
 
-# File paths
-DATA_DIR = "data/"
 required_files = [
     "crrem_asset_classes.csv",
     "crrem_conversion_factors.csv",
@@ -24,30 +37,17 @@ if missing:
     st.error(f"Missing required data files: {missing}")
     st.stop()
 
-# Load data
-asset_classes = pd.read_csv(os.path.join(DATA_DIR, "crrem_asset_classes.csv"))
-conversion_factors = pd.read_csv(os.path.join(DATA_DIR, "crrem_conversion_factors.csv"))
-emission_factors = pd.read_csv(os.path.join(DATA_DIR, "crrem_emission_factors.csv"))
-country_codes = pd.read_csv(os.path.join(DATA_DIR, "crrem_country_codes.csv"))
-pathways = pd.read_csv(os.path.join(DATA_DIR, "crrem_pathways.csv"))
-time_horizon = pd.read_csv(os.path.join(DATA_DIR, "crrem_time_horizon.csv"))
-parameters_config = pd.read_csv(os.path.join(DATA_DIR, "crrem_parameters_config.csv"))
-country_reference = pd.read_csv(os.path.join(DATA_DIR, "crrem_country_reference.csv"))
-
-# Load archetype and EPC baseline datasets
-try:
-    archetypes = pd.read_excel(os.path.join(DATA_DIR, "Building_Archetypes_CRREM_Compatible.xlsx"))
-    epc_baselines = pd.read_excel(os.path.join(DATA_DIR, "Energy_Performance_Baselines_CRREM_Compatible.xlsx"))
-except Exception as e:
-    st.warning(f"Optional data missing: {e}")
-
-discount_rate = float(parameters_config[parameters_config['parameter'] == 'discount_rate']['default_value'].values[0])
-payback_threshold = float(parameters_config[parameters_config['parameter'] == 'payback_years_threshold']['default_value'].values[0])
-
+# Reference tables are loaded (once per process, shared across sessions) by
+# the mode that uses them, so the sidebar renders before any of them is read
 st.sidebar.header("Asset Inputs (Single or Batch)")
 mode = st.sidebar.radio("Mode", ["Single Asset", "Batch Upload"])
 
 if mode == "Single Asset":
+    asset_classes = load_reference("crrem_asset_classes.csv")
+    country_codes = load_reference("crrem_country_codes.csv")
+    parameters = lookup_index("crrem_parameters_config.csv", "parameter", "default_value")
+    payback_threshold = float(parameters['payback_years_threshold'])
+
     asset_class = st.sidebar.selectbox("Asset Class", asset_classes['asset_class'].unique())
     country_code = st.sidebar.selectbox("Country Code", country_codes['Code'].unique())
 
@@ -55,6 +55,7 @@ if mode == "Single Asset":
     st.sidebar.subheader("Autofill from Archetype")
     if st.sidebar.checkbox("Enable Auto-Fill Inputs"):
         try:
+            archetypes = load_reference("Building_Archetypes_CRREM_Compatible.xlsx")
             row = archetypes[(archetypes['country_code'] == country_code) & (archetypes['asset_class'] == asset_class)].iloc[0]
             floor_area = row['avg_floor_area']
             carbon_intensity = row['avg_carbon_intensity']
@@ -68,20 +69,39 @@ if mode == "Single Asset":
         carbon_intensity = st.sidebar.number_input("Current Carbon Intensity (kgCO2/m²)", min_value=0.0, value=85.0)
         floor_area = st.sidebar.number_input("Floor Area (m²)", min_value=1.0, value=1000.0)
 
+    # Annual energy use by fuel turns the intensity into a trajectory that follows grid decarbonization
+    with st.sidebar.expander("Energy Mix (kWh/yr, optional)"):
+        energy_mix = {fuel: st.number_input(fuel.replace("_", " ").title(), min_value=0.0, value=0.0)
+                      for fuel in FUEL_COLUMNS}
+        electricity_share = st.slider("Grid electricity share of emissions without a mix (%)",
+                                      min_value=0, max_value=100, value=0)
+
     capex = st.sidebar.number_input("CapEx (€)", min_value=0.0, value=250 * floor_area)
     tenant_ratio = st.sidebar.slider("Tenant Share (%)", min_value=0, max_value=100, value=30)
 
-    region = country_reference[country_reference['country_code'] == country_code]['crrem_region'].values[0]
-    target_pathway = pathways[(pathways['region_code'] == region) & (pathways['asset_class'] == asset_class)]
-    if target_pathway.empty:
+    grid = load_pathway_grid()
+    region = region_index().get(country_code)
+    curve_id = grid.curve_ids([region], [asset_class])[0]
+    if curve_id < 0:
         st.error("No pathway found for this asset/country combo.")
         st.stop()
 
-    year = target_pathway['year'].values[0]
-    target_intensity = target_pathway['target_carbon_intensity_kgco2m2'].values[0]
-    delta = carbon_intensity - target_intensity
-    stranding_year = year if delta > 0 else None
-    retrofit_year = year - 5 if stranding_year else None
+    years = grid.years
+    target = grid.flat_targets()[curve_id]
+    target_intensity = target[0]
+    has_mix = sum(energy_mix.values()) > 0
+    asset = pd.DataFrame([{
+        "country_code": country_code,
+        "floor_area": floor_area,
+        "carbon_intensity": carbon_intensity,
+        "electricity_share": electricity_share / 100,
+        **{FUEL_COLUMNS[fuel]: kwh if has_mix else np.nan for fuel, kwh in energy_mix.items()},
+    }])
+    actual = carbon_trajectories(asset, load_emission_factor_grid(years))["intensity"][0]
+    delta = actual[0] - target_intensity
+    crossing = trajectory_stranding_years(grid, [curve_id], actual[None])[0]
+    stranding_year = None if np.isnan(crossing) else int(crossing)
+    retrofit_year = max(stranding_year - RETROFIT_LEAD_YEARS, int(years[0])) if stranding_year else None
     advice = "Retrofit recommended" if capex > payback_threshold else "No immediate retrofit"
 
     st.subheader("Stranding Results")
@@ -97,64 +117,80 @@ if mode == "Single Asset":
         "Landlord Share (€)": capex * (1 - tenant_ratio / 100)
     })
 
-    years = np.arange(2020, 2050, 5)
-    actual = [carbon_intensity] * len(years)
-    target = [target_intensity] * len(years)
-    fig, ax = plt.subplots()
-    ax.plot(years, actual, '--o', label="Asset Intensity")
-    ax.plot(years, target, '-x', label="CRREM Target")
-    ax.set_title("Carbon Intensity vs Target")
-    ax.set_xlabel("Year")
-    ax.set_ylabel("kgCO2/m²")
-    ax.legend()
-    st.pyplot(fig)
+    def draw(fig):
+        ax = fig.subplots()
+        ax.plot(years, actual, '--', label="Asset Intensity (grid decarbonization)" if has_mix or electricity_share
+                else "Asset Intensity")
+        ax.plot(years, target, '-', label="CRREM Target")
+        if stranding_year:
+            ax.axvline(stranding_year, color="red", linestyle=":", label="Stranding Year")
+        ax.set_title("Carbon Intensity vs Target")
+        ax.set_xlabel("Year")
+        ax.set_ylabel("kgCO2/m²")
+        ax.legend()
+
+    # Redrawn only when the asset's inputs or the reference data change
+    show_chart("carbon vs target", (asset_class, country_code, carbon_intensity, floor_area, *energy_mix.values(),
+                                    electricity_share, pathway_version(), reference_version(EMISSION_FACTORS)), draw)
 
 else:
     st.subheader("Batch Processing")
     uploaded_file = st.file_uploader("Upload CSV with: asset_class, country_code, carbon_intensity, floor_area", type=["csv"])
+    st.caption(f"Optional: {', '.join(FUEL_COLUMNS.values())} (kWh/yr) or electricity_share (0-1) for "
+               "intensity trajectories that follow grid decarbonization.")
 
+    df_results = None
     if uploaded_file:
         df = pd.read_csv(uploaded_file)
-        results = []
-
-        for _, row in df.iterrows():
-            try:
-                region = country_reference[country_reference['country_code'] == row['country_code']]['crrem_region'].values[0]
-                target_pathway = pathways[(pathways['region_code'] == region) & (pathways['asset_class'] == row['asset_class'])]
-
-                if target_pathway.empty:
-                    raise ValueError("Missing pathway")
-
-                year = target_pathway['year'].values[0]
-                target_intensity = target_pathway['target_carbon_intensity_kgco2m2'].values[0]
-                delta = row['carbon_intensity'] - target_intensity
-                stranding_year = year if delta > 0 else None
-                retrofit_year = year - 5 if stranding_year else None
-                capex = row.get('capex', row['floor_area'] * 250)
-                tenant_share = capex * 0.3
-
-                results.append({
-                    **row,
-                    'stranding_year': stranding_year,
-                    'delta_to_target': delta,
-                    'recommended_retrofit_year': retrofit_year,
-                    'tenant_share': tenant_share,
-                    'landlord_share': capex - tenant_share
-                })
-            except Exception as e:
-                results.append({**row, 'error': str(e)})
-
-        df_results = pd.DataFrame(results)
+        unresolved = unresolved_keys(df)
+        if unresolved:
+            st.warning(format_unresolved(unresolved))
+        country_reference = load_reference("crrem_country_reference.csv")
+        version = tuple(reference_version(name) for name in
+                        ["crrem_country_reference.csv", "crrem_pathways.csv", "crrem_time_horizon.csv",
+                         EMISSION_FACTORS])
+        if len(df) >= JOB_MIN_ROWS:
+            # Large uploads run as a background job (kept across reruns and
+            # page changes), showing progress and rows as chunks finish
+            job_id = default_runner().submit(compute_batch_stranding, df, name="CRREM batch", key=version,
+                                             workers=None if len(df) >= PARALLEL_MIN_ROWS else 1,
+                                             country_reference=country_reference, grid=load_pathway_grid())
+            st.session_state["crrem_batch_job"] = (job_id, uploaded_file.name)
+        else:
+            # Rows unchanged since this session's previous batch reuse their results
+            st.session_state.pop("crrem_batch_job", None)
+            if "crrem_batch_results" not in st.session_state:
+                st.session_state["crrem_batch_results"] = IncrementalResults(compute_batch_stranding, RESULT_COLUMNS)
+            batch_results = st.session_state["crrem_batch_results"]
+            df_results = batch_results.update(df, version=version, country_reference=country_reference,
+                                              grid=load_pathway_grid())
+            report = batch_results.report
+            st.caption(f"{report['recomputed']:,} rows computed, {report['reused']:,} reused from the previous batch.")
+            input_name = uploaded_file.name
+
+    if "crrem_batch_job" in st.session_state:
+        job_id, input_name = st.session_state["crrem_batch_job"]
+        if not uploaded_file:
+            st.caption(f"Last background run: {input_name}")
+        df_results = follow_job(job_id, state_key="crrem_batch_job")
+
+    if df_results is not None:
         st.dataframe(df_results)
 
-        # Export buttons
-        excel_buffer = BytesIO()
-        df_results.to_excel(excel_buffer, index=False)
-        excel_buffer.seek(0)
-        st.download_button("Download as Excel", data=excel_buffer, file_name="crrem_batch_results.xlsx")
+        # Aggregated per pathway, so thousands of assets draw a few dozen lines
+        st.subheader("Portfolio Intensity vs CRREM Targets")
+        layout = st.radio("Layout", ["small multiples", "overlay"], horizontal=True, format_func=str.capitalize)
+        show_chart("pathway bands", (result_hash(df_results), layout, pathway_version(),
+                                     reference_version(EMISSION_FACTORS)),
+                   lambda fig: draw_pathway_bands(fig, pathway_bands(df_results, load_pathway_grid()), layout))
+
+        # Export buttons: files are rendered on click and cached per result
+        download_buttons(df_results, "crrem_batch_results", formats=("xlsx", "json", "ndjson", "parquet"),
+                         label="Download as")
 
-        json_data = df_results.to_json(orient="records", indent=2)
-        st.download_button("Download as JSON", data=json_data, file_name="crrem_batch_results.json")
+        if st.button("Save run to the local results database"):
+            run_id = default_store().save_run("crrem", df_results, parameters={"input": input_name})
+            st.success(f"Saved as run #{run_id}.")
 
 # -------------------- HTML Export Buttons --------------------
 
@@ -162,24 +198,12 @@ st.markdown("---")
 st.subheader("📤 Export Reports as HTML")
 
 # CRREM results to HTML
-if 'df_results' in locals():
-    html_crrem = df_results.to_html(index=False)
-    st.download_button(
-        label="📄 Download CRREM Results as HTML",
-        data=html_crrem,
-        file_name="crrem_results.html",
-        mime="text/html"
-    )
+if locals().get('df_results') is not None:
+    download_buttons(df_results, "crrem_results", formats=("html",), label="📄 Download CRREM Results as")
 
 # ROI results to HTML if available
 if 'roi_df' in locals():
-    html_roi = roi_df.to_html(index=False)
-    st.download_button(
-        label="📄 Download ROI Results as HTML",
-        data=html_roi,
-        file_name="roi_results.html",
-        mime="text/html"
-    )
+    download_buttons(roi_df, "roi_results", formats=("html",), label="📄 Download ROI Results as")
 
 # Transition plan summary (sample output)
 if 'asset_class' in locals() and 'stranding_year' in locals():
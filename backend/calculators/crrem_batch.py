@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+from backend.calculators.pathways import PathwayGrid, stranding_years, target_at, trajectory_stranding_years
+from backend.calculators.trajectories import (
+    FUEL_COLUMNS,
+    EmissionFactorGrid,
+    carbon_trajectories,
+    load_emission_factor_grid,
+)
+from backend.utils.columns import numeric_column
+from backend.utils.instrumentation import timed
+from backend.utils.reference_keys import asset_class_keys, country_keys
+
+REQUIRED_BATCH_COLUMNS = ["asset_class", "country_code", "carbon_intensity", "floor_area"]
+RESULT_COLUMNS = [
+    "stranding_year",
+    "delta_to_target",
+    "recommended_retrofit_year",
+    "tenant_share",
+    "landlord_share",
+    "error",
+]
+
+DEFAULT_CAPEX_PER_M2 = 250.0
+DEFAULT_TENANT_RATIO = 0.3
+RETROFIT_LEAD_YEARS = 5
+
+# Portfolio charts (pathway_bands)
+DEFAULT_BAND_PERCENTILES = (10, 50, 90)
+MAX_BAND_GROUPS = 12
+MAX_BAND_LINES = 20
+
+
+@timed("calculate", "crrem batch")
+def compute_batch_stranding(
+    df: pd.DataFrame,
+    country_reference: pd.DataFrame,
+    grid: PathwayGrid,
+    tenant_ratio: float = DEFAULT_TENANT_RATIO,
+    capex_per_m2: float = DEFAULT_CAPEX_PER_M2,
+    factors: EmissionFactorGrid = None,
+) -> pd.DataFrame:
+    """
+    Computes CRREM stranding results for a whole batch of assets at once.
+
+    Countries (ISO2/ISO3 codes, CRREM codes or names) and asset classes are
+    resolved to canonical keys (see reference_keys), regions are mapped over
+    the whole frame and each asset is matched to its annual pathway curve,
+    so the stranding year is the first year the asset's intensity exceeds
+    the target. When the batch has an energy mix (kWh per fuel, see
+    trajectories.FUEL_COLUMNS) or an 'electricity_share' column, the
+    intensity follows the asset's annual carbon trajectory under grid
+    decarbonization instead of staying constant. The delta is measured
+    against the target in the first year of the horizon. Rows that cannot
+    be evaluated keep their inputs and get a message in the 'error' column;
+    all result columns are NaN for those rows.
+
+    Args:
+        df (DataFrame): Batch with asset_class, country_code, carbon_intensity
+            (optional for rows with an energy mix), floor_area and optionally
+            capex, kWh per fuel and electricity_share.
+        country_reference (DataFrame): crrem_country_reference.csv contents.
+        grid (PathwayGrid): Annual pathway curves (see load_pathway_grid).
+        tenant_ratio (float): Share of CapEx borne by the tenant.
+        capex_per_m2 (float): CapEx assumption used when no 'capex' column is given.
+        factors (EmissionFactorGrid): Emission factors for the trajectories;
+            loaded for the grid's years when needed and not given.
+
+    Raises:
+        ValueError: If `factors` does not cover the same years as `grid`.
+
+    Returns:
+        DataFrame: Input columns followed by RESULT_COLUMNS, in input row order.
+    """
+    out = df.copy()
+    n = len(df)
+
+    mix_columns = [col for col in FUEL_COLUMNS.values() if col in df.columns]
+    required = [col for col in REQUIRED_BATCH_COLUMNS if not (mix_columns and col == "carbon_intensity")]
+    missing_cols = [col for col in required if col not in df.columns]
+    if missing_cols:
+        for col in RESULT_COLUMNS[:-1]:
+            out[col] = np.nan
+        out["error"] = f"Missing columns: {', '.join(missing_cols)}"
+        return out
+
+    # Countries and asset classes in any known spelling are resolved to canonical
+    # keys on both sides; the first matching reference row wins
+    keys = country_keys()
+    country = keys.resolve(df["country_code"])
+    reference_codes = keys.resolve(country_reference["country_code"]).fillna(country_reference["country_code"])
+    regions = pd.Series(country_reference["crrem_region"].to_numpy(), index=reference_codes.to_numpy())
+    region = country.map(regions[~regions.index.duplicated()]).to_numpy()
+    asset_class = asset_class_keys().resolve(df["asset_class"]).fillna(df["asset_class"].astype(object))
+
+    curve_ids = grid.curve_ids(region, asset_class.to_numpy())
+    target_intensity = target_at(grid, curve_ids, grid.years[0])
+
+    if mix_columns or "electricity_share" in df.columns:
+        if factors is None:
+            factors = load_emission_factor_grid(grid.years)
+        elif not np.array_equal(factors.years, grid.years):
+            raise ValueError("Emission factors must cover the pathway grid's years")
+        trajectories = carbon_trajectories(df, factors)
+        intensity_error = trajectories["error"]
+        carbon_intensity = trajectories["intensity"][:, 0]
+    else:
+        trajectories = None
+        carbon_intensity, bad_intensity = numeric_column(df, "carbon_intensity")
+        intensity_error = np.where(bad_intensity, "Invalid carbon_intensity", None)
+    if "capex" in df.columns:
+        capex, bad_capex = numeric_column(df, "capex")
+    else:
+        floor_area, bad_capex = numeric_column(df, "floor_area")
+        capex = floor_area * capex_per_m2
+
+    error = np.full(n, None, dtype=object)
+    error[bad_capex] = "Invalid capex or floor_area"
+    error[intensity_error != None] = intensity_error[intensity_error != None]  # noqa: E711
+    error[curve_ids < 0] = "Missing pathway"
+    error[pd.isna(region)] = "Missing region"
+    error[country.isna().to_numpy()] = "Unknown country_code"
+    failed = error != None  # noqa: E711 - elementwise comparison on object array
+
+    delta = carbon_intensity - target_intensity
+    if trajectories is None:
+        stranding_year = stranding_years(grid, curve_ids, carbon_intensity)
+    else:
+        stranding_year = trajectory_stranding_years(grid, curve_ids, trajectories["intensity"])
+    # Assets already stranded in the first pathway year are due a retrofit then, not in the past
+    retrofit_year = np.maximum(stranding_year - RETROFIT_LEAD_YEARS, grid.years[0])
+    tenant_share = capex * tenant_ratio
+    landlord_share = capex - tenant_share
+
+    results = {
+        "stranding_year": stranding_year,
+        "delta_to_target": delta,
+        "recommended_retrofit_year": retrofit_year,
+        "tenant_share": tenant_share,
+        "landlord_share": landlord_share,
+    }
+    for col, values in results.items():
+        out[col] = np.where(failed, np.nan, values)
+    out["error"] = error
+    return out
+
+
+@timed("calculate", "pathway bands")
+def pathway_bands(
+    df: pd.DataFrame,
+    grid: PathwayGrid,
+    factors: EmissionFactorGrid = None,
+    percentiles=DEFAULT_BAND_PERCENTILES,
+    max_groups: int = MAX_BAND_GROUPS,
+    max_lines: int = MAX_BAND_LINES,
+) -> dict:
+    """
+    Summarizes a batch's carbon intensity against its CRREM targets per pathway, for portfolio charts.
+
+    Assets are grouped by pathway (region and asset class). Each group keeps
+    the percentiles of its assets' annual intensity, its target curve and up
+    to `max_lines` evenly spaced asset curves, so a chart of thousands of
+    assets draws a few dozen lines. Intensities follow the carbon
+    trajectories when the batch has an energy mix or 'electricity_share'
+    (as in compute_batch_stranding) and are constant otherwise. Rows without
+    a pathway or intensity, or with an 'error' (e.g. a results frame), are
+    left out.
+
+    Args:
+        df (DataFrame): Batch (or compute_batch_stranding results) with
+            asset_class, country_code and carbon_intensity or an energy mix.
+        grid (PathwayGrid): Annual pathway curves (see load_pathway_grid).
+        factors (EmissionFactorGrid): Emission factors for the trajectories;
+            loaded for the grid's years when needed and not given.
+        percentiles: Percentiles of the intensity bands, ascending.
+        max_groups (int): Largest pathways (by asset count) kept.
+        max_lines (int): Asset curves kept per pathway.
+
+    Returns:
+        dict: {'years': ndarray (year,), 'labels': [(region, asset_class)]
+        per group, largest first; 'counts': assets per group; 'targets':
+        ndarray (group, year); 'bands': ndarray (group, percentile, year);
+        'lines': [ndarray (line, year)] per group; 'percentiles'; 'assets':
+        assets summarized; 'pathways': pathways in the batch}
+    """
+    years = grid.years
+    curve_ids = grid.asset_curve_ids(df["country_code"], df["asset_class"])
+    mix_columns = [col for col in FUEL_COLUMNS.values() if col in df.columns]
+    if mix_columns or "electricity_share" in df.columns:
+        trajectories = carbon_trajectories(df, factors if factors is not None else load_emission_factor_grid(years))
+        intensity = trajectories["intensity"]
+        first_year = intensity[:, 0]
+    else:
+        intensity = None
+        first_year, _ = numeric_column(df, "carbon_intensity")
+
+    keep = (curve_ids >= 0) & ~np.isnan(first_year)
+    if "error" in df.columns:
+        keep &= df["error"].isna().to_numpy()
+    kept = np.nonzero(keep)[0]
+    ids, counts = np.unique(curve_ids[kept], return_counts=True)
+    largest = np.argsort(-counts, kind="stable")[:max_groups]
+    rows_by_curve = pd.Series(kept).groupby(curve_ids[kept]).indices
+
+    labels, targets, bands, lines = [], [], [], []
+    n_classes = len(grid.asset_classes)
+    for curve_id in ids[largest]:
+        rows = kept[rows_by_curve[curve_id]]
+        picked = rows[np.unique(np.linspace(0, len(rows) - 1, min(max_lines, len(rows))).astype(int))]
+        if intensity is None:
+            # Constant intensities: flat bands and lines
+            levels = np.percentile(first_year[rows], percentiles)
+            bands.append(np.repeat(levels[:, None], len(years), axis=1))
+            lines.append(np.repeat(first_year[picked, None], len(years), axis=1))
+        else:
+            bands.append(np.percentile(intensity[rows], percentiles, axis=0))
+            lines.append(intensity[picked])
+        labels.append((grid.regions[curve_id // n_classes], grid.asset_classes[curve_id % n_classes]))
+        targets.append(grid.flat_targets()[curve_id])
+
+    return {
+        "years": years,
+        "labels": labels,
+        "counts": counts[largest],
+        "targets": np.array(targets).reshape(len(labels), len(years)),
+        "bands": np.array(bands).reshape(len(labels), len(percentiles), len(years)),
+        "lines": lines,
+        "percentiles": tuple(percentiles),
+        "assets": int(keep.sum()),
+        "pathways": len(ids),
+    }
@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.file_validator import EPC_BANDS, EPC_DTYPE
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, reference_version
+from backend.utils.reference_keys import asset_class_keys, country_keys
+
+EPC_BASELINES = "Energy_Performance_Baselines_CRREM_ALL_COUNTRIES.xlsx"
+THRESHOLD_COLUMNS = [f"{band}_max" for band in EPC_BANDS]
+
+# Columns of an assets portfolio used for the baseline lookup, first one present wins
+COUNTRY_COLUMNS = ["country_code", "Location"]
+ASSET_CLASS_COLUMNS = ["asset_class", "Property Type"]
+
+# Estimated stranding year of an asset by the EPC band its carbon intensity falls in
+STRANDING_YEAR_BY_BAND = {"G": 2025, "F": 2030}
+DEFAULT_STRANDING_YEAR = 2040
+
+
+@dataclass(frozen=True)
+class EPCThresholds:
+    """
+    Upper carbon-intensity limits of the EPC bands per country and asset class.
+
+    Attributes:
+        countries (tuple): Baseline country codes, first axis of `limits`.
+        asset_classes (tuple): Asset classes, second axis of `limits`.
+        limits (ndarray): Non-decreasing A..G upper limits (kgCO2/m²) shaped
+            (country + 1, asset_class + 1, band). The extra last country and
+            asset class hold the fallbacks: the mean over the country's
+            asset classes, over countries for the asset class, or overall.
+        exact (ndarray): Whether (country, asset_class) has its own baseline.
+    """
+
+    countries: tuple
+    asset_classes: tuple
+    limits: np.ndarray
+    exact: np.ndarray
+
+    def table_ids(self, countries, asset_classes) -> tuple:
+        """
+        Maps country/asset-class pairs to flat ids into limits.reshape(-1, 7).
+
+        Countries (ISO2/ISO3 codes, CRREM codes or names) and asset classes
+        are resolved to canonical keys first (see reference_keys), so 'GB',
+        'GBR' and 'United Kingdom' all use the 'UK' baseline; unknown
+        countries or asset classes use the fallback limits.
+
+        Returns:
+            tuple: (ids ndarray, bool ndarray, True where an exact baseline exists)
+        """
+        # resolved per distinct value, then broadcast through the factorized codes
+        country_codes, country_values = pd.factorize(_as_series(countries))
+        country_values = pd.Series(np.asarray(country_values, dtype=object))
+        country_values = country_keys().resolve(country_values).fillna(country_values)
+        country_pos = _positions(self.countries, country_values, country_codes)
+        class_codes, class_values = pd.factorize(_as_series(asset_classes))
+        class_values = pd.Series(np.asarray(class_values, dtype=object))
+        class_values = asset_class_keys().resolve(class_values).fillna(class_values)
+        class_pos = _positions(self.asset_classes, class_values, class_codes)
+        exact = (country_pos >= 0) & (class_pos >= 0)
+        exact[exact] = self.exact[country_pos[exact], class_pos[exact]]
+        country_pos = np.where(country_pos < 0, len(self.countries), country_pos)
+        class_pos = np.where(class_pos < 0, len(self.asset_classes), class_pos)
+        return country_pos * (len(self.asset_classes) + 1) + class_pos, exact
+
+    def classify(self, intensities, countries, asset_classes) -> pd.Categorical:
+        """
+        Assigns EPC bands to many assets at once.
+
+        An asset falls in the first band whose upper limit its intensity does
+        not exceed; intensities above the G limit count as G. All baselines
+        are laid out in one sorted array (each offset into its own value
+        range), so a single np.searchsorted classifies the whole portfolio.
+
+        Args:
+            intensities (array): Carbon intensity per asset (kgCO2/m²).
+            countries (array): Country code or name per asset.
+            asset_classes (array): Asset class per asset.
+
+        Returns:
+            Categorical: Ordered EPC bands (EPC_DTYPE); missing where the
+            intensity is missing.
+        """
+        ids, _ = self.table_ids(countries, asset_classes)
+        return pd.Categorical.from_codes(self.classify_ids(intensities, ids), dtype=EPC_DTYPE)
+
+    def classify_ids(self, intensities, ids) -> np.ndarray:
+        """
+        Band codes (0 = A .. 6 = G, -1 for missing intensities) for intensities
+        of any shape, given table ids from table_ids() broadcastable to them.
+        """
+        intensities = np.asarray(intensities, dtype=float)
+        ids = np.broadcast_to(ids, intensities.shape)
+        n_bands = len(EPC_BANDS)
+        limits = self.limits.reshape(-1, n_bands)
+        low, high = np.nanmin(limits) - 1, np.nanmax(limits) + 1
+        span = high - low + 1
+        # table t occupies [t * span, (t + 1) * span); clipping keeps values inside it
+        keys = (np.arange(len(limits)) * span)[:, None] + (limits - low)
+        queries = ids * span + (np.clip(intensities, low, high) - low)
+        positions = np.searchsorted(keys.ravel(), queries, side="left") - ids * n_bands
+        codes = np.minimum(positions, n_bands - 1).astype(np.int8)
+        codes[np.isnan(intensities)] = -1
+        return codes
+
+
+def _as_series(values) -> pd.Series:
+    # Series (e.g. categorical portfolio columns) are factorized as they are
+    return values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+
+
+def _positions(labels: tuple, values, codes: np.ndarray) -> np.ndarray:
+    # positions of factorized values in labels; -1 for unknown or missing values
+    found = np.append(pd.Index(labels).get_indexer(pd.Index(values)), -1)
+    return found[codes]
+
+
+def build_epc_thresholds(baselines: pd.DataFrame) -> EPCThresholds:
+    """
+    Builds the threshold arrays from the baseline table.
+
+    Limits are made non-decreasing across bands (a running maximum) so each
+    row is a valid search array; missing pairs take the fallback limits.
+
+    Args:
+        baselines (DataFrame): Energy_Performance_Baselines contents
+            (country_code, asset_class, A_max..G_max).
+
+    Returns:
+        EPCThresholds
+    """
+    rows = baselines.dropna(subset=["country_code", "asset_class"]).drop_duplicates(["country_code", "asset_class"])
+    countries = tuple(sorted(rows["country_code"].unique()))
+    asset_classes = tuple(sorted(rows["asset_class"].unique()))
+    grid = np.full((len(countries), len(asset_classes), len(EPC_BANDS)), np.nan)
+    country_pos = pd.Index(countries).get_indexer(rows["country_code"])
+    class_pos = pd.Index(asset_classes).get_indexer(rows["asset_class"])
+    grid[country_pos, class_pos] = rows[THRESHOLD_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    exact = ~np.isnan(grid).any(axis=2)
+
+    known = np.where(exact[:, :, None], grid, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):  # no baselines at all -> NaN
+        by_country = known.sum(axis=1) / exact.sum(axis=1)[:, None]
+        by_class = known.sum(axis=0) / exact.sum(axis=0)[:, None]
+        overall = known.sum(axis=(0, 1)) / exact.sum()
+    by_country = np.where(np.isnan(by_country), overall, by_country)
+    by_class = np.where(np.isnan(by_class), overall, by_class)
+
+    limits = np.empty((len(countries) + 1, len(asset_classes) + 1, len(EPC_BANDS)))
+    limits[:-1, :-1] = np.where(exact[:, :, None], grid, by_country[:, None, :])
+    limits[:-1, -1] = by_country
+    limits[-1, :-1] = by_class
+    limits[-1, -1] = overall
+    return EPCThresholds(countries, asset_classes, np.fmax.accumulate(limits, axis=2), exact)
+
+
+_thresholds_cache = {}
+
+
+def epc_version() -> tuple:
+    """
+    Returns the version of the reference files the EPC inference depends on.
+    """
+    return reference_version(EPC_BASELINES), reference_version("crrem_country_codes.csv")
+
+
+def load_epc_thresholds() -> EPCThresholds:
+    """
+    Builds the EPC thresholds from data/Energy_Performance_Baselines_CRREM_ALL_COUNTRIES.xlsx,
+    cached until the file (or the country code list) changes.
+    """
+    version = epc_version()
+    cached = _thresholds_cache.get("thresholds")
+    if cached is None or cached[0] != version:
+        _thresholds_cache["thresholds"] = cached = (version, build_epc_thresholds(load_reference(EPC_BASELINES)))
+    return cached[1]
+
+
+@timed("calculate", "epc inference")
+def infer_epc_bands(df: pd.DataFrame, intensity_column: str = "Carbon Intensity (kgCO2e/m²)") -> pd.Categorical:
+    """
+    Classifies every asset of a portfolio from its carbon intensity.
+
+    The baseline is chosen from the first of COUNTRY_COLUMNS and
+    ASSET_CLASS_COLUMNS present; without them the fallback limits apply.
+    """
+    def column(candidates):
+        name = next((col for col in candidates if col in df.columns), None)
+        return df[name].reset_index(drop=True) if name else np.full(len(df), None, dtype=object)
+
+    intensities = pd.to_numeric(df[intensity_column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return load_epc_thresholds().classify(intensities, column(COUNTRY_COLUMNS), column(ASSET_CLASS_COLUMNS))
+
+
+def estimated_stranding_year(bands) -> np.ndarray:
+    """
+    Maps EPC bands to STRANDING_YEAR_BY_BAND (DEFAULT_STRANDING_YEAR otherwise).
+    """
+    bands = pd.Series(pd.Categorical(bands, dtype=EPC_DTYPE))
+    return bands.map(STRANDING_YEAR_BY_BAND).fillna(DEFAULT_STRANDING_YEAR).to_numpy(dtype=np.int64)
@@ -0,0 +1,375 @@
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from backend.calculators.epc import load_epc_thresholds
+from backend.calculators.pathways import PathwayGrid, load_pathway_grid
+from backend.calculators.roi import discount_rates
+from backend.utils.columns import numeric_column
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, lookup_index, tariff_index
+from backend.utils.reference_keys import asset_class_keys, canonical_countries, country_keys, country_names
+
+REQUIRED_OPTIMIZER_COLUMNS = ["country_code", "asset_class", "floor_area", "carbon_intensity", "asset_value"]
+# Optional: 'asset' (name used in the plan's actions, else the row label),
+# 'energy_kwh' (annual consumption, for energy cost savings) and
+# 'typology' (Technical_Systems typology, to skip measures that do not apply)
+ASSET_RESULT_COLUMNS = [
+    "measures",
+    "capex_eur",
+    "post_intensity",
+    "stranded_years_before",
+    "stranded_years_after",
+    "npv_eur",
+    "valuation_uplift_eur",
+    "error",
+]
+OBJECTIVES = ["stranded_years", "value"]
+
+RETROFIT_COSTS = "Retrofit_Costs_CRREM_Compatible.xlsx"
+TECHNICAL_SYSTEMS = "Technical_Systems_CRREM_Compatible.xlsx"
+VALUATION_IMPACTS = "ESG_Valuation_Impacts_CRREM_Compatible.xlsx"
+COST_ESCALATION = "Cost_Escalation_Factors_CRREM_Compatible.xlsx"
+
+DEFAULT_DISCOUNT_RATE = 0.05
+# Used when a country has no electricity tariff (EUR/kWh)
+DEFAULT_ENERGY_PRICE = 0.25
+# Asset value assumed per m² when a portfolio has no value column (EUR/m²)
+DEFAULT_VALUE_PER_M2 = 3000.0
+
+# Measures that only apply to an existing system: {technology: (system column, installed system containing)}
+REQUIRES_SYSTEM = {
+    "Boiler Replacement (Condensing Gas)": ("Heating", "Gas Boiler"),
+    "Chiller Upgrade": ("Cooling", ""),
+    "Heat Pump (Cooling)": ("Cooling", ""),
+}
+# Measures already in place when the system column contains the given text
+ALREADY_INSTALLED = {
+    "Heat Pump (Air Source)": ("Heating", "Heat Pump"),
+    "LED Lighting": ("Lighting", "LED"),
+    "PV Panels": ("Renewables", "PV"),
+    "Solar Thermal Hot Water": ("Renewables", "Solar Thermal"),
+}
+# EPC bands earning the green premium, and bands carrying the brown discount
+GREEN_BANDS = 1  # A..B
+BROWN_BANDS = 5  # F..G
+
+
+def load_measures() -> pd.DataFrame:
+    """
+    Returns the retrofit measures of Retrofit_Costs_CRREM_Compatible.xlsx as
+    'technology', 'category', 'cost_per_m2' (EUR), 'energy_savings'
+    (fraction) and 'co2_reduction' (kgCO2/m²/year).
+    """
+    costs = load_reference(RETROFIT_COSTS)
+    measures = pd.DataFrame({
+        "technology": costs["Technology"].astype(object),
+        "category": costs["Retrofit Category"].astype(object),
+        "cost_per_m2": pd.to_numeric(costs["Cost per m² (EUR)"], errors="coerce"),
+        "energy_savings": pd.to_numeric(costs["Energy Savings (%)"], errors="coerce") / 100,
+        "co2_reduction": pd.to_numeric(costs["CO2 Reduction Potential (kgCO2/m²/year)"], errors="coerce"),
+    })
+    return measures.dropna().reset_index(drop=True)
+
+
+def _applicability(typologies: pd.Series, measures: pd.DataFrame) -> np.ndarray:
+    # (asset, measure) mask from each typology's installed systems; unknown typologies allow every measure
+    systems = load_reference(TECHNICAL_SYSTEMS).drop_duplicates("Typology").set_index("Typology")
+    codes, uniques = pd.factorize(typologies)
+    allowed = np.ones((len(uniques) + 1, len(measures)), dtype=bool)
+    for row, typology in enumerate(uniques):
+        if typology not in systems.index:
+            continue
+        installed = systems.loc[typology]
+        for col, technology in enumerate(measures["technology"]):
+            if technology in REQUIRES_SYSTEM:
+                system, text = REQUIRES_SYSTEM[technology]
+                allowed[row, col] &= pd.notna(installed[system]) and text in str(installed[system])
+            if technology in ALREADY_INSTALLED:
+                system, text = ALREADY_INSTALLED[technology]
+                allowed[row, col] &= not (pd.notna(installed[system]) and text in str(installed[system]))
+    return allowed[np.where(codes >= 0, codes, len(uniques))]
+
+
+def _escalation(countries: pd.Series, years: np.ndarray) -> tuple:
+    # (asset, year) CapEx escalation: mean of the country's cost categories, 1.0 where the
+    # table has no such country; also returns the mask of those assets
+    factors = load_reference(COST_ESCALATION)
+    year_columns = [col for col in factors.columns if str(col).isdigit()]
+    table = factors.groupby("Country")[year_columns].mean()
+    table.columns = [int(col) for col in year_columns]
+    table = table.reindex(columns=range(min(table.columns.min(), years[0]), max(table.columns.max(), years[-1]) + 1))
+    table = table.ffill(axis=1).bfill(axis=1)[list(years)]
+    escalation = country_keys().rekey(table).reindex(countries.to_numpy())
+    missing = escalation.isna().all(axis=1).to_numpy()
+    return escalation.fillna(1.0).to_numpy(dtype=float), missing
+
+
+def _valuation_rates(countries: pd.Series, asset_classes: pd.Series) -> tuple:
+    # (green premium, brown discount) as fractions per asset, 0 where no impact is known,
+    # and the mask of the assets without one
+    classes = asset_class_keys().resolve(asset_classes).fillna(asset_classes)
+    keys = pd.MultiIndex.from_arrays([countries.to_numpy(), classes.to_numpy(dtype=object)])
+    rates, missing = [], np.ones(len(keys), dtype=bool)
+    for column in ["Green_Premium_%", "Brown_Discount_%"]:
+        index = lookup_index(VALUATION_IMPACTS, ["Country", "Sector"], column)
+        values = asset_class_keys().rekey(country_keys().rekey(pd.Series(index, dtype=float)), level=1) \
+            .reindex(keys).to_numpy(dtype=float) if index else np.full(len(keys), np.nan)
+        missing &= np.isnan(values)
+        rates.append(np.nan_to_num(values) / 100)
+    return tuple(rates) + (missing,)
+
+
+def _energy_prices(names: pd.Series) -> np.ndarray:
+    tariffs = tariff_index()
+    prices = np.array([tariffs.get((name, "Electricity"), np.nan) for name in names], dtype=float)
+    return np.where(np.isnan(prices), DEFAULT_ENERGY_PRICE, prices)
+
+
+def assets_batch(assets: pd.DataFrame, value_per_m2: float = DEFAULT_VALUE_PER_M2) -> pd.DataFrame:
+    """
+    Maps a validated assets portfolio to the optimizer's columns.
+
+    Countries come from 'country_code' or 'Location' (country names are
+    turned into codes), asset classes from 'asset_class' or 'Property Type'.
+    Without an 'Asset Value (€)' column the value is floor area x value_per_m2.
+    """
+    def column(candidates, default=None):
+        name = next((col for col in candidates if col in assets.columns), None)
+        return assets[name].astype(object) if name else pd.Series(default, index=assets.index, dtype=object)
+
+    countries = column(["country_code", "Location"])
+    floor_area = pd.to_numeric(assets["Floor Area (m²)"], errors="coerce")
+    value = pd.to_numeric(column(["Asset Value (€)", "asset_value"]), errors="coerce")
+    return pd.DataFrame({
+        "asset": assets["Asset Name"].astype(object) if "Asset Name" in assets.columns else assets.index,
+        "country_code": canonical_countries(countries),
+        "asset_class": column(["asset_class", "Property Type"]),
+        "floor_area": floor_area,
+        "carbon_intensity": pd.to_numeric(assets["Carbon Intensity (kgCO2e/m²)"], errors="coerce"),
+        "asset_value": value.fillna(floor_area * value_per_m2),
+        "energy_kwh": pd.to_numeric(column(["Energy Consumption (kWh)"], 0.0), errors="coerce").fillna(0.0),
+        "typology": column(["typology", "Typology"]),
+    }, index=assets.index)
+
+
+@timed("calculate", "transition optimizer")
+def optimize_transition(
+    df: pd.DataFrame,
+    annual_budget,
+    objective: str = "stranded_years",
+    start_year: int = None,
+    end_year: int = None,
+    grid: PathwayGrid = None,
+    default_discount_rate: float = DEFAULT_DISCOUNT_RATE,
+) -> dict:
+    """
+    Chooses retrofit measures and their years for a portfolio under an
+    annual CapEx budget.
+
+    A greedy heuristic: years are planned in order; within a year every
+    asset's best remaining measure is scored for all assets at once, the
+    best-scoring measures are funded while the year's budget lasts, and the
+    scoring is repeated (with the assets' updated intensities) until nothing
+    more fits. At most one measure per retrofit category is applied to an
+    asset, and measures ruled out by the asset's technical systems are
+    skipped. Objectives:
+
+    - 'stranded_years': minimize years above the CRREM pathway; a measure
+      scores the stranded years it removes (partially closed gaps count
+      pro rata, so measures that only work together still get picked) per
+      EUR of CapEx.
+    - 'value': maximize NPV of the energy cost savings plus the valuation
+      uplift (green premium on reaching A/B, brown discount avoided on
+      leaving F/G, from ESG_Valuation_Impacts); a measure scores its net
+      present value per EUR of CapEx and is only funded if that is positive.
+
+    Carbon reductions add up (kgCO2/m² per year, floored at zero) and energy
+    savings compound; both apply from the retrofit year on. CapEx is
+    escalated with Cost_Escalation_Factors and counted against the budget
+    of its year in nominal EUR. Assets with an unknown country_code are
+    not planned and get an error.
+
+    Args:
+        df (DataFrame): Assets with REQUIRED_OPTIMIZER_COLUMNS (see also
+            assets_batch); optional 'asset', 'energy_kwh' and 'typology'.
+        annual_budget (float or sequence): CapEx budget per year (EUR), one
+            value for every year or one per year of the horizon.
+        objective (str): One of OBJECTIVES.
+        start_year (int): First year of the plan; defaults to this year.
+        end_year (int): Last year; defaults to the end of the pathways.
+        grid (PathwayGrid): Pathway curves; defaults to load_pathway_grid().
+        default_discount_rate (float): Used where the country has none.
+
+    Returns:
+        dict: {'actions': one row per funded measure ('asset', as in df's
+        'asset' column or else its row label, 'year', 'technology',
+        'category', 'capex_eur', 'co2_reduction', 'energy_savings'),
+        'assets': input columns plus ASSET_RESULT_COLUMNS, 'spend': CapEx
+        per year (Series), 'objective': {...totals},
+        'unmatched': {reference file: {country_code: assets}} of the assets
+        planned without cost escalation (1.0) or valuation impact (0),
+        'seconds': solve time}
+
+    Raises:
+        ValueError: If the objective is unknown or required columns are missing.
+    """
+    started = time.perf_counter()
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    grid = grid or load_pathway_grid()
+    start_year = int(start_year or date.today().year)
+    end_year = int(end_year or grid.years[-1])
+    years = np.arange(start_year, end_year + 1)
+    remaining = np.broadcast_to(np.asarray(annual_budget, dtype=float), years.shape).copy()
+    budget = remaining.copy()
+
+    out = df.copy()
+    missing_cols = [col for col in REQUIRED_OPTIMIZER_COLUMNS if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns: {', '.join(missing_cols)}")
+
+    error = np.full(len(df), None, dtype=object)
+    numbers = {}
+    for col in ["floor_area", "carbon_intensity", "asset_value"]:
+        numbers[col], invalid = numeric_column(df, col)
+        error[invalid | np.isnan(numbers[col])] = f"Invalid {col}"
+    error[numbers["floor_area"] <= 0] = "Invalid floor_area"
+    country = country_keys().resolve(df["country_code"])
+    error[country.isna().to_numpy()] = "Unknown country_code"
+    rows = np.nonzero(error == None)[0]  # noqa: E711 - elementwise comparison on object array
+    valid = df.iloc[rows]
+    n = len(rows)
+
+    measures = load_measures()
+    cost, savings, reduction = (measures[col].to_numpy(dtype=float) for col in ["cost_per_m2", "energy_savings", "co2_reduction"])
+    category_codes, categories = pd.factorize(measures["category"])
+
+    floor_area, base_intensity, asset_value = (numbers[col][rows] for col in ["floor_area", "carbon_intensity", "asset_value"])
+    energy = pd.to_numeric(valid["energy_kwh"], errors="coerce").fillna(0).to_numpy(dtype=float) \
+        if "energy_kwh" in valid.columns else np.zeros(n)
+    typologies = valid["typology"] if "typology" in valid.columns else pd.Series(None, index=valid.index, dtype=object)
+    allowed = _applicability(typologies, measures)
+
+    names = country_names(valid["country_code"])
+    price = _energy_prices(names)
+    rates = discount_rates(valid["country_code"], default_discount_rate)
+    discount = (1 + rates)[:, None] ** -(years - start_year)[None, :]
+    # PV factor of a constant annual amount from year position y to the end
+    annuity = discount[:, ::-1].cumsum(axis=1)[:, ::-1]
+    escalation, no_escalation = _escalation(country.iloc[rows], years)
+    asset_names = (df["asset"] if "asset" in df.columns else df.index.to_series()).to_numpy(dtype=object)[rows]
+    green, brown, no_valuation = _valuation_rates(country.iloc[rows], valid["asset_class"])
+    # Countries that got the defaults (no escalation, no valuation impact), reported with the plan
+    unmatched = {
+        file: valid["country_code"].astype(object)[missing].value_counts().to_dict()
+        for file, missing in [(COST_ESCALATION, no_escalation), (VALUATION_IMPACTS, no_valuation)] if missing.any()
+    }
+
+    curve_ids = grid.asset_curve_ids(valid["country_code"], valid["asset_class"])
+    year_pos = np.clip(years - grid.years[0], 0, len(grid.years) - 1)
+    targets = np.where((curve_ids >= 0)[:, None], grid.flat_targets()[np.maximum(curve_ids, 0)][:, year_pos], np.nan)
+    thresholds = load_epc_thresholds()
+    table_ids = thresholds.table_ids(valid["country_code"], valid["asset_class"])[0][:, None]
+
+    planned = np.zeros(n)                 # kgCO2/m² reduction in effect
+    retained = np.ones(n)                 # share of the original energy use left
+    taken = np.zeros((n, len(categories)), dtype=bool)
+    path = np.empty((n, len(years)))
+    npv = np.zeros(n)
+    uplift = np.zeros(n)
+    capex_total = np.zeros(n)
+    count = np.zeros(n, dtype=int)
+    actions = []
+
+    for y, year in enumerate(years):
+        while n and remaining[y] > 0:
+            intensity = np.maximum(base_intensity - planned, 0)
+            after = np.maximum(intensity[:, None] - reduction[None, :], 0)          # (asset, measure)
+            capex = cost[None, :] * floor_area[:, None] * escalation[:, y:y + 1]
+            capex_pv = capex * discount[:, y:y + 1]
+            savings_pv = (energy * retained * price * annuity[:, y])[:, None] * savings[None, :]
+            band_before = thresholds.classify_ids(intensity[:, None], table_ids)
+            band_after = thresholds.classify_ids(after, table_ids)
+            value_gain = asset_value[:, None] * discount[:, y:y + 1] * (
+                green[:, None] * ((band_after <= GREEN_BANDS) & (band_before > GREEN_BANDS))
+                + brown[:, None] * ((band_after < BROWN_BANDS) & (band_before >= BROWN_BANDS))
+            )
+            net = savings_pv + value_gain - capex_pv
+
+            if objective == "stranded_years":
+                gap = intensity[:, None] - targets[:, y:]                           # (asset, year)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    benefit = np.stack([np.where(gap > 0, np.minimum(cut / gap, 1), 0).sum(axis=1)
+                                        for cut in reduction], axis=1)
+                score = benefit / capex
+            else:
+                score = net / capex_pv
+            open_measure = allowed & ~taken[:, category_codes] & (capex <= remaining[y])
+            score = np.where(open_measure & (score > 0), score, -np.inf)
+
+            best = score.argmax(axis=1)
+            best_score = score[np.arange(n), best]
+            candidates = np.nonzero(best_score > -np.inf)[0]
+            if not len(candidates):
+                break
+            candidates = candidates[np.argsort(-best_score[candidates], kind="stable")]
+            chosen = best[candidates]
+            spend = capex[candidates, chosen]
+            fits = np.cumsum(spend) <= remaining[y]
+            candidates, chosen, spend = candidates[fits], chosen[fits], spend[fits]
+
+            remaining[y] -= spend.sum()
+            planned[candidates] += reduction[chosen]
+            retained[candidates] *= 1 - savings[chosen]
+            taken[candidates, category_codes[chosen]] = True
+            npv[candidates] += savings_pv[candidates, chosen] - capex_pv[candidates, chosen]
+            uplift[candidates] += value_gain[candidates, chosen]
+            capex_total[candidates] += spend
+            count[candidates] += 1
+            actions.append(pd.DataFrame({
+                "asset": asset_names[candidates],
+                "year": year,
+                "technology": measures["technology"].to_numpy()[chosen],
+                "category": measures["category"].to_numpy()[chosen],
+                "capex_eur": spend,
+                "co2_reduction": reduction[chosen],
+                "energy_savings": savings[chosen],
+            }))
+        path[:, y] = np.maximum(base_intensity - planned, 0)
+
+    stranded_before = (base_intensity[:, None] > targets).sum(axis=1)
+    stranded_after = (path > targets).sum(axis=1)
+    results = {
+        "measures": count,
+        "capex_eur": capex_total,
+        "post_intensity": path[:, -1] if len(years) else base_intensity,
+        "stranded_years_before": stranded_before,
+        "stranded_years_after": stranded_after,
+        "npv_eur": npv,
+        "valuation_uplift_eur": uplift,
+    }
+    for col, values in results.items():
+        full = np.full(len(df), np.nan)
+        full[rows] = values
+        out[col] = full
+    out["error"] = error
+
+    actions = pd.concat(actions, ignore_index=True) if actions else pd.DataFrame(
+        columns=["asset", "year", "technology", "category", "capex_eur", "co2_reduction", "energy_savings"])
+    return {
+        "actions": actions,
+        "assets": out,
+        "spend": pd.Series(budget - remaining, index=years, name="capex_eur"),
+        "objective": {
+            "stranded_years_before": int(stranded_before.sum()),
+            "stranded_years_after": int(stranded_after.sum()),
+            "npv_eur": float(npv.sum()),
+            "valuation_uplift_eur": float(uplift.sum()),
+            "capex_eur": float(capex_total.sum()),
+        },
+        "unmatched": unmatched,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.reference_data import load_reference, reference_version
+from backend.utils.reference_keys import asset_class_keys, country_keys
+
+
+@dataclass(frozen=True)
+class PathwayGrid:
+    """
+    Dense annual CRREM target curves.
+
+    Attributes:
+        regions (tuple): Region codes, first axis of `targets`.
+        asset_classes (tuple): Asset classes, second axis of `targets`.
+        years (ndarray): Annual years covered, third axis of `targets`.
+        targets (ndarray): Target intensities (kgCO2/m²) shaped
+            (region, asset_class, year); NaN where no pathway exists.
+    """
+
+    regions: tuple
+    asset_classes: tuple
+    years: np.ndarray
+    targets: np.ndarray
+
+    def curve_ids(self, regions, asset_classes) -> np.ndarray:
+        """
+        Maps region/asset-class pairs to flat curve ids; -1 when no pathway exists.
+        """
+        region_pos = pd.Index(self.regions).get_indexer(pd.Index(regions))
+        class_pos = pd.Index(self.asset_classes).get_indexer(pd.Index(asset_classes))
+        ids = region_pos * len(self.asset_classes) + class_pos
+        ids[(region_pos < 0) | (class_pos < 0)] = -1
+        valid = ids >= 0
+        ids[valid] = np.where(np.isnan(self.flat_targets()[ids[valid], 0]), -1, ids[valid])
+        return ids
+
+    def asset_curve_ids(self, countries, asset_classes) -> np.ndarray:
+        """
+        Maps assets to flat curve ids by country (code or name in any known
+        spelling, resolved to its CRREM region) and asset class (aliases
+        such as 'Apartments' resolved to the CRREM class); -1 when no pathway exists.
+        """
+        asset_classes = pd.Series(np.asarray(asset_classes, dtype=object))
+        return self.curve_ids(country_keys().resolve(countries, to="region").to_numpy(),
+                              asset_class_keys().resolve(asset_classes).fillna(asset_classes).to_numpy())
+
+    def flat_targets(self) -> np.ndarray:
+        """
+        Returns targets reshaped to (curve_id, year).
+        """
+        return self.targets.reshape(-1, len(self.years))
+
+    def curve(self, region: str, asset_class: str):
+        """
+        Returns the annual target curve for one pathway, or None if missing.
+        """
+        curve_id = self.curve_ids([region], [asset_class])[0]
+        return None if curve_id < 0 else self.flat_targets()[curve_id]
+
+    def available(self) -> list:
+        """
+        Lists (region, asset_class) pairs that have a pathway.
+        """
+        has_curve = ~np.isnan(self.targets[:, :, 0])
+        return [(self.regions[r], self.asset_classes[a]) for r, a in zip(*np.nonzero(has_curve))]
+
+
+def build_pathway_grid(pathways: pd.DataFrame, start_year: int, end_year: int) -> PathwayGrid:
+    """
+    Interpolates sparse pathway points into dense annual curves.
+
+    Values between points are linearly interpolated; before the first and after
+    the last point the nearest target is held constant.
+
+    Args:
+        pathways (DataFrame): crrem_pathways.csv contents.
+        start_year (int): First year of the horizon.
+        end_year (int): Last year of the horizon (inclusive).
+
+    Returns:
+        PathwayGrid
+    """
+    points = pathways.dropna(subset=["year", "target_carbon_intensity_kgco2m2"])
+    regions = tuple(sorted(points["region_code"].unique()))
+    asset_classes = tuple(sorted(points["asset_class"].unique()))
+    years = np.arange(int(start_year), int(end_year) + 1)
+    targets = np.full((len(regions), len(asset_classes), len(years)), np.nan)
+
+    for (region, asset_class), group in points.groupby(["region_code", "asset_class"], sort=False):
+        group = group.drop_duplicates("year").sort_values("year")
+        targets[regions.index(region), asset_classes.index(asset_class)] = np.interp(
+            years, group["year"].to_numpy(dtype=float), group["target_carbon_intensity_kgco2m2"].to_numpy(dtype=float)
+        )
+    return PathwayGrid(regions, asset_classes, years, targets)
+
+
+_grid_cache = {}
+
+
+def pathway_version() -> tuple:
+    """
+    Returns the versions of the files the pathway grid is built from, e.g. to key cached results.
+    """
+    return reference_version("crrem_pathways.csv"), reference_version("crrem_time_horizon.csv")
+
+
+def load_pathway_grid() -> PathwayGrid:
+    """
+    Builds the pathway grid from data/crrem_pathways.csv and
+    data/crrem_time_horizon.csv, cached until either file changes.
+    """
+    version = pathway_version()
+    cached = _grid_cache.get("grid")
+    if cached is None or cached[0] != version:
+        horizon = load_reference("crrem_time_horizon.csv").iloc[0]
+        grid = build_pathway_grid(load_reference("crrem_pathways.csv"), horizon["start_year"], horizon["end_year"])
+        _grid_cache["grid"] = cached = (version, grid)
+    return cached[1]
+
+
+def stranding_years(grid: PathwayGrid, curve_ids, intensities) -> np.ndarray:
+    """
+    Finds, for many assets at once, the first year their intensity exceeds the target.
+
+    A running minimum makes each curve non-increasing without changing the
+    first crossing, so the search is one np.searchsorted per distinct curve.
+
+    Args:
+        grid (PathwayGrid): Annual target curves.
+        curve_ids (array): Curve id per asset (from grid.curve_ids); -1 for none.
+        intensities (array): Constant carbon intensity per asset (kgCO2/m²).
+
+    Returns:
+        ndarray: Stranding year per asset as float; NaN when the asset never
+        exceeds its pathway within the horizon or has no pathway.
+    """
+    curve_ids = np.asarray(curve_ids)
+    intensities = np.asarray(intensities, dtype=float)
+    result = np.full(len(curve_ids), np.nan)
+    running_min = np.fmin.accumulate(grid.flat_targets(), axis=1)
+    n_years = len(grid.years)
+
+    for curve_id in np.unique(curve_ids[curve_ids >= 0]):
+        if np.isnan(running_min[curve_id, 0]):
+            continue
+        rows = np.nonzero(curve_ids == curve_id)[0]
+        # first position where -running_min > -intensity, i.e. target < intensity
+        pos = np.searchsorted(-running_min[curve_id], -intensities[rows], side="right")
+        crossed = (pos < n_years) & ~np.isnan(intensities[rows])
+        result[rows[crossed]] = grid.years[pos[crossed]]
+    return result
+
+
+def target_at(grid: PathwayGrid, curve_ids, years) -> np.ndarray:
+    """
+    Returns each asset's target intensity in the given year (clipped to the horizon).
+    """
+    curve_ids = np.asarray(curve_ids)
+    year_pos = np.clip(np.asarray(years, dtype=int) - grid.years[0], 0, len(grid.years) - 1)
+    year_pos = np.broadcast_to(year_pos, curve_ids.shape)
+    values = grid.flat_targets()[np.where(curve_ids >= 0, curve_ids, 0), year_pos]
+    return np.where(curve_ids >= 0, values, np.nan)
+
+
+def trajectory_stranding_years(grid: PathwayGrid, curve_ids, trajectories) -> np.ndarray:
+    """
+    Finds, for many assets at once, the first year their intensity trajectory exceeds the target.
+
+    Unlike stranding_years, the asset's intensity changes over time (e.g.
+    with grid decarbonization), so the trajectories are compared with the
+    targets year by year as one assets x years array.
+
+    Args:
+        grid (PathwayGrid): Annual target curves.
+        curve_ids (array): Curve id per asset (from grid.curve_ids); -1 for none.
+        trajectories (ndarray): Intensity per asset and grid year (kgCO2/m²),
+            shaped (asset, year).
+
+    Returns:
+        ndarray: Stranding year per asset as float; NaN when the asset never
+        exceeds its pathway within the horizon or has no pathway.
+    """
+    curve_ids = np.asarray(curve_ids)
+    targets = grid.flat_targets()[np.maximum(curve_ids, 0)]
+    over = np.asarray(trajectories, dtype=float) > targets
+    over[curve_ids < 0] = False
+    first = over.argmax(axis=1)
+    crossed = over[np.arange(len(curve_ids)), first]
+    return np.where(crossed, grid.years[first], np.nan)
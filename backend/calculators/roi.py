@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, lookup_index, reference_version, tariff_index
+from backend.utils.reference_keys import canonical_countries, country_names, fuel_keys
+
+REQUIRED_ROI_COLUMNS = ["capex", "kwh_before", "kwh_after", "country_code", "fuel_type", "year"]
+RESULT_COLUMNS = [
+    "energy_savings_kwh",
+    "annual_savings_eur",
+    "carbon_savings_kgco2",
+    "npv_eur",
+    "irr",
+    "payback_years",
+    "roi",
+    "error",
+]
+
+DEFAULT_HORIZON_YEARS = 10
+DEFAULT_PRICE_SCENARIO = "Baseline"
+
+# Fuels resolve to the Energy_Prices_CRREM_Compatible.csv carriers (see reference_keys.fuel_keys);
+# Utility_Tariffs_CRREM_Compatible.xlsx names a few carriers differently
+TARIFF_FUELS = {"Natural Gas": "Gas"}
+
+
+def irr(cash_flows: np.ndarray, tol: float = 1e-9, max_newton: int = 50, max_bisect: int = 100) -> np.ndarray:
+    """
+    Computes the internal rate of return of every row of a cash-flow matrix.
+
+    All rows are solved together: Newton steps run on the rows that have not
+    converged yet, and rows where Newton fails fall back to bisection on
+    [-0.99, 10]. Rows without a sign change on that bracket return NaN.
+
+    Args:
+        cash_flows (ndarray): (assets, periods) matrix; column 0 is period 0.
+
+    Returns:
+        ndarray: IRR per row as a fraction (0.12 == 12%).
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    n_rows, n_periods = cash_flows.shape
+    periods = np.arange(n_periods)
+    scale = np.abs(cash_flows).sum(axis=1)
+    result = np.full(n_rows, np.nan)
+
+    def npv_at(flows, rates):
+        return (flows * (1.0 + rates)[:, None] ** -periods).sum(axis=1)
+
+    active = np.nonzero(scale > 0)[0]
+    rate = np.full(len(active), 0.1)
+    for _ in range(max_newton):
+        if not len(active):
+            break
+        flows = cash_flows[active]
+        discount = (1.0 + rate)[:, None] ** -periods
+        value = (flows * discount).sum(axis=1)
+        slope = -(periods * flows * discount).sum(axis=1) / (1.0 + rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = value / slope
+        new_rate = rate - step
+        ok = np.isfinite(new_rate) & (new_rate > -0.99)
+        done = ok & (np.abs(step) < tol)
+        result[active[done]] = new_rate[done]
+        keep = ok & ~done
+        active, rate = active[keep], new_rate[keep]
+
+    unsolved = np.nonzero(np.isnan(result) & (scale > 0))[0]
+    if len(unsolved):
+        flows = cash_flows[unsolved]
+        lo = np.full(len(unsolved), -0.99)
+        hi = np.full(len(unsolved), 10.0)
+        f_lo = npv_at(flows, lo)
+        bracketed = np.sign(f_lo) != np.sign(npv_at(flows, hi))
+        for _ in range(max_bisect):
+            mid = (lo + hi) / 2
+            f_mid = npv_at(flows, mid)
+            left = np.sign(f_mid) == np.sign(f_lo)
+            lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+            hi = np.where(left, hi, mid)
+        result[unsolved[bracketed]] = ((lo + hi) / 2)[bracketed]
+    return result
+
+
+_price_cache = {}
+
+
+def load_price_curves(scenario: str = DEFAULT_PRICE_SCENARIO) -> tuple:
+    """
+    Builds an annual energy price matrix from Energy_Prices_CRREM_Compatible.csv.
+
+    Returns:
+        tuple: (Index of (Country_Code, Energy_Carrier) keys, ndarray of years,
+        ndarray prices shaped (key, year) in EUR/kWh)
+    """
+    version = (reference_version("Energy_Prices_CRREM_Compatible.csv"), scenario)
+    cached = _price_cache.get("prices")
+    if cached is None or cached[0] != version:
+        prices = load_reference("Energy_Prices_CRREM_Compatible.csv")
+        prices = prices[prices["Price_Scenario"] == scenario]
+        table = prices.pivot_table(index=["Country_Code", "Energy_Carrier"], columns="Year", values="Value", aggfunc="first")
+        table = table.reindex(columns=range(int(table.columns.min()), int(table.columns.max()) + 1))
+        table = table.ffill(axis=1).bfill(axis=1)
+        cached = (version, (table.index, table.columns.to_numpy(), table.to_numpy(dtype=float)))
+        _price_cache["prices"] = cached
+    return cached[1]
+
+
+def discount_rates(country_codes: pd.Series, default: float) -> np.ndarray:
+    """
+    Returns each country's discount rate (fraction) from
+    Discount_Rates_Risk_Premiums_CRREM_Compatible.xlsx, `default` where it has none.
+    """
+    names = country_names(country_codes)
+    rates = names.map(lookup_index("Discount_Rates_Risk_Premiums_CRREM_Compatible.xlsx", "Country", "Discount_Rate_%"))
+    return (pd.to_numeric(rates, errors="coerce") / 100).fillna(default).to_numpy(dtype=float)
+
+
+def _carbon_factors(country_codes: pd.Series, carriers: pd.Series) -> np.ndarray:
+    factors = lookup_index("crrem_conversion_factors.csv", ["country_code", "fuel_type"], "conversion_factor_kgco2_per_kwh")
+    if not factors:
+        return np.full(len(country_codes), np.nan)
+    # Both sides resolved to canonical keys, so 'GB'/'gas' rows match the table's 'UK'/'gas'
+    factors = pd.Series(factors, dtype=float)
+    factors.index = pd.MultiIndex.from_arrays([
+        canonical_countries(pd.Series(factors.index.get_level_values(0), dtype=object)).to_numpy(),
+        fuel_keys().resolve(factors.index.get_level_values(1)).to_numpy(),
+    ])
+    factors = factors[~factors.index.duplicated()]
+    keys = pd.MultiIndex.from_arrays([country_codes.to_numpy(), carriers.to_numpy()])
+    return factors.reindex(keys).to_numpy(dtype=float)
+
+
+def roi_cash_flows(
+    df: pd.DataFrame,
+    horizon_years: int = DEFAULT_HORIZON_YEARS,
+    scenario: str = DEFAULT_PRICE_SCENARIO,
+    default_discount_rate: float = None,
+) -> dict:
+    """
+    Builds the assets x (horizon + 1) cash-flow matrix of a retrofit batch.
+
+    Column 0 is -capex; column t is (kwh_before - kwh_after) times the energy
+    price of year 'year' + t - 1. Prices come from the Energy_Prices series
+    (held flat beyond the last year) and fall back to the flat utility tariff
+    when a country has no series. Discount rates come from a 'discount_rate'
+    column, the Discount_Rates_Risk_Premiums workbook, or the toolkit default.
+
+    Args:
+        df (DataFrame): Batch with REQUIRED_ROI_COLUMNS; optional discount_rate (fraction).
+        horizon_years (int): Number of years of savings.
+        scenario (str): Price_Scenario used for the energy price series.
+        default_discount_rate (float): Rate used when no country rate is known;
+            defaults to crrem_parameters_config.csv.
+
+    Returns:
+        dict: {'cash_flows', 'prices', 'rates', 'savings_kwh', 'carbon_factors',
+        'years', 'error'} as arrays in input row order.
+    """
+    n = len(df)
+    if default_discount_rate is None:
+        parameters = lookup_index("crrem_parameters_config.csv", "parameter", "default_value")
+        default_discount_rate = float(parameters["discount_rate"])
+
+    error = np.full(n, None, dtype=object)
+    numeric = {}
+    for col in ["capex", "kwh_before", "kwh_after", "year"]:
+        values = pd.to_numeric(df[col], errors="coerce")
+        numeric[col] = values.to_numpy(dtype=float)
+        error[values.isna().to_numpy()] = f"Invalid {col}"
+
+    country_codes = canonical_countries(df["country_code"].astype(object))
+    carriers = fuel_keys().resolve(df["fuel_type"])
+    error[carriers.isna().to_numpy()] = "Unknown fuel_type"
+
+    # Annual price path per asset; rows without a price series use the flat tariff
+    keys, price_years, price_table = load_price_curves(scenario)
+    keys = pd.MultiIndex.from_arrays([canonical_countries(pd.Series(keys.get_level_values(0), dtype=object)).to_numpy(),
+                                      keys.get_level_values(1)])
+    curve_ids = keys.get_indexer(pd.MultiIndex.from_arrays([country_codes.to_numpy(), carriers.to_numpy()]))
+    start_year = np.nan_to_num(numeric["year"], nan=price_years[0]).astype(int)
+    years = start_year[:, None] + np.arange(horizon_years)
+    offsets = np.clip(years - price_years[0], 0, len(price_years) - 1)
+    prices = price_table[np.maximum(curve_ids, 0)[:, None], offsets]
+
+    no_series = curve_ids < 0
+    if no_series.any():
+        names = country_names(country_codes[no_series])
+        tariff_keys = zip(names, carriers[no_series].map(lambda c: TARIFF_FUELS.get(c, c)))
+        tariffs = tariff_index()
+        flat = np.array([tariffs.get(key, np.nan) for key in tariff_keys], dtype=float)
+        prices[no_series] = flat[:, None]
+    error[np.isnan(prices[:, 0]) & (error == None)] = "Missing energy price"  # noqa: E711
+
+    rates = discount_rates(country_codes, default_discount_rate)
+    if "discount_rate" in df.columns:
+        given = pd.to_numeric(df["discount_rate"], errors="coerce").to_numpy(dtype=float)
+        rates = np.where(np.isnan(given), rates, given)
+
+    savings_kwh = numeric["kwh_before"] - numeric["kwh_after"]
+    cash_flows = np.empty((n, horizon_years + 1))
+    cash_flows[:, 0] = -numeric["capex"]
+    cash_flows[:, 1:] = savings_kwh[:, None] * prices
+    return {
+        "cash_flows": cash_flows,
+        "prices": prices,
+        "rates": rates,
+        "savings_kwh": savings_kwh,
+        "carbon_factors": _carbon_factors(country_codes, carriers),
+        "years": years,
+        "error": error,
+    }
+
+
+def npv(cash_flows: np.ndarray, rates) -> np.ndarray:
+    """
+    Discounts every row of a cash-flow matrix (column 0 is period 0) at its rate.
+    """
+    rates = np.broadcast_to(np.asarray(rates, dtype=float), cash_flows.shape[:-1])
+    discount = (1.0 + rates)[..., None] ** -np.arange(cash_flows.shape[-1])
+    return (cash_flows * discount).sum(axis=-1)
+
+
+@timed("calculate", "roi batch")
+def compute_roi_batch(
+    df: pd.DataFrame,
+    horizon_years: int = DEFAULT_HORIZON_YEARS,
+    scenario: str = DEFAULT_PRICE_SCENARIO,
+    default_discount_rate: float = None,
+) -> pd.DataFrame:
+    """
+    Computes NPV, IRR, simple payback and ROI for a batch of retrofits at once.
+
+    See roi_cash_flows for how prices and discount rates are resolved. Simple
+    payback is capex over the first year's savings; ROI is total savings over
+    the horizon minus capex, relative to capex.
+
+    Args:
+        df (DataFrame): Batch with capex, kwh_before, kwh_after, country_code,
+            fuel_type and year; optional discount_rate (fraction).
+        horizon_years (int): Number of years of savings.
+        scenario (str): Price_Scenario used for the energy price series.
+        default_discount_rate (float): Rate used when no country rate is known.
+
+    Returns:
+        DataFrame: Input columns followed by RESULT_COLUMNS, in input row order.
+    """
+    out = df.copy()
+
+    missing_cols = [col for col in REQUIRED_ROI_COLUMNS if col not in df.columns]
+    if missing_cols:
+        for col in RESULT_COLUMNS[:-1]:
+            out[col] = np.nan
+        out["error"] = f"Missing columns: {', '.join(missing_cols)}"
+        return out
+
+    flows = roi_cash_flows(df, horizon_years, scenario, default_discount_rate)
+    cash_flows = flows["cash_flows"]
+    capex = -cash_flows[:, 0]
+    annual_savings = cash_flows[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(annual_savings > 0, capex / annual_savings, np.inf)
+        roi = (cash_flows[:, 1:].sum(axis=1) - capex) / capex
+
+    results = {
+        "energy_savings_kwh": flows["savings_kwh"],
+        "annual_savings_eur": annual_savings,
+        "carbon_savings_kgco2": flows["savings_kwh"] * flows["carbon_factors"],
+        "npv_eur": npv(cash_flows, flows["rates"]),
+        "irr": irr(np.nan_to_num(cash_flows)),
+        "payback_years": payback,
+        "roi": roi,
+    }
+    failed = flows["error"] != None  # noqa: E711 - elementwise comparison on object array
+    for col, values in results.items():
+        out[col] = np.where(failed, np.nan, values)
+    out["error"] = flows["error"]
+    return out
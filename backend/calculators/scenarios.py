@@ -0,0 +1,455 @@
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from backend.calculators.pathways import PathwayGrid, load_pathway_grid
+from backend.calculators.roi import DEFAULT_HORIZON_YEARS, roi_cash_flows
+from backend.utils.columns import numeric_column
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, reference_version
+from backend.utils.reference_keys import country_positions, fuel_keys
+
+# Discrete scenario families sampled per Monte Carlo draw
+PRICE_SCENARIOS = ["Baseline", "High Tax", "Decarbonized Grid"]  # Energy_Prices Price_Scenario
+CARBON_SCENARIOS = ["Low", "Moderate", "High"]  # Carbon_Pricing_Scenarios
+GRID_SCENARIOS = ["Conservative", "Moderate", "Optimistic"]  # Renewable_Energy_Supply_Scenarios
+
+DEFAULT_SCENARIOS = 1000
+DEFAULT_PERCENTILES = (5, 50, 95)
+# Share of an asset's carbon intensity from grid electricity when the batch has no 'electricity_share'
+DEFAULT_ELECTRICITY_SHARE = 0.5
+# Upper bound for the scenarios x assets x years working arrays of one chunk
+MAX_CHUNK_BYTES = 256 * 1024 * 1024
+WORKING_ARRAYS = 6
+
+
+@dataclass(frozen=True)
+class ScenarioDrivers:
+    """
+    Jointly sampled market trajectories, one row per Monte Carlo scenario.
+
+    Attributes:
+        years (ndarray): Calendar years of the shock paths (Y,).
+        price_scenario (ndarray): Index into PRICE_SCENARIOS per scenario (S,).
+        price_shock (ndarray): Multiplicative energy price shocks (S, Y).
+        carbon_scenario (ndarray): Index into CARBON_SCENARIOS (S,).
+        carbon_shock (ndarray): Multiplicative carbon price shocks (S, Y).
+        grid_weights (ndarray): Mix of the GRID_SCENARIOS paths per scenario (S, G).
+        escalation_exponent (ndarray): Power applied to the cost escalation index (S,).
+    """
+
+    years: np.ndarray
+    price_scenario: np.ndarray
+    price_shock: np.ndarray
+    carbon_scenario: np.ndarray
+    carbon_shock: np.ndarray
+    grid_weights: np.ndarray
+    escalation_exponent: np.ndarray
+
+    @property
+    def n_scenarios(self) -> int:
+        return len(self.price_scenario)
+
+    def offsets(self, years) -> np.ndarray:
+        """
+        Maps calendar years to positions on the shock paths (clipped to the range).
+        """
+        return np.clip(np.asarray(years, dtype=int) - self.years[0], 0, len(self.years) - 1)
+
+
+def sample_drivers(
+    n_scenarios: int = DEFAULT_SCENARIOS,
+    years=range(2024, 2061),
+    seed=None,
+    energy_volatility: float = 0.05,
+    carbon_volatility: float = 0.10,
+    correlation: float = 0.5,
+    escalation_volatility: float = 0.2,
+) -> ScenarioDrivers:
+    """
+    Samples joint energy price, carbon price, grid and cost escalation trajectories.
+
+    Each scenario picks one energy and one carbon price family (uniformly)
+    and adds mean-one lognormal random-walk shocks to both price paths; the
+    two shock paths are correlated. Grid decarbonization is a random
+    (Dirichlet) mix of the reference paths and cost escalation is the
+    reference index raised to a lognormal exponent.
+
+    Args:
+        n_scenarios (int): Number of scenarios.
+        years: Calendar years covered by the shock paths.
+        seed: Seed for numpy.random.default_rng, for reproducible draws.
+        energy_volatility (float): Annual log-volatility of energy prices.
+        carbon_volatility (float): Annual log-volatility of carbon prices.
+        correlation (float): Correlation of energy and carbon shocks.
+        escalation_volatility (float): Log-spread of the escalation exponent.
+
+    Returns:
+        ScenarioDrivers
+    """
+    rng = np.random.default_rng(seed)
+    years = np.asarray(years, dtype=int)
+    shape = (n_scenarios, len(years))
+    steps = np.arange(1, len(years) + 1)
+
+    z_energy = rng.standard_normal(shape)
+    z_carbon = correlation * z_energy + np.sqrt(1 - correlation ** 2) * rng.standard_normal(shape)
+
+    def random_walk(z, volatility):
+        return np.exp(volatility * np.cumsum(z, axis=1) - 0.5 * volatility ** 2 * steps)
+
+    return ScenarioDrivers(
+        years=years,
+        price_scenario=rng.integers(len(PRICE_SCENARIOS), size=n_scenarios),
+        price_shock=random_walk(z_energy, energy_volatility),
+        carbon_scenario=rng.integers(len(CARBON_SCENARIOS), size=n_scenarios),
+        carbon_shock=random_walk(z_carbon, carbon_volatility),
+        grid_weights=rng.dirichlet(np.ones(len(GRID_SCENARIOS)), size=n_scenarios),
+        escalation_exponent=rng.lognormal(0.0, escalation_volatility, n_scenarios),
+    )
+
+
+def _year_columns(table: pd.DataFrame, years: np.ndarray) -> np.ndarray:
+    # Holds the first and last reference values outside the covered years
+    table = table.rename(columns=int)
+    table = table.reindex(columns=range(min(years[0], table.columns.min()), max(years[-1], table.columns.max()) + 1))
+    return table.interpolate(axis=1, limit_area="inside").ffill(axis=1).bfill(axis=1)[list(years)].to_numpy(dtype=float)
+
+
+_curve_cache = {}
+
+
+def _cached_curves(name: str, years: np.ndarray, build):
+    version = (reference_version(name), tuple(years))
+    cached = _curve_cache.get(name)
+    if cached is None or cached[0] != version:
+        cached = (version, build(load_reference(name)))
+        _curve_cache[name] = cached
+    return cached[1]
+
+
+def carbon_price_curves(years) -> tuple:
+    """
+    Carbon prices from Carbon_Pricing_Scenarios_CRREM_Compatible.xlsx.
+
+    Returns:
+        tuple: (Index of countries, ndarray (scenario, country + 1, year) in
+        EUR/tCO2); the extra last country row is the cross-country mean used
+        for countries without a series.
+    """
+    years = np.asarray(years, dtype=int)
+
+    def build(table):
+        year_cols = [col for col in table.columns if str(col).isdigit()]
+        countries = pd.Index(table["Country"].drop_duplicates())
+        curves = np.full((len(CARBON_SCENARIOS), len(countries) + 1, len(years)), np.nan)
+        for k, scenario in enumerate(CARBON_SCENARIOS):
+            rows = table[table["Scenario"] == scenario].drop_duplicates("Country").set_index("Country")
+            values = _year_columns(rows[year_cols].reindex(countries), years)
+            curves[k, :-1] = values
+            curves[k, -1] = np.nanmean(values, axis=0)
+        return countries, np.nan_to_num(curves)
+
+    return _cached_curves("Carbon_Pricing_Scenarios_CRREM_Compatible.xlsx", years, build)
+
+
+def grid_factor_curves(years) -> tuple:
+    """
+    Grid emission factor multipliers from Renewable_Energy_Supply_Scenarios.
+
+    The multiplier is the non-renewable share of each year relative to the
+    first reference year, so it scales today's electricity factor.
+
+    Returns:
+        tuple: (Index of countries, ndarray (scenario, country + 1, year));
+        the extra last row is 1.0 (no decarbonization) for unknown countries.
+    """
+    years = np.asarray(years, dtype=int)
+
+    def build(table):
+        countries = pd.Index(table["Country"].drop_duplicates())
+        curves = np.ones((len(GRID_SCENARIOS), len(countries) + 1, len(years)))
+        for k, scenario in enumerate(GRID_SCENARIOS):
+            share = table[table["Scenario"] == scenario].pivot_table(
+                index="Country", columns="Year", values="Renewable_Electricity_Share_%", aggfunc="first"
+            ).reindex(countries)
+            base = 1 - share.iloc[:, 0].to_numpy(dtype=float)[:, None] / 100
+            remaining = 1 - _year_columns(share, years) / 100
+            with np.errstate(divide="ignore", invalid="ignore"):
+                curves[k, :-1] = np.clip(np.nan_to_num(remaining / base, nan=1.0), 0, None)
+        return countries, curves
+
+    return _cached_curves("Renewable_Energy_Supply_Scenarios_CRREM_Compatible.xlsx", years, build)
+
+
+def escalation_curves(years) -> tuple:
+    """
+    CapEx escalation index from Cost_Escalation_Factors_CRREM_Compatible.xlsx
+    (mean of the Materials, Labor and Equipment categories).
+
+    Returns:
+        tuple: (Index of countries, ndarray (country + 1, year)); the extra
+        last row is 1.0 for unknown countries.
+    """
+    years = np.asarray(years, dtype=int)
+
+    def build(table):
+        year_cols = [col for col in table.columns if str(col).isdigit()]
+        index = table.groupby("Country", sort=False)[year_cols].mean()
+        curves = np.ones((len(index) + 1, len(years)))
+        curves[:-1] = _year_columns(index, years)
+        return index.index, curves
+
+    return _cached_curves("Cost_Escalation_Factors_CRREM_Compatible.xlsx", years, build)
+
+
+def _chunk_size(n_scenarios: int, n_periods: int, chunk_size=None) -> int:
+    if chunk_size:
+        return int(chunk_size)
+    return max(1, MAX_CHUNK_BYTES // (n_scenarios * n_periods * 8 * WORKING_ARRAYS))
+
+
+def _map_chunks(func, df: pd.DataFrame, size: int, processes: int) -> list:
+    chunks = [df.iloc[start:start + size] for start in range(0, len(df), size)]
+    if processes and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(func, chunks))
+    return [func(chunk) for chunk in chunks]
+
+
+def _roi_chunk(df, drivers, horizon_years, default_discount_rate) -> dict:
+    base = [roi_cash_flows(df, horizon_years, scenario, default_discount_rate) for scenario in PRICE_SCENARIOS]
+    flows = base[0]
+    failed = flows["error"] != None  # noqa: E711 - elementwise comparison on object array
+    n_scenarios, periods = drivers.n_scenarios, np.arange(horizon_years)
+
+    # Present value of one kWh saved per year and of its avoided kgCO2 (before prices)
+    discount = (1.0 + flows["rates"])[:, None] ** -(periods + 1.0)
+    kwh_value = np.where(failed, 0.0, flows["savings_kwh"])[:, None] * discount
+    electricity = (fuel_keys().resolve(df["fuel_type"]) == "Electricity").to_numpy()
+    co2_value = kwh_value * np.nan_to_num(flows["carbon_factors"])[:, None] / 1000  # tCO2
+    prices = np.nan_to_num(np.stack([b["prices"] for b in base]))
+
+    countries, carbon_curves = carbon_price_curves(drivers.years)
+    carbon_ids = country_positions(countries, df["country_code"])
+    countries, grid_curves = grid_factor_curves(drivers.years)
+    grid_ids = country_positions(countries, df["country_code"])
+
+    # Cash flows are linear in the shock paths, so each group of assets sharing
+    # a start year reduces to (scenarios x years) @ (years x assets) products.
+    savings = np.zeros((n_scenarios, len(df)))
+    period_totals = np.zeros((n_scenarios, horizon_years))
+    start = drivers.offsets(flows["years"][:, 0])
+    for offset in np.unique(start):
+        rows = np.nonzero(start == offset)[0]
+        cols = drivers.offsets(drivers.years[offset] + periods)
+        price_shock = drivers.price_shock[:, cols]
+        carbon_shock = drivers.carbon_shock[:, cols]
+        for k in range(len(PRICE_SCENARIOS)):
+            picked = np.nonzero(drivers.price_scenario == k)[0]
+            weights = kwh_value[rows] * prices[k, rows]
+            savings[np.ix_(picked, rows)] += price_shock[picked] @ weights.T
+            period_totals[picked] += price_shock[picked] * weights.sum(axis=0)
+        for j in range(len(CARBON_SCENARIOS)):
+            picked = np.nonzero(drivers.carbon_scenario == j)[0]
+            carbon_price = carbon_curves[j][carbon_ids[rows]][:, cols] * co2_value[rows]
+            for g in range(len(GRID_SCENARIOS)):
+                ratio = np.where(electricity[rows, None], grid_curves[g][grid_ids[rows]][:, cols], 1.0)
+                weights = carbon_price * ratio
+                mix = drivers.grid_weights[picked, g][:, None]
+                savings[np.ix_(picked, rows)] += mix * (carbon_shock[picked] @ weights.T)
+                period_totals[picked] += mix * carbon_shock[picked] * weights.sum(axis=0)
+
+    # CapEx escalated from the reference base year to the retrofit year
+    countries, escalation = escalation_curves(drivers.years)
+    index = escalation[country_positions(countries, df["country_code"]), start]
+    capex = np.where(failed, 0.0, -flows["cash_flows"][:, 0])[None, :] * index[None, :] ** drivers.escalation_exponent[:, None]
+
+    values = savings - capex
+    values[:, failed] = np.nan
+    totals = np.column_stack([-capex.sum(axis=1), period_totals])
+    return {"npv": values, "discounted_cash_flows": totals}
+
+
+@timed("calculate", "roi simulation")
+def simulate_roi(
+    df: pd.DataFrame,
+    n_scenarios: int = DEFAULT_SCENARIOS,
+    horizon_years: int = DEFAULT_HORIZON_YEARS,
+    seed=None,
+    drivers: ScenarioDrivers = None,
+    default_discount_rate: float = None,
+    chunk_size: int = None,
+    processes: int = 1,
+) -> dict:
+    """
+    Evaluates a retrofit batch under many sampled market scenarios.
+
+    Cash flows follow roi_cash_flows, with the energy price family and shocks,
+    the value of avoided carbon (carbon price x emission factor, electricity
+    following the sampled grid decarbonization) and escalated CapEx drawn per
+    scenario. Cash flows are linear in the sampled paths, so NPVs are
+    accumulated as matrix products without a scenarios x assets x years
+    array. Assets are processed in chunks bounded by MAX_CHUNK_BYTES; chunks
+    can run in a process pool.
+
+    Args:
+        df (DataFrame): Batch with capex, kwh_before, kwh_after, country_code,
+            fuel_type and year (see compute_roi_batch).
+        n_scenarios (int): Number of scenarios, ignored when drivers are given.
+        horizon_years (int): Number of years of savings.
+        seed: Seed for sample_drivers.
+        drivers (ScenarioDrivers): Pre-sampled drivers, e.g. to share scenarios
+            with simulate_stranding.
+        default_discount_rate (float): Rate used when no country rate is known.
+        chunk_size (int): Assets per chunk; derived from MAX_CHUNK_BYTES if None.
+        processes (int): Worker processes; 1 runs in-process.
+
+    Returns:
+        dict: {'npv': ndarray (scenario, asset), NaN for invalid rows;
+        'discounted_cash_flows': portfolio total per scenario and period
+        (scenario, horizon + 1); 'drivers': ScenarioDrivers}
+    """
+    if drivers is None:
+        drivers = sample_drivers(n_scenarios, seed=seed)
+    # The ROI kernel only holds (scenario, asset) arrays, never a years axis
+    size = _chunk_size(drivers.n_scenarios, 1, chunk_size)
+    worker = partial(_roi_chunk, drivers=drivers, horizon_years=horizon_years,
+                     default_discount_rate=default_discount_rate)
+    parts = _map_chunks(worker, df.reset_index(drop=True), size, processes)
+    if not parts:
+        return {"npv": np.empty((drivers.n_scenarios, 0)),
+                "discounted_cash_flows": np.zeros((drivers.n_scenarios, horizon_years + 1)), "drivers": drivers}
+    return {
+        "npv": np.concatenate([part["npv"] for part in parts], axis=1),
+        "discounted_cash_flows": sum(part["discounted_cash_flows"] for part in parts),
+        "drivers": drivers,
+    }
+
+
+def _stranding_chunk(df, drivers, grid, percentiles) -> dict:
+    curve_ids = grid.asset_curve_ids(df["country_code"], df["asset_class"])
+    intensity, _ = numeric_column(df, "carbon_intensity")
+    years = grid.years
+
+    # Intensity path before grid effects: post-retrofit intensity from the retrofit year on
+    path = np.repeat(intensity[:, None], len(years), axis=1)
+    if "post_intensity" in df.columns and "retrofit_year" in df.columns:
+        post, _ = numeric_column(df, "post_intensity")
+        retrofit_year, _ = numeric_column(df, "retrofit_year")
+        after = (years[None, :] >= retrofit_year[:, None]) & ~np.isnan(post)[:, None]
+        path = np.where(after, post[:, None], path)
+
+    share = np.full(len(df), DEFAULT_ELECTRICITY_SHARE)
+    if "electricity_share" in df.columns:
+        given, _ = numeric_column(df, "electricity_share")
+        share = np.where(np.isnan(given), share, given)
+
+    countries, grid_curves = grid_factor_curves(drivers.years)
+    family_ratio = grid_curves[:, country_positions(countries, df["country_code"])][:, :, drivers.offsets(years)]
+    n_scenarios = drivers.n_scenarios
+    intensities = (drivers.grid_weights @ family_ratio.reshape(len(family_ratio), -1)).reshape(n_scenarios, *path.shape)
+    intensities *= (share[:, None] * path)[None]
+    intensities += ((1 - share)[:, None] * path)[None]
+
+    targets = np.where(curve_ids[:, None] >= 0, grid.flat_targets()[np.maximum(curve_ids, 0)], np.nan)
+    over = intensities > targets[None]
+    first = over.argmax(axis=2)
+    first[~np.take_along_axis(over, first[:, :, None], axis=2)[:, :, 0]] = len(years)
+    stranding = np.where(first < len(years), years[np.minimum(first, len(years) - 1)], np.nan)
+
+    # Assets stranded by each year, per scenario (an asset counts from its first crossing on)
+    bins = (first + (len(years) + 1) * np.arange(n_scenarios)[:, None]).ravel()
+    counts = np.bincount(bins, minlength=n_scenarios * (len(years) + 1)).reshape(n_scenarios, -1)
+    counts = counts.cumsum(axis=1)[:, :len(years)]
+    result = {"stranding_year": stranding, "stranded_count": counts}
+    if percentiles is not None:
+        result["intensity_bands"] = np.percentile(intensities, percentiles, axis=0)
+    return result
+
+
+@timed("calculate", "stranding simulation")
+def simulate_stranding(
+    df: pd.DataFrame,
+    n_scenarios: int = DEFAULT_SCENARIOS,
+    seed=None,
+    drivers: ScenarioDrivers = None,
+    grid: PathwayGrid = None,
+    percentiles=None,
+    chunk_size: int = None,
+    processes: int = 1,
+) -> dict:
+    """
+    Evaluates CRREM stranding years under sampled grid decarbonization paths.
+
+    The grid-electricity share of each asset's intensity (column
+    'electricity_share', else DEFAULT_ELECTRICITY_SHARE) follows the sampled
+    grid emission factor path; the rest stays constant. Optional
+    'retrofit_year' and 'post_intensity' columns switch the asset to its
+    post-retrofit intensity from that year.
+
+    Args:
+        df (DataFrame): Batch with asset_class, country_code and carbon_intensity.
+        n_scenarios (int): Number of scenarios, ignored when drivers are given.
+        seed: Seed for sample_drivers.
+        drivers (ScenarioDrivers): Pre-sampled drivers.
+        grid (PathwayGrid): Pathway curves; defaults to load_pathway_grid().
+        percentiles: If given, per-asset intensity percentile bands are returned.
+        chunk_size (int): Assets per chunk; derived from MAX_CHUNK_BYTES if None.
+        processes (int): Worker processes; 1 runs in-process.
+
+    Returns:
+        dict: {'stranding_year': ndarray (scenario, asset), NaN when not
+        stranded within the horizon or without pathway; 'stranded_count':
+        assets stranded by each year (scenario, year); 'years': ndarray;
+        'intensity_bands': (percentile, asset, year) if percentiles given;
+        'drivers': ScenarioDrivers}
+    """
+    if drivers is None:
+        drivers = sample_drivers(n_scenarios, seed=seed)
+    grid = grid or load_pathway_grid()
+    size = _chunk_size(drivers.n_scenarios, len(grid.years), chunk_size)
+    worker = partial(_stranding_chunk, drivers=drivers, grid=grid, percentiles=percentiles)
+    parts = _map_chunks(worker, df.reset_index(drop=True), size, processes)
+
+    result = {
+        "stranding_year": np.concatenate([p["stranding_year"] for p in parts], axis=1) if parts
+        else np.empty((drivers.n_scenarios, 0)),
+        "stranded_count": sum(p["stranded_count"] for p in parts) if parts
+        else np.zeros((drivers.n_scenarios, len(grid.years)), dtype=int),
+        "years": grid.years,
+        "drivers": drivers,
+    }
+    if percentiles is not None:
+        result["intensity_bands"] = np.concatenate([p["intensity_bands"] for p in parts], axis=1) if parts \
+            else np.empty((len(percentiles), 0, len(grid.years)))
+    return result
+
+
+def percentile_bands(values: np.ndarray, percentiles=DEFAULT_PERCENTILES, axis: int = 0) -> np.ndarray:
+    """
+    Percentiles across scenarios (axis 0 by default), ignoring NaN.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns (invalid assets) stay NaN
+        return np.nanpercentile(values, percentiles, axis=axis)
+
+
+def summarize_npv(df: pd.DataFrame, npv_matrix: np.ndarray, percentiles=DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """
+    Appends per-asset NPV percentiles and the probability of a negative NPV.
+
+    Returns:
+        DataFrame: Input columns followed by npv_p<q> columns and prob_negative_npv.
+    """
+    out = df.copy()
+    bands = percentile_bands(npv_matrix, percentiles)
+    for q, values in zip(percentiles, bands):
+        out[f"npv_p{q}"] = values
+    with np.errstate(invalid="ignore"):
+        out["prob_negative_npv"] = np.where(np.isnan(npv_matrix).all(axis=0), np.nan, (npv_matrix < 0).mean(axis=0))
+    return out
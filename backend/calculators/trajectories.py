@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+from backend.utils.columns import numeric_column
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, reference_version
+from backend.utils.reference_keys import country_names
+
+EMISSION_FACTORS = "emissions/Utility_Emission_Factors_CRREM_Compatible.xlsx"
+# Fuel -> factor column of EMISSION_FACTORS (kgCO2/kWh)
+FUELS = {
+    "electricity": "Electricity_kgCO2_per_kWh",
+    "gas": "Gas_kgCO2_per_kWh",
+    "oil": "Heating_oil_kgCO2_per_kWh",
+    "district_heat": "District_Heat_kgCO2_per_kWh",
+}
+# Annual consumption per fuel in a batch (kWh/yr); any subset may be given
+FUEL_COLUMNS = {fuel: f"{fuel}_kwh" for fuel in FUELS}
+
+
+@dataclass(frozen=True)
+class EmissionFactorGrid:
+    """
+    Annual emission factors per country and fuel.
+
+    Attributes:
+        countries (tuple): Country names, second axis of `factors`.
+        fuels (tuple): Fuels (keys of FUELS), first axis of `factors`.
+        years (ndarray): Annual years covered, third axis of `factors`.
+        factors (ndarray): kgCO2/kWh shaped (fuel, country + 1, year); the
+            extra last country row is the cross-country mean, used for
+            countries without factors.
+    """
+
+    countries: tuple
+    fuels: tuple
+    years: np.ndarray
+    factors: np.ndarray
+
+    def country_ids(self, country_codes) -> np.ndarray:
+        """
+        Maps country codes (or names) to rows of `factors`; unknown countries
+        map to the mean row.
+        """
+        # Resolved once per distinct code, then broadcast back to the assets
+        codes, distinct = pd.factorize(pd.Series(country_codes, dtype=object), use_na_sentinel=False)
+        ids = pd.Index(self.countries).get_indexer(country_names(pd.Series(distinct, dtype=object)))
+        return np.where(ids >= 0, ids, len(self.countries))[codes]
+
+    def curve(self, fuel: str, country_code: str) -> np.ndarray:
+        """
+        Returns the annual factor curve of one fuel in one country.
+        """
+        return self.factors[self.fuels.index(fuel), self.country_ids([country_code])[0]]
+
+
+def build_emission_factor_grid(table: pd.DataFrame, years) -> EmissionFactorGrid:
+    """
+    Interpolates the emission factor table onto annual years.
+
+    Values between reference years are linearly interpolated; outside the
+    covered years the nearest factor is held constant, as for the pathways.
+
+    Args:
+        table (DataFrame): Utility_Emission_Factors_CRREM_Compatible.xlsx contents.
+        years: Annual years to cover, normally the pathway grid's years.
+
+    Returns:
+        EmissionFactorGrid
+    """
+    years = np.asarray(years, dtype=int)
+    table = table.dropna(subset=["Country", "Year"])
+    countries = tuple(table["Country"].drop_duplicates())
+    factors = np.empty((len(FUELS), len(countries) + 1, len(years)))
+
+    for k, column in enumerate(FUELS.values()):
+        points = table.pivot_table(index="Country", columns="Year", values=column, aggfunc="first")
+        points = points.reindex(list(countries))
+        point_years = points.columns.to_numpy(dtype=float)
+        for i, values in enumerate(points.to_numpy(dtype=float)):
+            known = ~np.isnan(values)
+            factors[k, i] = np.interp(years, point_years[known], values[known]) if known.any() else np.nan
+        factors[k, -1] = np.nanmean(factors[k, :-1], axis=0)
+    return EmissionFactorGrid(countries, tuple(FUELS), years, np.nan_to_num(factors))
+
+
+_grid_cache = {}
+
+
+def load_emission_factor_grid(years) -> EmissionFactorGrid:
+    """
+    Builds the emission factor grid for the given years from
+    data/emissions/Utility_Emission_Factors_CRREM_Compatible.xlsx, cached
+    until the file changes.
+    """
+    years = np.asarray(years, dtype=int)
+    version = (reference_version(EMISSION_FACTORS), tuple(years))
+    cached = _grid_cache.get("grid")
+    if cached is None or cached[0] != version:
+        grid = build_emission_factor_grid(load_reference(EMISSION_FACTORS), years)
+        _grid_cache["grid"] = cached = (version, grid)
+    return cached[1]
+
+
+@timed("calculate", "carbon trajectories")
+def carbon_trajectories(df: pd.DataFrame, factors: EmissionFactorGrid, reporting_year: int = None) -> dict:
+    """
+    Computes the annual operational carbon intensity of every asset as one
+    assets x years matrix.
+
+    Assets with an energy mix (any FUEL_COLUMNS value) get the sum over
+    fuels of kWh per m² times that fuel's factor in their country and year,
+    so electricity follows the grid's decarbonization. Other assets keep
+    their reported carbon_intensity; when an 'electricity_share' (0-1) is
+    given, that share of it scales with the electricity factor relative to
+    the reporting year, so the curve equals carbon_intensity in that year.
+    Each fuel adds one gather and multiply-add over the
+    whole matrix, so the cost does not depend on the number of countries.
+
+    Args:
+        df (DataFrame): Batch with country_code and, per asset, either
+            floor_area with kWh per fuel (FUEL_COLUMNS) or carbon_intensity
+            and optionally electricity_share and reporting_year (the year
+            carbon_intensity was measured in).
+        factors (EmissionFactorGrid): Annual factors (see load_emission_factor_grid).
+        reporting_year (int): Reporting year of rows without one; defaults
+            to the first year of `factors`, so results do not depend on the
+            date they are computed on.
+
+    Returns:
+        dict: {'years': ndarray (year,), 'intensity': ndarray (asset, year)
+        in kgCO2/m², NaN for rows with an error; 'from_mix': bool ndarray,
+        True where the curve comes from the energy mix; 'error': object
+        ndarray, None or a message per row}
+    """
+    n = len(df)
+    years = factors.years
+    error = np.full(n, None, dtype=object)
+    countries = factors.country_ids(df["country_code"]) if "country_code" in df.columns \
+        else np.full(n, len(factors.countries))
+    intensity = np.zeros((n, len(years)))
+
+    fuels = [fuel for fuel in FUEL_COLUMNS if FUEL_COLUMNS[fuel] in df.columns]
+    from_mix = np.zeros(n, dtype=bool)
+    if fuels:
+        floor_area, bad_area = numeric_column(df, "floor_area")
+        for fuel in fuels:
+            kwh, bad_kwh = numeric_column(df, FUEL_COLUMNS[fuel])
+            error[bad_kwh | (kwh < 0)] = "Invalid energy mix"
+            from_mix |= ~np.isnan(kwh)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                per_m2 = np.nan_to_num(kwh) / floor_area
+            intensity += per_m2[:, None] * factors.factors[factors.fuels.index(fuel)][countries]
+        error[from_mix & (bad_area | ~(floor_area > 0))] = "Invalid floor_area"
+
+    constant = ~from_mix
+    if constant.any():
+        carbon_intensity, bad_intensity = numeric_column(df, "carbon_intensity")
+        error[constant & bad_intensity] = "Invalid carbon_intensity"
+        scale = np.ones((n, len(years)))
+        if "electricity_share" in df.columns:
+            share, bad_share = numeric_column(df, "electricity_share")
+            error[constant & (bad_share | (share < 0) | (share > 1))] = "Invalid electricity_share"
+            reported, bad_year = numeric_column(df, "reporting_year")
+            error[constant & bad_year] = "Invalid reporting_year"
+            reported = np.nan_to_num(reported, nan=years[0] if reporting_year is None else reporting_year)
+            # Years outside the grid hold its nearest factor, as the curves do
+            anchor = np.clip(reported.astype(int) - years[0], 0, len(years) - 1)
+            electricity = factors.factors[factors.fuels.index("electricity")][countries]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.nan_to_num(electricity / electricity[np.arange(n), anchor][:, None], nan=1.0, posinf=1.0)
+            share = np.nan_to_num(share)[:, None]
+            scale = share * ratio + (1 - share)
+        intensity[constant] = (carbon_intensity[:, None] * scale)[constant]
+
+    intensity[error != None] = np.nan  # noqa: E711 - elementwise comparison on object array
+    return {"years": years, "intensity": intensity, "from_mix": from_mix, "error": error}
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from backend.calculators.epc import load_epc_thresholds
+from backend.calculators.pathways import PathwayGrid, load_pathway_grid, target_at
+from backend.utils.columns import numeric_column
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import lookup_index
+from backend.utils.reference_keys import country_keys
+
+REQUIRED_TRANSITION_COLUMNS = [
+    "country_code",
+    "asset_class",
+    "floor_area",
+    "carbon_intensity",
+    "asset_value",
+    "current_epc",
+    "target_epc",
+    "retrofit_year",
+]
+RESULT_COLUMNS = [
+    "valuation_uplift_pct",
+    "valuation_uplift_eur",
+    "carbon_saving_kg",
+    "post_intensity",
+    "crrem_target",
+    "stranded",
+    "error",
+]
+
+# Carbon saving assumed per m² of retrofitted floor area (kgCO2/m²)
+DEFAULT_SAVING_PER_M2 = 8.0
+
+
+@timed("calculate", "transition batch")
+def compute_transition_batch(
+    df: pd.DataFrame,
+    grid: PathwayGrid = None,
+    saving_per_m2: float = DEFAULT_SAVING_PER_M2,
+) -> pd.DataFrame:
+    """
+    Computes transition-plan results (valuation uplift, post-retrofit intensity
+    and CRREM compliance in the retrofit year) for a batch of assets at once.
+
+    The valuation uplift comes from ESG_Valuation_Impacts_CRREM_TEMPLATE.xlsx
+    by (country, current EPC, target EPC); rows without an uplift or with an
+    unknown country get an error. A missing current_epc is inferred from carbon_intensity with the
+    EPC baselines (see backend.calculators.epc) and written back to the
+    output's current_epc column. The CRREM target is None (NaN) when the asset has no pathway, in
+    which case 'stranded' is None too.
+
+    Args:
+        df (DataFrame): Batch with REQUIRED_TRANSITION_COLUMNS.
+        grid (PathwayGrid): Pathway curves; defaults to load_pathway_grid().
+        saving_per_m2 (float): Assumed carbon saving of the retrofit (kgCO2/m²).
+
+    Returns:
+        DataFrame: Input columns followed by RESULT_COLUMNS, in input row order.
+    """
+    out = df.copy()
+
+    missing_cols = [col for col in REQUIRED_TRANSITION_COLUMNS if col not in df.columns]
+    if missing_cols:
+        for col in RESULT_COLUMNS[:-1]:
+            out[col] = np.nan
+        out["error"] = f"Missing columns: {', '.join(missing_cols)}"
+        return out
+
+    grid = grid or load_pathway_grid()
+    error = np.full(len(df), None, dtype=object)
+
+    current_epc = df["current_epc"].astype(object).where(df["current_epc"].notna(), None)
+    blank = current_epc.isna().to_numpy() | (current_epc.astype(str).str.strip() == "").to_numpy()
+    if blank.any():
+        inferred = load_epc_thresholds().classify(
+            pd.to_numeric(df["carbon_intensity"][blank], errors="coerce").to_numpy(dtype=float),
+            df["country_code"][blank], df["asset_class"][blank],
+        )
+        current_epc[blank] = np.asarray(inferred, dtype=object)
+        out["current_epc"] = current_epc.to_numpy()
+
+    uplifts = lookup_index("ESG_Valuation_Impacts_CRREM_TEMPLATE.xlsx", ["Country", "From EPC", "To EPC"],
+                           "Valuation Uplift (%)")
+    # Both sides resolved to canonical keys, so 'GB' or 'United Kingdom' rows match the table's 'UK'
+    country = country_keys().resolve(df["country_code"])
+    keys = pd.MultiIndex.from_arrays([country.to_numpy(), current_epc.to_numpy(),
+                                      df["target_epc"].astype(object).to_numpy()])
+    uplift_pct = country_keys().rekey(pd.Series(uplifts, dtype=float)).reindex(keys).to_numpy(dtype=float) \
+        if uplifts else np.full(len(df), np.nan)
+    error[np.isnan(uplift_pct)] = "Missing valuation uplift"
+    error[country.isna().to_numpy()] = "Unknown country_code"
+
+    numbers = {}
+    for col in ["floor_area", "carbon_intensity", "asset_value", "retrofit_year"]:
+        numbers[col], invalid = numeric_column(df, col)
+        error[invalid | np.isnan(numbers[col])] = f"Invalid {col}"
+    error[numbers["floor_area"] <= 0] = "Invalid floor_area"
+
+    carbon_saving = numbers["floor_area"] * saving_per_m2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        post_intensity = numbers["carbon_intensity"] - carbon_saving / numbers["floor_area"]
+
+    curve_ids = grid.asset_curve_ids(df["country_code"], df["asset_class"])
+    retrofit_year = np.nan_to_num(numbers["retrofit_year"], nan=grid.years[0]).astype(int)
+    crrem_target = target_at(grid, curve_ids, retrofit_year)
+    stranded = np.where(np.isnan(crrem_target), None, post_intensity > crrem_target)
+
+    results = {
+        "valuation_uplift_pct": uplift_pct,
+        "valuation_uplift_eur": numbers["asset_value"] * uplift_pct / 100,
+        "carbon_saving_kg": carbon_saving,
+        "post_intensity": post_intensity,
+        "crrem_target": crrem_target,
+    }
+    failed = error != None  # noqa: E711 - elementwise comparison on object array
+    for col, values in results.items():
+        out[col] = np.where(failed, np.nan, values)
+    out["stranded"] = np.where(failed, None, stranded)
+    out["error"] = error
+    return out
@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+
+from backend.utils.file_validator import DEFAULT_CHUNKSIZE, open_source
+from backend.utils.instrumentation import timed
+from backend.utils.reference_data import load_reference, reference_version
+from backend.utils.reference_keys import country_positions
+
+MEASURES = {
+    "Energy Consumption (kWh)": "energy_kwh",
+    "Water Consumption (m³)": "water_m3",
+    "Waste (kg)": "waste_kg",
+}
+ROLLING_MONTHS = 12
+# Partial monthly aggregates are merged after this many chunks, bounding memory
+COMBINE_EVERY = 16
+MONTH_OFFSET = 2 ** 31
+
+# Utilities files report energy without a fuel split; it is costed as grid electricity
+EMISSION_FACTORS = "Utility_Emission_Factors_CRREM_Compatible.xlsx"
+ELECTRICITY_FACTOR_COLUMN = "Electricity_kgCO2_per_kWh"
+
+_factor_cache = {}
+
+
+def _factorize(values: pd.Series) -> tuple:
+    # (codes, uniques) with -1 for missing values; categoricals reuse their codes
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+def _month_ordinals(values: pd.Series) -> np.ndarray:
+    """
+    Monthly period ordinals ((year - 1970) * 12 + month - 1); -1 where unparseable.
+
+    Each distinct label is parsed once, so a 10M-row column with a few
+    hundred distinct months costs a few hundred date parses.
+    """
+    codes, uniques = _factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format="mixed")
+    ordinals = np.where(parsed.isna(), -1, (parsed.dt.year - 1970) * 12 + parsed.dt.month - 1).astype(np.int32)
+    return np.where(codes >= 0, ordinals[np.maximum(codes, 0)] if len(ordinals) else -1, -1).astype(np.int32)
+
+
+def _asset_codes(names: pd.Series, index: dict) -> np.ndarray:
+    """
+    Codes of asset names in a registry shared across chunks; -1 for missing names.
+    """
+    codes, uniques = _factorize(names)
+    registry = np.array([index.setdefault(name, len(index)) for name in uniques], dtype=np.int32)
+    return np.where(codes >= 0, registry[np.maximum(codes, 0)] if len(registry) else -1, -1).astype(np.int32)
+
+
+def _chunks(source, chunksize: int):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+    handle, _, owned = open_source(source)
+    try:
+        header = pd.read_csv(handle, nrows=0).columns
+        handle.seek(0)
+        usecols = [col for col in ["Asset Name", "Month", *MEASURES] if col in header]
+        yield from pd.read_csv(handle, chunksize=chunksize, usecols=usecols)
+    finally:
+        if owned:
+            handle.close()
+        else:
+            handle.seek(0)
+
+
+def _reduce(keys: np.ndarray, columns: list) -> tuple:
+    """
+    Sums rows with equal keys, one column at a time to limit peak memory;
+    a sum is NaN only if all its values are.
+
+    Returns:
+        tuple: (sorted unique keys, list of float32 sums per column)
+    """
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else order[:0]
+    sums = []
+    for values in columns:
+        values = values[order]
+        if len(starts) == len(keys):  # no duplicates, just reordered
+            sums.append(values.astype("float32", copy=False))
+            continue
+        present = np.add.reduceat(~np.isnan(values), starts)
+        total = np.add.reduceat(np.nan_to_num(values, copy=False), starts, dtype="float64")
+        sums.append(np.where(present > 0, total, np.nan).astype("float32"))
+    return keys[starts], sums
+
+
+def _merge(keys: list, sums: list) -> tuple:
+    # concatenates and reduces the partial results, releasing the parts as it goes
+    merged_keys = np.concatenate(keys)
+    keys.clear()
+    columns = []
+    for i in range(len(sums[0])):
+        columns.append(np.concatenate([part[i] for part in sums]))
+        for part in sums:
+            part[i] = None
+    sums.clear()
+    merged_keys, columns = _reduce(merged_keys, columns)
+    return [merged_keys], [columns]
+
+
+def aggregate_monthly(source, chunksize: int = DEFAULT_CHUNKSIZE, progress=None) -> pd.DataFrame:
+    """
+    Streams a utilities file into one row per asset and month.
+
+    Rows are read chunk by chunk and each chunk is reduced to (asset, month)
+    sums on packed integer keys; the partial sums are merged every
+    COMBINE_EVERY chunks, so memory is bounded by the number of distinct
+    asset-months rather than by the file. Several readings for the same
+    asset and month are summed; rows without an asset or a parseable month
+    are skipped.
+
+    Args:
+        source: Path or binary buffer of a utilities CSV, or an already
+            validated utilities DataFrame (processed in slices).
+        chunksize (int): Rows per chunk.
+        progress (callable): Optional progress(rows_read) callback.
+
+    Returns:
+        DataFrame: 'asset' (categorical), 'month' (Period[M]) and one
+        float32 column per measure present ('energy_kwh', 'water_m3',
+        'waste_kg'), sorted by asset and month.
+    """
+    assets, keys, sums, rows, measures = {}, [], [], 0, None
+    for chunk in _chunks(source, chunksize):
+        measures = measures or {col: name for col, name in MEASURES.items() if col in chunk.columns}
+        codes = _asset_codes(chunk["Asset Name"], assets)
+        months = _month_ordinals(chunk["Month"])
+        valid = (codes >= 0) & (months >= 0)
+        # asset code in the high 32 bits, month ordinal (offset to be non-negative) in the low 32
+        chunk_keys = (codes[valid].astype(np.int64) << 32) + (months[valid].astype(np.int64) + MONTH_OFFSET)
+        values = [pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype="float64")[valid] for col in measures]
+        chunk_keys, values = _reduce(chunk_keys, values)
+        keys.append(chunk_keys)
+        sums.append(values)
+        if len(keys) >= COMBINE_EVERY:
+            keys, sums = _merge(keys, sums)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows)
+
+    measures = measures or {}
+    keys, sums = _merge(keys, sums) if keys else ([np.array([], dtype=np.int64)], [[np.array([])] * len(measures)])
+    keys, sums = keys[0], sums[0]
+    monthly = pd.DataFrame({
+        "asset": pd.Categorical.from_codes((keys >> 32).astype(np.int32), categories=list(assets)),
+        "month": pd.PeriodIndex.from_ordinals((keys & 0xFFFFFFFF) - MONTH_OFFSET, freq="M"),
+    })
+    for i, name in enumerate(measures.values()):
+        monthly[name] = sums[i].astype("float32", copy=False)
+    return monthly
+
+
+def _factor_table() -> tuple:
+    """
+    Electricity emission factors as (countries Index, years, matrix); the last
+    row is the cross-country mean, used for countries without factors.
+    """
+    version = reference_version(EMISSION_FACTORS)
+    cached = _factor_cache.get("factors")
+    if cached is None or cached[0] != version:
+        table = load_reference(EMISSION_FACTORS).pivot_table(
+            index="Country", columns="Year", values=ELECTRICITY_FACTOR_COLUMN, aggfunc="first"
+        ).sort_index(axis=1).ffill(axis=1).bfill(axis=1)
+        matrix = np.vstack([table.to_numpy(dtype=float), table.mean().to_numpy(dtype=float)])
+        _factor_cache["factors"] = cached = (version, (table.index, table.columns.to_numpy(dtype=int), matrix))
+    return cached[1]
+
+
+def asset_attributes(assets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Floor area and country per asset name from an assets file (first row
+    wins for repeated names).
+
+    Returns:
+        DataFrame: Indexed by 'Asset Name' with 'floor_area' and 'country'.
+    """
+    country = next((col for col in ["country_code", "Location"] if col in assets.columns), None)
+    attributes = pd.DataFrame({
+        "Asset Name": assets["Asset Name"].astype(object).to_numpy(),
+        "floor_area": pd.to_numeric(assets["Floor Area (m²)"], errors="coerce").to_numpy(dtype="float64"),
+        "country": assets[country].astype(object).to_numpy() if country else None,
+    })
+    return attributes.drop_duplicates("Asset Name").set_index("Asset Name")
+
+
+def add_carbon(monthly: pd.DataFrame, attributes: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Adds 'carbon_kg' (energy x the grid factor of the asset's country in
+    that month's year) to a monthly frame.
+
+    Countries come from asset_attributes(); assets without a known country
+    use the cross-country mean factor. Years outside the factor table use
+    its first or last year.
+    """
+    countries, years, matrix = _factor_table()
+    asset_names = monthly["asset"].cat.categories
+    if attributes is not None:
+        asset_country = attributes["country"].reindex(asset_names)
+    else:
+        asset_country = pd.Series(None, index=asset_names, dtype=object)
+    country_ids = country_positions(countries, asset_country.fillna("").reset_index(drop=True))
+    row_ids = country_ids[monthly["asset"].cat.codes.to_numpy()]
+    year_ids = np.clip(monthly["month"].dt.year.to_numpy() - years[0], 0, len(years) - 1)
+    factors = matrix[row_ids, year_ids]  # -1 selects the fallback row
+    return monthly.assign(carbon_kg=(monthly["energy_kwh"].to_numpy(dtype="float64") * factors).astype("float32"))
+
+
+def _intensities(frame: pd.DataFrame, attributes: pd.DataFrame, suffix: str = "") -> pd.DataFrame:
+    if attributes is None:
+        return frame
+    # per-asset lookup through the category codes instead of per-row name lookups
+    floor_area = attributes["floor_area"].reindex(frame["asset"].cat.categories).to_numpy(dtype="float64")
+    floor_area = np.where(floor_area > 0, floor_area, np.nan)
+    floor_area = np.append(floor_area, np.nan)[frame["asset"].cat.codes.to_numpy()]
+    return frame.assign(**{
+        f"{kind}_intensity{suffix}": (frame[f"{measure}{suffix}"].to_numpy(dtype="float64") / floor_area).astype("float32")
+        for kind, measure in [("energy", "energy_kwh"), ("carbon", "carbon_kg")] if f"{measure}{suffix}" in frame.columns
+    })
+
+
+def annual_totals(monthly: pd.DataFrame, attributes: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Sums a monthly frame (with carbon, see add_carbon) to one row per asset
+    and calendar year, with 'months' counting the months reported and, when
+    attributes are given, energy and carbon intensities per m².
+    """
+    measures = [col for col in ["energy_kwh", "water_m3", "waste_kg", "carbon_kg"] if col in monthly.columns]
+    annual = monthly.assign(year=monthly["month"].dt.year).groupby(["asset", "year"], observed=True, sort=True)
+    totals = annual[measures].sum()
+    totals.insert(0, "months", annual.size().astype("int16"))
+    return _intensities(totals.reset_index(), attributes)
+
+
+def rolling_totals(monthly: pd.DataFrame, attributes: pd.DataFrame = None, window: int = ROLLING_MONTHS) -> pd.DataFrame:
+    """
+    Trailing calendar-window sums per asset and month.
+
+    Each row sums the asset's readings from `window` calendar months back up
+    to that month; 'months_in_window' counts the months actually reported,
+    so gaps show up as incomplete windows rather than shifting the window.
+    Computed with cumulative sums and a binary search over (asset, month)
+    keys, without a dense asset x month grid.
+
+    Returns:
+        DataFrame: 'asset', 'month', '<measure>_12m' per measure,
+        'months_in_window' and, with attributes, 'energy_intensity_12m' and
+        'carbon_intensity_12m' (per m² of floor area).
+    """
+    suffix = f"_{window}m"
+    measures = [col for col in ["energy_kwh", "water_m3", "waste_kg", "carbon_kg"] if col in monthly.columns]
+    codes = monthly["asset"].cat.codes.to_numpy(dtype=np.int64)
+    months = monthly["month"].array.asi8
+    if len(months):
+        months = months - months.min()
+    span = (months.max() if len(months) else 0) + window + 1
+    keys = codes * span + months
+    if len(keys) and (np.diff(keys) < 0).any():  # aggregate_monthly output is already sorted
+        order = np.argsort(keys, kind="stable")
+        monthly, keys = monthly.iloc[order], keys[order]
+    starts = np.searchsorted(keys, keys - (window - 1), side="left")
+    positions = np.arange(len(keys))
+
+    rolling = pd.DataFrame({"asset": monthly["asset"].array, "month": monthly["month"].array})
+    for col in measures:
+        sums = np.concatenate([[0.0], np.cumsum(np.nan_to_num(monthly[col].to_numpy(dtype="float64")))])
+        rolling[f"{col}{suffix}"] = (sums[positions + 1] - sums[starts]).astype("float32")
+    rolling["months_in_window"] = (positions - starts + 1).astype("int16")
+    return _intensities(rolling, attributes, suffix)
+
+
+def latest_rolling(rolling: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns each asset's most recent trailing-window row, indexed by asset name.
+    """
+    last = rolling.drop_duplicates("asset", keep="last")
+    return last.set_index(last["asset"].astype(object)).drop(columns="asset")
+
+
+def with_measured_energy(assets: pd.DataFrame, latest: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces an assets frame's 'Energy Intensity (kWh/m²)' with the measured
+    trailing-window intensity (see latest_rolling) where the utilities data
+    covers the asset; other assets keep the value derived from their static
+    'Energy Consumption (kWh)'. Adds 'Energy Intensity Source' ('utilities'
+    or 'static').
+    """
+    measured = latest["energy_intensity_12m"].astype("float32").reindex(assets["Asset Name"].astype(object)).to_numpy()
+    static = assets["Energy Intensity (kWh/m²)"].to_numpy(dtype="float32", na_value=np.nan)
+    has_measured = ~np.isnan(measured)
+    return assets.assign(**{
+        "Energy Intensity (kWh/m²)": np.where(has_measured, measured, static),
+        "Energy Intensity Source": pd.Categorical(np.where(has_measured, "utilities", "static"),
+                                                  categories=["utilities", "static"]),
+    })
+
+
+@timed("calculate", "utilities pipeline")
+def utilities_kpis(source, assets: pd.DataFrame = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                   window: int = ROLLING_MONTHS, progress=None) -> dict:
+    """
+    Runs the utilities pipeline: monthly aggregation, carbon, annual totals
+    and trailing-window intensities.
+
+    Args:
+        source: Utilities CSV (path or buffer) or validated DataFrame.
+        assets (DataFrame): Assets file supplying floor area and country;
+            without it no intensities are computed and carbon uses the
+            cross-country mean factor.
+        chunksize (int): Rows per chunk when streaming.
+        window (int): Trailing window in calendar months.
+        progress (callable): Optional progress(rows_read) callback.
+
+    Returns:
+        dict: {'monthly', 'annual', 'rolling', 'latest'} DataFrames (see
+        aggregate_monthly, annual_totals, rolling_totals, latest_rolling).
+    """
+    attributes = asset_attributes(assets) if assets is not None else None
+    monthly = aggregate_monthly(source, chunksize=chunksize, progress=progress)
+    if "energy_kwh" in monthly.columns:
+        monthly = add_carbon(monthly, attributes)
+    rolling = rolling_totals(monthly, attributes, window)
+    return {
+        "monthly": monthly,
+        "annual": annual_totals(monthly, attributes),
+        "rolling": rolling,
+        "latest": latest_rolling(rolling),
+    }
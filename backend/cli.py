@@ -0,0 +1,52 @@
+"""
+Command-line runner for CRREM, ROI and transition-plan batches.
+
+Run from the repository root:
+    python -m backend.cli crrem data/raw_uploads/ --output-dir results --format parquet --workers 4
+    python -m backend.cli roi roi_batch.csv --horizon 20 --scenario "High Tax" --db data/results.sqlite
+"""
+import argparse
+import sys
+
+from backend.api import ANALYSES, OUTPUT_FORMATS, run_paths
+from backend.calculators.crrem_batch import DEFAULT_CAPEX_PER_M2, DEFAULT_TENANT_RATIO
+from backend.calculators.roi import DEFAULT_HORIZON_YEARS, DEFAULT_PRICE_SCENARIO
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("analysis", choices=list(ANALYSES))
+    parser.add_argument("inputs", nargs="+", help="Batch files (CSV, Parquet, Excel) or directories of them")
+    parser.add_argument("--output-dir", help="Directory for the results (default: next to each input)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", dest="fmt")
+    parser.add_argument("--db", help="Also store the results as runs in this SQLite result database")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes: files in parallel, or partitions of a single file")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON_YEARS, help="roi: years of savings")
+    parser.add_argument("--scenario", default=DEFAULT_PRICE_SCENARIO, help="roi: energy Price_Scenario")
+    parser.add_argument("--tenant-ratio", type=float, default=DEFAULT_TENANT_RATIO, help="crrem: tenant share of CapEx")
+    parser.add_argument("--capex-per-m2", type=float, default=DEFAULT_CAPEX_PER_M2, help="crrem: CapEx when no capex column")
+    args = parser.parse_args(argv)
+
+    options = {
+        "crrem": {"tenant_ratio": args.tenant_ratio, "capex_per_m2": args.capex_per_m2},
+        "roi": {"horizon_years": args.horizon, "scenario": args.scenario},
+        "transition": {},
+    }[args.analysis]
+    summaries = run_paths(args.inputs, args.analysis, output_dir=args.output_dir, fmt=args.fmt,
+                          workers=args.workers, db=args.db, **options)
+
+    for summary in summaries:
+        if summary["status"] == "success":
+            print(f"{summary['input']} -> {summary['output']}: {summary['rows']:,} rows, "
+                  f"{summary['errors']:,} with errors ({summary['seconds']:.2f} s)"
+                  + (f", run {summary['run_id']}" if summary["run_id"] else ""))
+        else:
+            print(f"{summary['input']}: failed: {summary['message']}", file=sys.stderr)
+    if not summaries:
+        print("No batch files found.", file=sys.stderr)
+    return 0 if summaries and all(s["status"] == "success" for s in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
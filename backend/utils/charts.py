@@ -0,0 +1,156 @@
+"""
+Cached chart rendering for the pages.
+
+Charts are drawn on standalone matplotlib Figures, never through pyplot,
+so no global figure registry grows with every rerun. Each figure is rendered
+to PNG once and cleared straight away. The PNG is kept in a bounded LRU
+keyed by the chart name and a key covering everything the chart shows:
+asset inputs, parameters and reference versions (see pathways.pathway_version).
+A rerun with the same inputs shows the cached image without importing or
+drawing anything. `array_key` hashes arrays for charts of computed results.
+
+    show_chart("stranding", (asset_id, pathway_version()), lambda fig: draw_stranding(fig.subplots(), ...))
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from backend.utils.instrumentation import register_cache, span
+
+MAX_CHARTS = 256
+# As st.pyplot: sharp on high-DPI screens, whitespace cropped
+SAVEFIG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+FIGSIZE = (6.4, 4.8)
+
+_cache = OrderedDict()  # (name, key) -> PNG bytes, least recently used first
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def array_key(*arrays) -> str:
+    """
+    Returns a content hash of arrays (shape, dtype and values), for keying charts of computed results.
+    """
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(repr((array.shape, array.dtype.str)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def render_png(draw, figsize=FIGSIZE) -> bytes:
+    """
+    Draws a chart with draw(fig) on a new Figure and returns it as PNG.
+    """
+    # Deferred: matplotlib is only needed when a chart is not cached yet
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    try:
+        draw(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, **SAVEFIG_OPTIONS)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def cached_chart(name: str, key, draw, figsize=FIGSIZE) -> bytes:
+    """
+    Returns the chart's PNG, drawing it with draw(fig) only if (name, key) is not cached.
+
+    Args:
+        name (str): Chart name; also names the render span.
+        key: Hashable value covering every input the chart depends on.
+        draw: Draws on a matplotlib Figure (e.g. via fig.subplots()).
+        figsize (tuple): Figure size in inches.
+
+    Returns:
+        bytes: PNG image.
+    """
+    cache_key = (name, key, figsize)
+    with _lock:
+        png = _cache.get(cache_key)
+        if png is not None:
+            _cache.move_to_end(cache_key)
+            _stats["hits"] += 1
+            return png
+        _stats["misses"] += 1
+    with span("render", name):
+        png = render_png(draw, figsize)
+    with _lock:
+        _cache[cache_key] = png
+        while len(_cache) > MAX_CHARTS:
+            _cache.popitem(last=False)
+            _stats["evictions"] += 1
+    return png
+
+
+def show_chart(name: str, key, draw, figsize=FIGSIZE):
+    """
+    Shows a cached chart at the container width (see cached_chart).
+    """
+    st.image(cached_chart(name, key, draw, figsize), width="stretch")
+
+
+def draw_pathway_bands(fig, bands: dict, layout: str = "small multiples", columns: int = 3):
+    """
+    Draws portfolio intensity against CRREM targets from crrem_batch.pathway_bands.
+
+    'small multiples' gives one panel per pathway with its sampled asset
+    curves, the outer percentile band, the median and the target. 'overlay'
+    draws every pathway's median (solid) and target (dashed) on one axes,
+    one color per pathway. Small multiples resize the figure to the grid.
+    """
+    years, percentiles = bands["years"], bands["percentiles"]
+    groups = list(zip(bands["labels"], bands["counts"], bands["targets"], bands["bands"], bands["lines"]))
+    if not groups:
+        fig.subplots().text(0.5, 0.5, "No assets with a pathway", ha="center", va="center")
+        return
+    if layout == "overlay":
+        ax = fig.subplots()
+        for k, ((region, asset_class), count, target, band, _) in enumerate(groups):
+            color = f"C{k % 10}"
+            ax.plot(years, band[len(band) // 2], color=color, label=f"{region} – {asset_class} (n={count:,})")
+            ax.plot(years, target, color=color, linestyle="--")
+        ax.set_title("Median intensity (solid) vs CRREM target (dashed)")
+        ax.set_xlabel("Year")
+        ax.set_ylabel("kgCO2/m²")
+        ax.legend(fontsize="small")
+        return
+
+    rows, columns = -(-len(groups) // columns), min(columns, len(groups))
+    fig.set_size_inches(3.2 * columns, 2.6 * rows)
+    axes = fig.subplots(rows, columns, sharex=True, squeeze=False).ravel()
+    for ax, ((region, asset_class), count, target, band, lines) in zip(axes, groups):
+        ax.plot(years, lines.T, color="grey", linewidth=0.5, alpha=0.4)
+        ax.fill_between(years, band[0], band[-1], color="#184999", alpha=0.25,
+                        label=f"P{percentiles[0]}–P{percentiles[-1]}")
+        ax.plot(years, band[len(band) // 2], color="#184999", label="Median")
+        ax.plot(years, target, color="green", label="CRREM Target")
+        ax.set_title(f"{region} – {asset_class} (n={count:,})", fontsize="small")
+        ax.tick_params(labelsize="small")
+    for ax in axes[len(groups):]:
+        ax.set_visible(False)
+    axes[0].legend(fontsize="x-small")
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: charts, bytes, hits, misses and evictions.
+    """
+    with _lock:
+        return {"charts": len(_cache), "bytes": sum(len(png) for png in _cache.values()), **_stats}
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+register_cache("charts", cache_info)
@@ -0,0 +1,25 @@
+"""
+Column coercion shared by the batch calculators.
+
+Batches arrive from uploads, the CLI and the API with numbers as strings,
+blanks or text; the calculators coerce each input column once and turn the
+values that could not be parsed into row errors instead of failing.
+"""
+import numpy as np
+import pandas as pd
+
+
+def numeric_column(df: pd.DataFrame, column: str) -> tuple:
+    """
+    Coerces a column to float and flags values that could not be parsed.
+
+    A column the batch does not have is all NaN, with nothing flagged.
+
+    Returns:
+        tuple: (float ndarray, bool ndarray marking unparseable non-null values)
+    """
+    if column not in df.columns:
+        return np.full(len(df), np.nan), np.zeros(len(df), dtype=bool)
+    values = pd.to_numeric(df[column], errors="coerce")
+    invalid = values.isna().to_numpy() & df[column].notna().to_numpy()
+    return values.to_numpy(dtype=float), invalid
@@ -0,0 +1,158 @@
+"""
+Server-side aggregates for the portfolio pages.
+
+The pages send the browser pre-aggregated data instead of per-asset rows:
+pre-binned histograms, grouped KPIs, one page of the table at a time and
+downsampled scatter data (top-N lists come from the portfolio summary, see
+incremental.PortfolioAggregates). That keeps the payload bounded by the
+number of bins, groups, page size or MAX_CHART_POINTS rather than by the
+size of the portfolio. Results are memoized per portfolio (its content-hash
+key), so widget reruns do not repeat the work.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.instrumentation import register_cache
+
+PAGE_SIZE = 50
+HISTOGRAM_BINS = 40
+MAX_CHART_POINTS = 2000
+MAX_CACHED = 64
+
+# Group-by dimensions offered by the dashboard, each filled from the first column present
+GROUP_DIMENSIONS = {
+    "Country": ["country_code", "Location"],
+    "Asset class": ["asset_class", "Property Type"],
+    "EPC rating": ["EPC Rating"],
+    "Inferred EPC band": ["EPC Band (inferred)"],
+}
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def memoized(key: tuple, func, *args, **kwargs):
+    """
+    Returns func(*args, **kwargs), computed once per key (least recently used
+    results are dropped beyond MAX_CACHED).
+
+    Args:
+        key (tuple): Identifies the result, e.g. (portfolio key, 'histogram', column).
+    """
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _cache[key]
+        _stats["misses"] += 1
+    result = func(*args, **kwargs)
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return result
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: memoized results, hits and misses.
+    """
+    with _lock:
+        return {"entries": len(_cache), **_stats}
+
+
+register_cache("dashboard aggregates", cache_info)
+
+
+def group_columns(df: pd.DataFrame) -> dict:
+    """
+    Returns the GROUP_DIMENSIONS available in a frame as {label: column}.
+    """
+    found = {}
+    for label, candidates in GROUP_DIMENSIONS.items():
+        column = next((col for col in candidates if col in df.columns), None)
+        if column is not None:
+            found[label] = column
+    return found
+
+
+def histogram(values: pd.Series, bins: int = HISTOGRAM_BINS, value_range: tuple = None) -> pd.DataFrame:
+    """
+    Bins a numeric column server-side.
+
+    Returns:
+        DataFrame: One row per bin with 'bin_start', 'bin_end', 'bin_mid'
+        and 'count'; missing values are left out.
+    """
+    data = values.to_numpy(dtype="float64", na_value=np.nan)
+    data = data[~np.isnan(data)]
+    if not len(data):
+        return pd.DataFrame(columns=["bin_start", "bin_end", "bin_mid", "count"])
+    counts, edges = np.histogram(data, bins=bins, range=value_range)
+    return pd.DataFrame({
+        "bin_start": edges[:-1],
+        "bin_end": edges[1:],
+        "bin_mid": (edges[:-1] + edges[1:]) / 2,
+        "count": counts,
+    })
+
+
+def grouped_kpis(df: pd.DataFrame, by: str, metrics: dict) -> pd.DataFrame:
+    """
+    Aggregates KPIs per group, e.g. per country or EPC band.
+
+    Args:
+        df (DataFrame): Portfolio.
+        by (str): Column to group by.
+        metrics (dict): {column: aggregation} such as {'Carbon Intensity (kgCO2e/m²)': 'mean'};
+            columns missing from the frame are skipped.
+
+    Returns:
+        DataFrame: One row per group with 'Assets' and one column per metric.
+    """
+    metrics = {col: func for col, func in metrics.items() if col in df.columns}
+    grouped = df.groupby(by, observed=True, sort=True)
+    result = grouped.agg(**{col: (col, func) for col, func in metrics.items()})
+    result.insert(0, "Assets", grouped.size())
+    return result.reset_index()
+
+
+def page(df: pd.DataFrame, number: int, size: int = PAGE_SIZE) -> tuple:
+    """
+    Returns one page of rows.
+
+    Args:
+        number (int): Page number, starting at 1; clipped to the last page.
+
+    Returns:
+        tuple: (DataFrame of at most `size` rows, number of pages)
+    """
+    pages = max(1, math.ceil(len(df) / size))
+    number = min(max(1, int(number)), pages)
+    return df.iloc[(number - 1) * size:number * size], pages
+
+
+def downsample(df: pd.DataFrame, max_points: int = MAX_CHART_POINTS, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns at most max_points rows for per-asset charts.
+
+    Rows are sampled uniformly (reproducibly) in their original order; the
+    rows holding each numeric column's minimum and maximum are always kept
+    so the chart's extent is preserved.
+    """
+    if len(df) <= max_points:
+        return df
+    keep = set()
+    for col in df.select_dtypes("number").columns:
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        if not np.isnan(values).all():
+            keep.update((int(np.nanargmin(values)), int(np.nanargmax(values))))
+    keep = np.fromiter(keep, dtype=np.int64, count=len(keep))
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(df), size=max(0, max_points - len(keep)), replace=False).astype(np.int64)
+    return df.iloc[np.unique(np.concatenate([keep, sample]))]
@@ -0,0 +1,60 @@
+"""
+Diagnostics view of the instrumentation data (see instrumentation).
+
+Not linked from the navigation: the home page renders it when opened with
+?diagnostics=1. It switches recording and cProfile capture on and off for
+the whole process and shows p50/p95 per stage, the slowest steps, the
+most recent spans, counters and cache statistics, with a JSON download of
+everything recorded.
+"""
+import json
+
+import pandas as pd
+import streamlit as st
+
+from backend.utils import instrumentation
+
+RECENT_SPANS = 200
+
+
+def render_diagnostics():
+    st.header("🩺 Diagnostics")
+
+    col1, col2, col3 = st.columns(3)
+    recording = col1.toggle("Record timings", value=instrumentation.enabled())
+    profiling = col2.toggle("Capture cProfile", value=instrumentation.profiling(),
+                            help="Profiles the outermost timed step; adds noticeable overhead.")
+    if recording != instrumentation.enabled():
+        instrumentation.enable(recording)
+    if profiling != instrumentation.profiling():
+        instrumentation.set_profiling(profiling)
+    if col3.button("Reset"):
+        instrumentation.reset()
+
+    if not instrumentation.enabled():
+        st.info("Recording is off. Switch it on, then use the other pages and come back here.")
+
+    summary = instrumentation.summary()
+    if summary:
+        st.subheader("Per stage")
+        st.dataframe(pd.DataFrame(summary), hide_index=True)
+        st.subheader("Per step")
+        st.dataframe(pd.DataFrame(instrumentation.summary(by_name=True)), hide_index=True)
+        st.subheader(f"Last {RECENT_SPANS} spans")
+        recent = pd.DataFrame(instrumentation.spans(RECENT_SPANS)[::-1])
+        recent["start"] = pd.to_datetime(recent["start"], unit="s")
+        st.dataframe(recent, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    col1.subheader("Counters")
+    col1.json(instrumentation.counters())
+    col2.subheader("Caches")
+    col2.json(instrumentation.cache_stats())
+
+    report = instrumentation.profile_report()
+    if report:
+        st.subheader("cProfile (cumulative)")
+        st.code(report)
+
+    st.download_button("📥 Download diagnostics JSON", json.dumps(instrumentation.export(), indent=2, default=str),
+                       file_name="diagnostics.json", mime="application/json")
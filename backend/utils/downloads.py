@@ -0,0 +1,29 @@
+import streamlit as st
+
+from backend.utils.exports import EXPORT_FORMATS, deferred
+
+FORMAT_LABELS = {"xlsx": "Excel", "csv": "CSV", "json": "JSON", "ndjson": "NDJSON", "parquet": "Parquet", "html": "HTML"}
+
+
+def download_buttons(df, file_stem: str, formats=("xlsx", "csv", "ndjson", "parquet"), label: str = "📥 Download",
+                     key: str = None):
+    """
+    Shows one download button per format, side by side.
+
+    Files are rendered only when a button is clicked (see exports.deferred)
+    and then cached per result, so reruns never regenerate them and
+    clicking does not rerun the page.
+
+    Args:
+        df (DataFrame): Result table.
+        file_stem (str): File name without extension; also keys the widgets.
+        formats: Formats from exports.EXPORT_FORMATS.
+        label (str): Button text, followed by the format name.
+        key (str): Identifies the result (e.g. a portfolio key); defaults to
+            a hash of df, computed on click.
+    """
+    for column, fmt in zip(st.columns(len(formats)), formats):
+        extension, mime = EXPORT_FORMATS[fmt]
+        column.download_button(f"{label} {FORMAT_LABELS[fmt]}", data=deferred(df, fmt, key),
+                               file_name=f"{file_stem}.{extension}", mime=mime, on_click="ignore",
+                               key=f"download_{file_stem}_{fmt}")
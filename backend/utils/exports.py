@@ -0,0 +1,321 @@
+"""
+Streaming export of result tables to Excel, CSV, JSON, NDJSON, Parquet and HTML.
+
+Every format is written chunk by chunk (CHUNK_ROWS rows at a time) to a
+binary handle, so exporting a large result never holds a second full copy
+of it as Python objects: Excel worksheets are formatted column-wise and
+streamed into the package (one sheet per EXCEL_MAX_ROWS rows), Parquet
+gets one row group per chunk, and JSON and HTML are assembled from
+per-chunk fragments.
+
+export_bytes() renders a table once per (result hash, format) and keeps
+the files in a process-wide cache bounded by MAX_CACHE_BYTES, so reruns
+and repeated downloads do not regenerate them. Pages pass deferred(...)
+to st.download_button, which only renders the file when the user clicks.
+"""
+import hashlib
+import html
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.instrumentation import register_cache, span
+
+CHUNK_ROWS = 50_000
+# Rows per Excel sheet, below the format's limit of 1,048,576 including the header
+EXCEL_MAX_ROWS = 1_000_000
+MAX_CACHE_BYTES = 256 * 1024 ** 2
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+    "json": ("json", "application/json"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "html": ("html", "text/html"),
+}
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def result_hash(df: pd.DataFrame) -> str:
+    """
+    Returns a content hash of a table (column names, dtypes and values).
+    """
+    digest = hashlib.sha1()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _chunks(df: pd.DataFrame, size: int = CHUNK_ROWS):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+def _text(handle):
+    # Text view of a binary handle; detached after writing so the handle stays open
+    return io.TextIOWrapper(handle, encoding="utf-8", newline="")
+
+
+# Minimal SpreadsheetML package around the streamed worksheets (inline strings, no styles)
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        "{overrides}</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        "<sheets>{sheets}</sheets></workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        "{relationships}</Relationships>"
+    ),
+}
+
+
+def _column_letters(n: int) -> list:
+    letters = []
+    for i in range(n):
+        name = ""
+        i += 1
+        while i:
+            i, rem = divmod(i - 1, 26)
+            name = chr(65 + rem) + name
+        letters.append(name)
+    return letters
+
+
+def _xlsx_cells(values: pd.Series, reference: pd.Series) -> pd.Series:
+    # One <c> element per row; missing values give an empty string (no cell)
+    if pd.api.types.is_bool_dtype(values):
+        text = values.astype(object).map({True: "1", False: "0"}).fillna("")
+        kind, open_value, close_value = ' t="b"', "<v>", "</v>"
+    elif pd.api.types.is_numeric_dtype(values):
+        numbers = values.astype(float)
+        text = numbers.astype(str).where(np.isfinite(numbers), "")
+        kind, open_value, close_value = "", "<v>", "</v>"
+    else:
+        text = values.astype(object).where(values.notna(), "").astype(str).map(html.escape)
+        # Control characters are not allowed in XML
+        text = text.str.replace(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", regex=True)
+        kind, open_value, close_value = ' t="inlineStr"', "<is><t>", "</t></is>"
+    cells = '<c r="' + reference + '"' + kind + ">" + open_value + text + close_value + "</c>"
+    return cells.where(text != "", "")
+
+
+def _write_sheet(part, df: pd.DataFrame):
+    letters = _column_letters(len(df.columns))
+    header = "".join(f'<c r="{letter}1" t="inlineStr"><is><t>{html.escape(str(col))}</t></is></c>'
+                     for letter, col in zip(letters, df.columns))
+    part.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                f'<row r="1">{header}</row>').encode())
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].reset_index(drop=True)
+        numbers = pd.Series(np.arange(start + 2, start + 2 + len(chunk))).astype(str)
+        rows = '<row r="' + numbers + '">'
+        for letter, col in zip(letters, chunk.columns):
+            rows = rows + _xlsx_cells(chunk[col], letter + numbers)
+        part.write("".join(rows + "</row>").encode())
+    part.write(b"</sheetData></worksheet>")
+
+
+def _write_xlsx(df: pd.DataFrame, handle):
+    # Written directly rather than through openpyxl, whose write-only mode
+    # still serializes every cell through Python XML objects (about 10 s per
+    # million cells); here each chunk of rows is formatted column-wise.
+    starts = list(range(0, max(len(df), 1), EXCEL_MAX_ROWS))
+    names = [f"Results {i + 1}" if len(starts) > 1 else "Results" for i in range(len(starts))]
+    with zipfile.ZipFile(handle, "w", zipfile.ZIP_DEFLATED) as package:
+        for i, start in enumerate(starts):
+            with package.open(f"xl/worksheets/sheet{i + 1}.xml", "w", force_zip64=True) as part:
+                _write_sheet(part, df.iloc[start:start + EXCEL_MAX_ROWS])
+        ids = range(1, len(starts) + 1)
+        package.writestr("[Content_Types].xml", _XLSX_PARTS["[Content_Types].xml"].format(overrides="".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for i in ids)))
+        package.writestr("_rels/.rels", _XLSX_PARTS["_rels/.rels"])
+        package.writestr("xl/workbook.xml", _XLSX_PARTS["xl/workbook.xml"].format(sheets="".join(
+            f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>' for i, name in zip(ids, names))))
+        package.writestr("xl/_rels/workbook.xml.rels", _XLSX_PARTS["xl/_rels/workbook.xml.rels"].format(
+            relationships="".join(
+                f'<Relationship Id="rId{i}" Target="worksheets/sheet{i}.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                for i in ids)))
+
+
+def _write_csv(df: pd.DataFrame, handle):
+    text = _text(handle)
+    df.to_csv(text, index=False, chunksize=CHUNK_ROWS)
+    text.detach()
+
+
+def _write_json(df: pd.DataFrame, handle):
+    # One array of records, written as the records of each chunk
+    text = _text(handle)
+    text.write("[")
+    for i, chunk in enumerate(_chunks(df)):
+        if i:
+            text.write(",")
+        text.write(chunk.to_json(orient="records")[1:-1])
+    text.write("]")
+    text.detach()
+
+
+def _write_ndjson(df: pd.DataFrame, handle):
+    text = _text(handle)
+    for chunk in _chunks(df):
+        # Each chunk's records already end with a newline
+        text.write(chunk.to_json(orient="records", lines=True))
+    text.detach()
+
+
+def _write_parquet(df: pd.DataFrame, handle):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Object columns such as 'error' mix None and str; store them as strings
+    df = df.astype({col: "string" for col in df.columns if df[col].dtype == object})
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(handle, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _html_rows(chunk: pd.DataFrame) -> str:
+    rows = None
+    for col in chunk.columns:
+        values = chunk[col]
+        text = values.astype(object).where(values.notna(), "").astype(str)
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)):
+            text = text.map(html.escape)
+        cells = "<td>" + text + "</td>"
+        rows = cells if rows is None else rows + cells
+    if rows is None:
+        return ""
+    return "".join("<tr>" + rows + "</tr>\n")
+
+
+def _write_html(df: pd.DataFrame, handle):
+    # Same markup as DataFrame.to_html(index=False), built one chunk of rows at a time
+    text = _text(handle)
+    header = "".join(f"<th>{html.escape(str(col))}</th>" for col in df.columns)
+    text.write(f'<table border="1" class="dataframe">\n<thead>\n<tr style="text-align: right;">{header}</tr>\n'
+               f"</thead>\n<tbody>\n")
+    for chunk in _chunks(df):
+        text.write(_html_rows(chunk))
+    text.write("</tbody>\n</table>\n")
+    text.detach()
+
+
+_WRITERS = {
+    "xlsx": _write_xlsx,
+    "csv": _write_csv,
+    "json": _write_json,
+    "ndjson": _write_ndjson,
+    "parquet": _write_parquet,
+    "html": _write_html,
+}
+
+
+def write_export(df: pd.DataFrame, handle, fmt: str):
+    """
+    Streams a table to a binary file handle in one of EXPORT_FORMATS.
+
+    Raises:
+        ValueError: For an unknown format.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+    with span("export", fmt, rows=len(df)):
+        _WRITERS[fmt](df, handle)
+
+
+def _evict(max_bytes: int):
+    total = sum(len(data) for data in _cache.values())
+    # The most recent file is always kept, even if it alone exceeds the cap
+    while len(_cache) > 1 and total > max_bytes:
+        _, evicted = _cache.popitem(last=False)
+        total -= len(evicted)
+        _stats["evictions"] += 1
+
+
+def export_bytes(df: pd.DataFrame, fmt: str, key: str = None) -> bytes:
+    """
+    Returns a table rendered in one of EXPORT_FORMATS, rendered once per
+    result and format and then served from the cache.
+
+    Args:
+        df (DataFrame): Result table.
+        fmt (str): One of EXPORT_FORMATS.
+        key (str): Identifies the result, e.g. a portfolio key; defaults to
+            result_hash(df).
+    """
+    cache_key = (key or result_hash(df), fmt)
+    with _lock:
+        data = _cache.get(cache_key)
+        if data is not None:
+            _cache.move_to_end(cache_key)
+            _stats["hits"] += 1
+            return data
+        _stats["misses"] += 1
+    buffer = io.BytesIO()
+    write_export(df, buffer, fmt)
+    data = buffer.getvalue()
+    with _lock:
+        _cache[cache_key] = data
+        _evict(MAX_CACHE_BYTES)
+    return data
+
+
+def deferred(df: pd.DataFrame, fmt: str, key: str = None):
+    """
+    Returns a no-argument callable rendering the export (see export_bytes),
+    for st.download_button(data=...): nothing is hashed or written until the
+    user clicks.
+    """
+    return lambda: export_bytes(df, fmt, key)
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: files, bytes, hits, misses and evictions.
+    """
+    with _lock:
+        return {"files": len(_cache), "bytes": sum(len(data) for data in _cache.values()), **_stats}
+
+
+def clear_cache():
+    """
+    Drops every cached export.
+    """
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0, evictions=0)
+
+
+register_cache("exports", cache_info)
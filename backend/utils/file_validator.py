@@ -1,30 +1,258 @@
+import os
 
 import pandas as pd
+from pandas.api.types import CategoricalDtype, union_categoricals
+
+from backend.utils.instrumentation import timed
 
 REQUIRED_COLUMNS = {
     "assets": ["Asset Name", "Location", "Floor Area (m²)", "Carbon Intensity (kgCO2e/m²)", "EPC Rating"],
     "utilities": ["Asset Name", "Month", "Energy Consumption (kWh)", "Water Consumption (m³)", "Waste (kg)"],
 }
 
-def validate_csv(file_path: str, file_type: str) -> dict:
+EPC_BANDS = ["A", "B", "C", "D", "E", "F", "G"]
+EPC_DTYPE = CategoricalDtype(EPC_BANDS, ordered=True)
+
+# Compact in-memory schemas applied while loading. Repeated labels become
+# categoricals, measurements float32 (ample for kWh, m² and kgCO2e/m² KPIs).
+# Columns not listed keep the dtype pandas infers.
+SCHEMAS = {
+    "assets": {
+        "Location": "category",
+        "country_code": "category",
+        "asset_class": "category",
+        "Floor Area (m²)": "float32",
+        "Carbon Intensity (kgCO2e/m²)": "float32",
+        "Energy Consumption (kWh)": "float32",
+        "EPC Rating": EPC_DTYPE,
+    },
+    "utilities": {
+        "Asset Name": "category",
+        "Month": "category",
+        "Energy Consumption (kWh)": "float32",
+        "Water Consumption (m³)": "float32",
+        "Waste (kg)": "float32",
+    },
+}
+
+# Row-level checks per file type: (column, rule)
+VALIDATION_RULES = {
+    "assets": [
+        ("Floor Area (m²)", "non_negative"),
+        ("Carbon Intensity (kgCO2e/m²)", "non_negative"),
+        ("Energy Consumption (kWh)", "non_negative"),
+        ("EPC Rating", "epc"),
+    ],
+    "utilities": [
+        ("Month", "date"),
+        ("Energy Consumption (kWh)", "non_negative"),
+        ("Water Consumption (m³)", "non_negative"),
+        ("Waste (kg)", "non_negative"),
+    ],
+}
+
+RULE_MESSAGES = {
+    "non_negative": "must be a non-negative number",
+    "epc": f"must be an EPC band ({EPC_BANDS[0]}–{EPC_BANDS[-1]})",
+    "date": "must be a parseable month/date",
+}
+
+DEFAULT_CHUNKSIZE = 100_000
+MAX_ERROR_SAMPLES = 20
+
+
+def open_source(source):
     """
-    Validates a CSV file against required schema.
+    Returns (binary file object, total size in bytes or None, whether we opened it).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), os.path.getsize(source), True
+    try:
+        size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+    except (AttributeError, OSError):
+        size = None
+    return source, size, False
+
+
+def _invalid_mask(values: pd.Series, rule: str) -> pd.Series:
+    """
+    Flags non-null values that break a rule; nulls are reported separately.
+    """
+    present = values.notna()
+    if rule == "non_negative":
+        numbers = pd.to_numeric(values, errors="coerce")
+        return present & ~(numbers >= 0)
+    if rule == "epc":
+        return present & ~values.astype(str).str.strip().str.upper().isin(EPC_BANDS)
+    if rule == "date":
+        return present & pd.to_datetime(values, errors="coerce", format="mixed").isna()
+    raise ValueError(f"Unknown validation rule: {rule}")
+
+
+def apply_schema(df: pd.DataFrame, file_type: str) -> pd.DataFrame:
+    """
+    Converts the columns of a parsed chunk to the compact dtypes in SCHEMAS.
+
+    Values that cannot be represented (non-numeric measurements, EPC labels
+    outside A–G) become missing; validate_csv_stream reports them beforehand.
+    """
+    for col, dtype in SCHEMAS[file_type].items():
+        if col not in df.columns:
+            continue
+        if isinstance(dtype, CategoricalDtype):
+            df[col] = df[col].astype("string").str.strip().str.upper().astype(dtype)
+        elif dtype == "category":
+            # As string first, so every chunk has string categories (a chunk of numeric-looking
+            # or all-empty labels would otherwise infer int or float ones) and empty cells
+            # stay missing rather than becoming a "nan" label
+            df[col] = df[col].astype("string").astype("category")
+        elif dtype == "float32":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+def _concat_chunks(chunks: list) -> pd.DataFrame:
+    """
+    Concatenates chunks, merging per-chunk categories instead of falling back to object.
+    """
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    data = pd.concat(chunks, ignore_index=True)
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, CategoricalDtype) and not isinstance(data[col].dtype, CategoricalDtype):
+            data[col] = union_categoricals([chunk[col] for chunk in chunks])
+    return data
+
+
+def memory_report(df: pd.DataFrame) -> dict:
+    """
+    Reports the in-memory size of a frame.
+
+    Returns:
+        dict: {'rows': int, 'bytes': int, 'bytes_per_row': float,
+        'columns': {column: bytes}}
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    total = int(usage.sum())
+    return {
+        "rows": len(df),
+        "bytes": total,
+        "bytes_per_row": total / len(df) if len(df) else 0.0,
+        "columns": {col: int(usage[col]) for col in df.columns},
+    }
+
+
+@timed("validate", "validate csv", rows=lambda result: result["rows"])
+def validate_csv_stream(
+    source,
+    file_type: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    progress=None,
+    keep_data: bool = True,
+    max_samples: int = MAX_ERROR_SAMPLES,
+) -> dict:
+    """
+    Validates a CSV chunk by chunk with bounded memory.
+
+    The header is checked first from the start of the file, so a missing
+    column is rejected without parsing the body. Rows are then read in chunks
+    and checked against VALIDATION_RULES; offending rows are counted and a few
+    are kept as samples. Row-level issues are reported but do not fail the
+    file.
 
     Args:
-        file_path (str): Path to the CSV file.
+        source: Path to the CSV file or a binary file-like object such as a
+            Streamlit UploadedFile (read in place from the start, no
+            temporary copy).
         file_type (str): One of ['assets', 'utilities']
+        chunksize (int): Rows per chunk.
+        progress (callable): Optional progress(fraction, rows_read) callback,
+            called after every chunk; fraction is None if the size is unknown.
+        keep_data (bool): Return the parsed DataFrame (with the compact dtypes
+            of SCHEMAS); set to False to only validate, keeping memory bounded
+            by one chunk.
+        max_samples (int): Maximum number of offending rows to return.
 
     Returns:
-        dict: {'status': 'success' or 'error', 'message': str, 'data': DataFrame or None}
+        dict: {'status': 'success' or 'error', 'message': str,
+        'data': DataFrame or None, 'rows': int,
+        'row_errors': {column: count}, 'missing_values': {column: count},
+        'error_samples': list of {'row', 'column', 'value', 'message'}}
     """
+    result = {"status": "error", "message": "", "data": None, "rows": 0,
+              "row_errors": {}, "missing_values": {}, "error_samples": []}
+    handle, owned = None, False
     try:
-        df = pd.read_csv(file_path)
+        handle, size, owned = open_source(source)
 
-        missing_cols = [col for col in REQUIRED_COLUMNS[file_type] if col not in df.columns]
+        header = pd.read_csv(handle, nrows=0).columns
+        missing_cols = [col for col in REQUIRED_COLUMNS[file_type] if col not in header]
         if missing_cols:
-            return {"status": "error", "message": f"Missing columns: {', '.join(missing_cols)}", "data": None}
+            result["message"] = f"Missing columns: {', '.join(missing_cols)}"
+            return result
+        handle.seek(0)
+
+        rules = [(col, rule) for col, rule in VALIDATION_RULES[file_type] if col in header]
+        row_errors = {col: 0 for col, _ in rules}
+        missing_values = {col: 0 for col in REQUIRED_COLUMNS[file_type]}
+        samples, chunks, rows = [], [], 0
 
-        return {"status": "success", "message": "File validated successfully.", "data": df}
+        for chunk in pd.read_csv(handle, chunksize=chunksize):
+            for col in missing_values:
+                missing_values[col] += int(chunk[col].isna().sum())
+            for col, rule in rules:
+                invalid = _invalid_mask(chunk[col], rule)
+                count = int(invalid.sum())
+                row_errors[col] += count
+                if count and len(samples) < max_samples:
+                    for idx, value in chunk.loc[invalid, col].head(max_samples - len(samples)).items():
+                        # +2: header line and 1-based numbering
+                        samples.append({"row": int(idx) + 2, "column": col, "value": value,
+                                        "message": f"{col} {RULE_MESSAGES[rule]}"})
+            rows += len(chunk)
+            if keep_data:
+                chunks.append(apply_schema(chunk, file_type))
+            if progress is not None:
+                fraction = None
+                if size:
+                    fraction = min(handle.tell() / size, 1.0)
+                progress(fraction, rows)
+
+        data = None
+        if keep_data:
+            data = _concat_chunks(chunks) if chunks else pd.DataFrame(columns=header)
+        issues = sum(row_errors.values())
+        result.update(
+            status="success",
+            data=data,
+            message="File validated successfully." if not issues
+            else f"File validated with {issues:,} row-level issue(s).",
+            rows=rows,
+            row_errors={col: n for col, n in row_errors.items() if n},
+            missing_values={col: n for col, n in missing_values.items() if n},
+            error_samples=samples,
+        )
+        return result
 
     except Exception as e:
-        return {"status": "error", "message": str(e), "data": None}
+        result.update(status="error", message=str(e), data=None)
+        return result
+    finally:
+        if handle is not None and owned:
+            handle.close()
+
+
+def validate_csv(file_path, file_type: str) -> dict:
+    """
+    Validates a CSV file against required schema.
+
+    Args:
+        file_path (str or file-like): Path to the CSV file, or an uploaded buffer.
+        file_type (str): One of ['assets', 'utilities']
+
+    Returns:
+        dict: {'status': 'success' or 'error', 'message': str, 'data': DataFrame or None}
+        plus the row-level report described in validate_csv_stream.
+    """
+    return validate_csv_stream(file_path, file_type)
@@ -0,0 +1,201 @@
+"""
+Incremental recomputation of per-asset results.
+
+IncrementalResults keeps the results of a batch calculator keyed by a hash
+of each input row. When a new version of the batch arrives (e.g. a
+re-upload with a few edited rows), only rows whose hash is new are passed to
+the calculator; the others reuse their stored results. The store is reset
+whenever the version token (reference-data versions, calculator options,
+input columns) changes, and is trimmed to the latest batch so it does not
+grow across versions.
+
+PortfolioAggregates keeps portfolio KPIs (means, value counts, top-N) and
+updates them from the rows added and removed between two versions instead
+of rescanning the whole portfolio.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+HASH_NAME = "row_hash"
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns a uint64 hash of every row's values (the index is ignored).
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _repeat(rows: pd.DataFrame, counts: pd.Series) -> pd.DataFrame:
+    # Rows indexed by hash, repeated as often as the hash occurs
+    return rows.loc[rows.index.repeat(counts.reindex(rows.index).to_numpy(dtype=int))]
+
+
+class PortfolioAggregates:
+    """
+    Running portfolio KPIs, updated from added and removed rows.
+
+    Args:
+        mean_columns (list): Numeric columns whose mean is tracked.
+        count_columns (list): Columns whose value counts are tracked.
+        top_column (str): Column ranking the top-N rows (largest first).
+        top_n (int): Number of top rows kept.
+    """
+
+    def __init__(self, mean_columns=(), count_columns=(), top_column: str = None, top_n: int = 5):
+        self.mean_columns = list(mean_columns)
+        self.count_columns = list(count_columns)
+        self.top_column = top_column
+        self.top_n = top_n
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.sums = {col: 0.0 for col in self.mean_columns}
+        self.counts = {col: 0 for col in self.mean_columns}
+        self.value_counts = {col: pd.Series(dtype="int64") for col in self.count_columns}
+        self.top = None
+
+    def update(self, added: pd.DataFrame, removed: pd.DataFrame, current=None):
+        """
+        Applies one version change.
+
+        Args:
+            added (DataFrame): Rows new in this version, indexed by row hash.
+            removed (DataFrame): Rows gone since the last version, indexed by row hash.
+            current (callable): Returns all current rows (indexed by row hash);
+                only called when a removed row was in the top-N.
+        """
+        self.rows += len(added) - len(removed)
+        for col in self.mean_columns:
+            for rows, sign in ((added, 1), (removed, -1)):
+                if col in rows.columns:
+                    values = rows[col].to_numpy(dtype="float64", na_value=np.nan)
+                    self.sums[col] += sign * np.nansum(values)
+                    self.counts[col] += sign * int(np.count_nonzero(~np.isnan(values)))
+        for col in self.count_columns:
+            if col not in added.columns:
+                continue
+            counts = self.value_counts[col].add(added[col].value_counts(), fill_value=0)
+            counts = counts.sub(removed[col].value_counts(), fill_value=0)
+            self.value_counts[col] = counts[counts > 0].astype("int64")
+        if self.top_column is not None and self.top_column in added.columns:
+            self._update_top(added, removed, current)
+
+    def _update_top(self, added, removed, current):
+        # Unless a top row was removed, the new top-N is within the old top-N plus the added rows
+        if self.top is not None and self.top.index.isin(removed.index).any():
+            self.top = None
+        if self.top is None:
+            candidates = current() if current is not None else added
+        else:
+            candidates = pd.concat([self.top, added])
+        self.top = candidates.nlargest(self.top_n, self.top_column)
+
+    def summary(self) -> dict:
+        """
+        Returns a snapshot of the KPIs.
+
+        Returns:
+            dict: {'rows', 'means': {col: mean}, 'value_counts': {col: Series},
+            'top': DataFrame of the top-N rows or None}
+        """
+        return {
+            "rows": self.rows,
+            "means": {col: self.sums[col] / self.counts[col] if self.counts[col] else np.nan
+                      for col in self.mean_columns},
+            "value_counts": {col: counts.copy() for col, counts in self.value_counts.items()},
+            "top": None if self.top is None else self.top.reset_index(drop=True),
+        }
+
+
+class IncrementalResults:
+    """
+    Per-asset result store for one batch calculator.
+
+    Args:
+        func (callable): Batch calculator, DataFrame in and DataFrame out with
+            one row per input row, in input order.
+        output_columns (list): Columns of func's result that are stored.
+        aggregates (PortfolioAggregates): Optional KPIs kept up to date with
+            every version.
+    """
+
+    def __init__(self, func, output_columns, aggregates: PortfolioAggregates = None):
+        self.func = func
+        self.output_columns = list(output_columns)
+        self.aggregates = aggregates
+        self.version = None
+        self.rows = None
+        self.counts = pd.Series(dtype="int64")
+        self.report = {}
+        self._lock = threading.Lock()
+
+    def update(self, df: pd.DataFrame, version=None, **kwargs) -> pd.DataFrame:
+        """
+        Returns func's results for df, recomputing only rows not seen in
+        the stored version.
+
+        Args:
+            df (DataFrame): The new version of the batch.
+            version: Token of everything besides the row values that the
+                results depend on (e.g. reference_version() tuples); a
+                change resets the store.
+            **kwargs: Passed to func.
+
+        Returns:
+            DataFrame: df with the output columns added, same index and order.
+            self.report holds {'rows', 'recomputed', 'reused', 'added',
+            'removed', 'reset'} for this update.
+        """
+        hashes = row_hashes(df)
+        version = (version, tuple(df.columns), tuple(map(str, df.dtypes)))
+        with self._lock:
+            reset = version != self.version or self.rows is None
+            if reset:
+                self.rows = None
+                self.counts = pd.Series(dtype="int64")
+                if self.aggregates is not None:
+                    self.aggregates.reset()
+
+            known = self.rows.index.get_indexer(hashes) >= 0 if self.rows is not None \
+                else np.zeros(len(df), dtype=bool)
+            new_hashes = hashes[~known]
+            first = ~pd.Series(new_hashes).duplicated().to_numpy()
+            stored = self.rows
+            if first.any():
+                computed = self.func(df.iloc[np.flatnonzero(~known)[first]].copy(), **kwargs)
+                computed.index = pd.Index(new_hashes[first], name=HASH_NAME)
+                computed = computed[list(df.columns) + self.output_columns]
+                stored = computed if stored is None else pd.concat([stored, computed])
+
+            counts = pd.Series(hashes).value_counts()
+            delta = counts.sub(self.counts, fill_value=0)
+            added, removed = delta[delta > 0], -delta[delta < 0]
+            if self.aggregates is not None and stored is not None:
+                current = stored.loc[counts.index]
+                self.aggregates.update(
+                    _repeat(stored.loc[added.index], added),
+                    _repeat(stored.loc[removed.index], removed),
+                    current=lambda: _repeat(current, counts),
+                )
+
+            self.version = version
+            self.rows = stored.loc[counts.index] if stored is not None else None
+            self.counts = counts
+            self.report = {
+                "rows": len(df),
+                "recomputed": int(np.count_nonzero(~known)),
+                "reused": int(np.count_nonzero(known)),
+                "added": int(added.sum()),
+                "removed": int(removed.sum()),
+                "reset": reset,
+            }
+            out = df.copy()
+            if self.rows is not None:
+                results = self.rows.loc[hashes, self.output_columns]
+                for col in self.output_columns:
+                    out[col] = results[col].set_axis(df.index)
+            return out
@@ -0,0 +1,308 @@
+"""
+Lightweight timing spans and counters for the app's hot paths.
+
+Code marks a stage with `with span("calculate", "crrem batch", rows=len(df)):`
+or the @timed decorator; the stages used across the app are STAGES. Spans
+add the rows they processed to 'rows.<stage>' counters, and count() tracks
+anything else (e.g. cache hits and misses). Caches register a stats
+function with register_cache() so they show up in the same report.
+
+Everything is off until enable() is called or TA_INSTRUMENT=1 is set:
+span() then returns a shared no-op context and count() returns at once, so
+the disabled cost is a flag check per call. Recorded spans are kept in a
+bounded ring buffer (MAX_SPANS) for the diagnostics view, which shows
+p50/p95 per stage and exports everything as JSON (see export()).
+
+With profiling on (set_profiling), the outermost span of one thread at a
+time also runs under cProfile; the captured calls accumulate in one
+profile until reset().
+"""
+import cProfile
+import functools
+import io
+import math
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+
+STAGES = ["load", "validate", "calculate", "render", "export"]
+MAX_SPANS = 5000
+
+_enabled = os.environ.get("TA_INSTRUMENT", "") not in ("", "0")
+_spans = deque(maxlen=MAX_SPANS)
+_counters = Counter()
+_caches = {}
+_lock = threading.Lock()
+_local = threading.local()
+_profiling = False
+_profile = None
+_profiling_thread = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_rows(self, n: int):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "name", "rows", "started", "wall", "depth", "profiler")
+
+    def __init__(self, stage: str, name: str, rows: int):
+        self.stage, self.name, self.rows = stage, name, rows
+
+    def add_rows(self, n: int):
+        """
+        Adds rows processed inside the span (e.g. per chunk read).
+        """
+        self.rows = (self.rows or 0) + n
+
+    def __enter__(self):
+        global _profiling_thread
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.profiler = None
+        if _profiling and self.depth == 0:
+            with _lock:
+                if _profiling_thread is None and _profile is not None:
+                    _profiling_thread = threading.get_ident()
+                    self.profiler = _profile
+            if self.profiler is not None:
+                try:
+                    self.profiler.enable()
+                except ValueError:  # another profiler is already active
+                    self.profiler = None
+                    with _lock:
+                        _profiling_thread = None
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _profiling_thread
+        seconds = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+            with _lock:
+                _profiling_thread = None
+        _local.depth = self.depth
+        record = {
+            "stage": self.stage,
+            "name": self.name,
+            "start": self.wall,
+            "seconds": seconds,
+            "rows": self.rows,
+            "depth": self.depth,
+            "thread": threading.current_thread().name,
+            "error": exc_type.__name__ if exc_type else None,
+        }
+        with _lock:
+            _spans.append(record)
+            if self.rows:
+                _counters[f"rows.{self.stage}"] += self.rows
+        return False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    """
+    Switches recording on (or off with on=False) for the whole process.
+    """
+    global _enabled
+    _enabled = bool(on)
+
+
+def span(stage: str, name: str = None, rows: int = None):
+    """
+    Context manager timing one step of a stage (one of STAGES).
+
+    Args:
+        stage (str): e.g. 'calculate'.
+        name (str): What ran, e.g. 'crrem batch' or a file name.
+        rows (int): Rows processed, added to the 'rows.<stage>' counter;
+            rows only known later can be added with .add_rows(n).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(stage, name or stage, rows)
+
+
+def _rows(args) -> int:
+    # Rows of the first sized, non-string argument (usually the batch DataFrame)
+    for arg in args:
+        if hasattr(arg, "__len__") and not isinstance(arg, (str, bytes, dict)):
+            return len(arg)
+    return None
+
+
+def timed(stage: str, name: str = None, rows=None):
+    """
+    Decorator recording every call of a function as a span of `stage`.
+
+    Args:
+        stage (str): One of STAGES.
+        name (str): Span name; defaults to the function name.
+        rows (callable): Returns the rows processed from the call's result;
+            by default they are taken from the first sized argument.
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(stage, label, None if rows else _rows(args)) as timing:
+                result = func(*args, **kwargs)
+                if rows:
+                    timing.add_rows(rows(result))
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def count(name: str, n: int = 1):
+    """
+    Adds n to a named counter.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += n
+
+
+def register_cache(name: str, info):
+    """
+    Registers a cache's stats function (returning a dict such as
+    {'hits': ..., 'misses': ...}) for cache_stats().
+    """
+    _caches[name] = info
+
+
+def cache_stats() -> dict:
+    """
+    Returns {cache name: stats} for every registered cache.
+    """
+    return {name: info() for name, info in _caches.items()}
+
+
+def spans(limit: int = None) -> list:
+    """
+    Returns the recorded spans, oldest first (the last `limit` if given).
+    """
+    with _lock:
+        recorded = list(_spans)
+    return recorded[-limit:] if limit else recorded
+
+
+def counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def _percentile(ordered: list, q: float) -> float:
+    # nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summary(by_name: bool = False) -> list:
+    """
+    Aggregates the recorded spans per stage (or per stage and name).
+
+    Returns:
+        list: One dict per group with 'stage' (and 'name'), 'count', 'rows',
+        'total_s', 'p50_ms', 'p95_ms' and 'max_ms', slowest total first.
+    """
+    groups = {}
+    for record in spans():
+        key = (record["stage"], record["name"]) if by_name else (record["stage"],)
+        groups.setdefault(key, []).append(record)
+    rows = []
+    for key, records in groups.items():
+        durations = sorted(record["seconds"] for record in records)
+        row = {"stage": key[0]}
+        if by_name:
+            row["name"] = key[1]
+        row.update({
+            "count": len(records),
+            "rows": sum(record["rows"] or 0 for record in records),
+            "total_s": sum(durations),
+            "p50_ms": _percentile(durations, 50) * 1000,
+            "p95_ms": _percentile(durations, 95) * 1000,
+            "max_ms": durations[-1] * 1000,
+        })
+        rows.append(row)
+    return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+
+def set_profiling(on: bool = True):
+    """
+    Starts (or stops) capturing cProfile data inside outermost spans.
+    """
+    global _profiling, _profile
+    with _lock:
+        _profiling = bool(on)
+        if on and _profile is None:
+            _profile = cProfile.Profile()
+
+
+def profiling() -> bool:
+    return _profiling
+
+
+def profile_report(limit: int = 40, sort: str = "cumulative") -> str:
+    """
+    Returns the captured profile as pstats text (top `limit` functions), or
+    an empty string if nothing was captured.
+    """
+    with _lock:
+        profile = _profile
+    if profile is None:
+        return ""
+    out = io.StringIO()
+    try:
+        pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(limit)
+    except TypeError:  # no data captured yet
+        return ""
+    return out.getvalue()
+
+
+def export() -> dict:
+    """
+    Returns everything recorded, JSON-serializable: {'enabled', 'spans',
+    'summary', 'summary_by_name', 'counters', 'caches'}.
+    """
+    return {
+        "enabled": _enabled,
+        "spans": spans(),
+        "summary": summary(),
+        "summary_by_name": summary(by_name=True),
+        "counters": counters(),
+        "caches": cache_stats(),
+    }
+
+
+def reset():
+    """
+    Drops recorded spans, counters and the captured profile.
+    """
+    global _profile
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _profile = cProfile.Profile() if _profiling else None
@@ -0,0 +1,65 @@
+import streamlit as st
+
+from backend.utils.jobs import default_runner
+
+REFRESH_SECONDS = 1.0
+
+
+def follow_job(job_id: str, preview=None, refresh: float = REFRESH_SECONDS, state_key: str = None):
+    """
+    Shows a background job's progress on the page and returns its result once done.
+
+    While the job is queued or running, a fragment redraws every `refresh`
+    seconds with a progress bar, a Cancel button and the rows finished so
+    far, without rerunning the rest of the page. When the job ends the whole
+    page reruns once, so it can use the result. Cancelled and failed jobs
+    get a Run again button.
+
+    Args:
+        job_id (str): Id from JobRunner.submit.
+        preview: Maps a partial result to the DataFrame shown while running;
+            defaults to showing the partial result itself.
+        refresh (float): Seconds between progress updates.
+        state_key (str): Session state key holding the page's (job_id, ...)
+            tuple; Run again replaces its job id with the restarted job's.
+
+    Returns:
+        The job's result if it is done, else None (still running, cancelled,
+        failed or no longer kept).
+    """
+    runner = default_runner()
+    job = runner.get(job_id)
+    if job is None:
+        st.info("This run's results are no longer kept; run it again to recompute them.")
+        return None
+    if job.status == "done":
+        info = job.info()
+        st.caption(f"{job.name}: {info['rows']:,} rows in {info['seconds']:.1f} s (background job {job.id}).")
+        return job.result()
+    if not job.active:
+        if job.status == "failed":
+            st.error(f"{job.name} failed: {job.message}")
+        else:
+            st.warning(f"{job.name} was cancelled after {job.info()['rows_done']:,} of {job.rows:,} rows.")
+        if st.button("Run again", key=f"restart_job_{job.id}"):
+            new_id = runner.restart(job.id)
+            if state_key and state_key in st.session_state:
+                st.session_state[state_key] = (new_id, *st.session_state[state_key][1:])
+            st.rerun()
+        return None
+
+    @st.fragment(run_every=refresh)
+    def progress():
+        if not job.active:
+            st.rerun()
+        info = job.info()
+        st.progress(info["progress"], text=f"{job.name}: {info['chunks_done']} of {info['chunks']} chunks, "
+                                           f"{info['rows_done']:,} of {info['rows']:,} rows")
+        if st.button("Cancel", key=f"cancel_job_{job.id}"):
+            job.cancel()
+        partial = job.partial()
+        if partial is not None:
+            st.dataframe(preview(partial) if preview else partial)
+
+    progress()
+    return None
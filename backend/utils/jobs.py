@@ -0,0 +1,330 @@
+"""
+Background jobs for long batch and scenario runs.
+
+A JobRunner runs batch calculators on a small thread pool inside the
+Streamlit server process, so no broker or extra service is needed. A job
+applies its calculator to the input one chunk of rows at a time, with each
+chunk optionally partitioned over a ParallelExecutor. It reports progress
+per chunk, exposes the chunks finished so far as a partial result, and stops
+at the next chunk boundary when cancelled.
+
+Jobs are keyed by their name, a hash of the input and a caller-supplied key
+(e.g. the parameters and reference versions). Submitting the same run again,
+on a rerun or after navigating back to a page, returns the existing job
+instead of starting over. Finished jobs are kept, least recently used first
+out, so their results stay available. The runner is process-wide; pages keep
+their job ids in st.session_state.
+
+    runner = default_runner()
+    job_id = runner.submit(compute_roi_batch, batch, name="ROI batch", key=horizon, horizon_years=horizon)
+    job = runner.get(job_id)
+    job.info()["progress"], job.partial(), job.cancel()
+"""
+import atexit
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from backend.utils.exports import result_hash
+from backend.utils.instrumentation import register_cache, span
+from backend.utils.parallel import ParallelExecutor
+
+# Rows per chunk: the unit of progress, partial results and cancellation
+DEFAULT_CHUNK_ROWS = 25_000
+# Jobs running at once; more wait in the queue
+DEFAULT_THREADS = 2
+# Finished jobs kept with their results
+MAX_JOBS = 32
+# Batches below this size are computed inline; polling would only add latency
+JOB_MIN_ROWS = 50_000
+ACTIVE = ("queued", "running")
+
+
+def concat_parts(parts: list):
+    """
+    Default combine: concatenates DataFrame results in input order.
+    """
+    return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+
+class Job:
+    """
+    One background run of a batch calculator.
+
+    Attributes:
+        id (str): Job id, as returned by JobRunner.submit.
+        name (str): Display name.
+        key (tuple): Deduplication key (name, input hash, caller key).
+        status (str): 'queued', 'running', 'done', 'failed' or 'cancelled'.
+        chunks (int): Number of chunks.
+        rows (int): Number of input rows.
+        message (str): Error of a failed job.
+    """
+
+    def __init__(self, job_id: str, name: str, key: tuple, task: tuple, rows: int, combine):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.status = "queued"
+        self.chunks = len(task[1])
+        self.rows = rows
+        self.message = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._combine = combine
+        self._task = task  # (func, chunks, workers, kwargs), kept until done for restarts
+        self._parts = []
+        self._chunks_done = 0
+        self._rows_done = 0
+        self._result = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def cancel(self) -> bool:
+        """
+        Asks the job to stop before its next chunk. Returns False if it had already finished.
+        """
+        if not self.active:
+            return False
+        self._cancel.set()
+        return True
+
+    def partial(self):
+        """
+        Returns the combined results of the chunks finished so far (the full
+        result once done), or None before the first chunk.
+        """
+        with self._lock:
+            if self.status == "done":
+                return self._result
+            parts = list(self._parts)
+        return self._combine(parts) if parts else None
+
+    def result(self):
+        """
+        Returns the full result once the job is done, else None.
+        """
+        return self._result if self.status == "done" else None
+
+    def info(self) -> dict:
+        """
+        Returns the job's state for display.
+
+        Returns:
+            dict: {'id', 'name', 'status', 'progress' (0-1), 'chunks_done',
+            'chunks', 'rows_done', 'rows', 'seconds' (running time so far),
+            'message'}
+        """
+        with self._lock:
+            chunks_done, rows_done = self._chunks_done, self._rows_done
+        end = self.finished or time.time()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": 1.0 if self.status == "done" else chunks_done / max(self.chunks, 1),
+            "chunks_done": chunks_done,
+            "chunks": self.chunks,
+            "rows_done": rows_done,
+            "rows": self.rows,
+            "seconds": end - self.started if self.started else 0.0,
+            "message": self.message,
+        }
+
+    def _run(self):
+        func, chunks, workers, kwargs = self._task
+        if self._cancel.is_set():
+            self._finish("cancelled")
+            return
+        self.started = time.time()
+        self.status = "running"
+        try:
+            with span("calculate", f"job {self.name}", rows=self.rows), ParallelExecutor(workers) as executor:
+                for chunk in chunks:
+                    if self._cancel.is_set():
+                        self._finish("cancelled")
+                        return
+                    part = executor.map_partitions(func, chunk, **kwargs) if executor.workers > 1 \
+                        else func(chunk, **kwargs)
+                    with self._lock:
+                        self._parts.append(part)
+                        self._chunks_done += 1
+                        self._rows_done += len(chunk)
+            result = self._combine(self._parts)
+        except Exception as e:
+            self.message = f"{type(e).__name__}: {e}"
+            self._finish("failed")
+            return
+        with self._lock:
+            self._result = result
+            self._parts = []
+            self._task = None
+        self._finish("done")
+
+    def _finish(self, status: str):
+        self.finished = time.time()
+        self.status = status
+
+
+class JobRunner:
+    """
+    Runs batch calculators as background jobs on a thread pool.
+
+    Args:
+        threads (int): Jobs running at once.
+        max_jobs (int): Jobs kept; beyond it the least recently used finished
+            jobs (and their results) are dropped.
+    """
+
+    def __init__(self, threads: int = DEFAULT_THREADS, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # id -> Job, least recently used first
+        self._keys = {}  # key -> id
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def submit(self, func, df: pd.DataFrame, name: str = None, key=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               workers=1, combine=concat_parts, **kwargs) -> str:
+        """
+        Starts func(chunk, **kwargs) over df in chunks, or returns the id of
+        the same run if it was already submitted, whatever its status (see
+        restart to rerun a cancelled or failed one).
+
+        Args:
+            func: Batch calculator, called once per chunk of rows.
+            df (DataFrame): Input batch.
+            name (str): Display name; with `key`, identifies the run.
+                Defaults to func's name.
+            key: Hashable value covering everything besides df that changes
+                the result (parameters, reference versions). Defaults to
+                repr(kwargs), which only suits simple parameters.
+            chunk_rows (int): Rows per chunk.
+            workers: Processes per chunk for ParallelExecutor (None for all
+                cores); func must then be a module-level function returning a
+                DataFrame.
+            combine: Joins the list of chunk results, in input order, into
+                one result (concat_parts by default).
+
+        Returns:
+            str: Job id.
+        """
+        name = name or getattr(func, "__name__", "batch")
+        job_key = (name, result_hash(df), repr(sorted(kwargs.items())) if key is None else key)
+        chunks = [df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows)] or [df]
+        with self._lock:
+            job_id = self._keys.get(job_key)
+            if job_id is not None:
+                self._jobs.move_to_end(job_id)
+                self._stats["hits"] += 1
+                return job_id
+            job = Job(uuid.uuid4().hex[:12], name, job_key, (func, chunks, workers, kwargs), len(df), combine)
+            self._add(job)
+        self._pool.submit(job._run)
+        return job.id
+
+    def restart(self, job_id: str) -> str:
+        """
+        Runs a cancelled or failed job again from the start, as a new job
+        under the same key. Returns the new id (or job_id if the job is
+        unknown, active or done).
+        """
+        with self._lock:
+            old = self._jobs.get(job_id)
+            if old is None or old._task is None or old.active:
+                return job_id
+            job = Job(uuid.uuid4().hex[:12], old.name, old.key, old._task, old.rows, old._combine)
+            self._add(job)
+        self._pool.submit(job._run)
+        return job.id
+
+    def get(self, job_id: str):
+        """
+        Returns the Job with this id, or None if it is unknown or was evicted.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued or running job. Returns False if there was nothing to cancel.
+        """
+        job = self.get(job_id)
+        return job is not None and job.cancel()
+
+    def jobs(self, ids=None) -> list:
+        """
+        Returns info() of every kept job (or of `ids`), most recent first.
+        """
+        with self._lock:
+            jobs = [job for job in reversed(self._jobs.values()) if ids is None or job.id in ids]
+        return [job.info() for job in jobs]
+
+    def shutdown(self):
+        """
+        Cancels every job and waits for the running ones to stop.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        self._pool.shutdown(wait=True)
+
+    def cache_info(self) -> dict:
+        with self._lock:
+            running = sum(job.active for job in self._jobs.values())
+            return {"entries": len(self._jobs), "active": running, **self._stats}
+
+    def _add(self, job: Job):
+        # Caller holds the lock
+        self._stats["misses"] += 1
+        self._jobs[job.id] = job
+        self._keys[job.key] = job.id
+        self._evict()
+
+    def _evict(self):
+        # Caller holds the lock; queued and running jobs are never dropped
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(len(self._jobs) - self.max_jobs, 0)]:
+            job = self._jobs.pop(job_id)
+            if self._keys.get(job.key) == job_id:
+                del self._keys[job.key]
+            self._stats["evictions"] += 1
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def default_runner() -> JobRunner:
+    """
+    Returns the process-wide JobRunner, shared by every session.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+            atexit.register(_runner.shutdown)
+        return _runner
+
+
+def cache_info() -> dict:
+    """
+    Returns the default runner's statistics: entries, active, hits, misses and evictions.
+    """
+    return default_runner().cache_info()
+
+
+register_cache("background jobs", cache_info)
@@ -0,0 +1,189 @@
+"""
+Process-pool execution of batch calculators.
+
+ParallelExecutor splits a batch into contiguous row partitions, runs a
+calculator on each partition in a pool of worker processes and concatenates
+the results in input order, so the output is identical to a single-process
+run. Before the pool starts, the reference tables the calculators use are
+loaded once and serialized (Arrow IPC) into one shared-memory segment; each
+worker seeds its reference_data cache from that segment instead of parsing
+the CSV/Excel sources again.
+
+    with ParallelExecutor(workers=8) as executor:
+        results = executor.map_partitions(compute_roi_batch, batch, horizon_years=20)
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - shared tables are optional
+    pa = None
+
+from backend.utils.reference_data import reference_version, load_reference, register_table
+
+# Reference tables used by the CRREM, ROI, transition and scenario calculators
+SHARED_TABLES = [
+    "crrem_country_reference.csv",
+    "crrem_country_codes.csv",
+    "crrem_pathways.csv",
+    "crrem_time_horizon.csv",
+    "crrem_parameters_config.csv",
+    "crrem_conversion_factors.csv",
+    "crrem_emission_factors.csv",
+    "Energy_Prices_CRREM_Compatible.csv",
+    "Utility_Tariffs_CRREM_Compatible.xlsx",
+    "Discount_Rates_Risk_Premiums_CRREM_Compatible.xlsx",
+    "ESG_Valuation_Impacts_CRREM_TEMPLATE.xlsx",
+    "Carbon_Pricing_Scenarios_CRREM_Compatible.xlsx",
+    "Renewable_Energy_Supply_Scenarios_CRREM_Compatible.xlsx",
+    "Cost_Escalation_Factors_CRREM_Compatible.xlsx",
+    "emissions/Utility_Emission_Factors_CRREM_Compatible.xlsx",
+    # Sources of the canonical country, fuel and asset-class keys (see reference_keys)
+    "emissions/Heating_Emissions_Factors_CRREM_Compatible.xlsx",
+    "crrem_asset_classes.csv",
+    "Energy_Performance_Baselines_CRREM_ALL_COUNTRIES.xlsx",
+]
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Below this many rows the pool start-up costs more than it saves (interactive pages)
+PARALLEL_MIN_ROWS = 200_000
+# Partitions per worker: more than one evens out uneven partitions
+PARTITIONS_PER_WORKER = 4
+
+# Worker-side handle on the shared segment; kept open for the worker's lifetime
+_attached = {}
+
+
+def _pack_tables(names) -> tuple:
+    """
+    Serializes reference tables into one byte string.
+
+    Returns:
+        tuple: (bytes, manifest list of {'name', 'version', 'offset', 'length', 'int_columns'})
+    """
+    payloads, manifest, offset = [], [], 0
+    for name in names:
+        try:
+            version = reference_version(name)
+            df = load_reference(name)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (FileNotFoundError, pa.ArrowInvalid, pa.ArrowTypeError):
+            continue  # workers fall back to reading this table themselves
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        payload = sink.getvalue().to_pybytes()
+        manifest.append({
+            "name": name,
+            "version": version,
+            "offset": offset,
+            "length": len(payload),
+            "int_columns": [i for i, col in enumerate(df.columns) if isinstance(col, int)],
+        })
+        payloads.append(payload)
+        offset += len(payload)
+    return b"".join(payloads), manifest
+
+
+def _attach_tables(segment_name: str, manifest: list):
+    """
+    Pool initializer: registers the shared reference tables in this worker's cache.
+    """
+    # Workers share the parent's resource tracker, which unlinks the segment once
+    segment = SharedMemory(name=segment_name)
+    _attached["segment"] = segment
+    for entry in manifest:
+        view = segment.buf[entry["offset"]:entry["offset"] + entry["length"]]
+        df = pa.ipc.open_stream(pa.py_buffer(view)).read_all().to_pandas()
+        if entry["int_columns"]:
+            df.columns = [int(col) if i in entry["int_columns"] else col for i, col in enumerate(df.columns)]
+        path, sheet, mtime = entry["version"]
+        register_table(path, df, sheet_name=sheet, mtime_ns=mtime)
+        del view
+
+
+def _call(task):
+    func, partition, kwargs = task
+    return func(partition, **kwargs)
+
+
+class ParallelExecutor:
+    """
+    Runs batch calculators over row partitions in a process pool.
+
+    Args:
+        workers (int): Worker processes; defaults to DEFAULT_WORKERS (all cores).
+            With 1 worker everything runs in the calling process.
+        partition_size (int): Rows per partition; by default the batch is cut
+            into PARTITIONS_PER_WORKER partitions per worker.
+        tables (list): Reference tables to place in shared memory.
+    """
+
+    def __init__(self, workers: int = None, partition_size: int = None, tables=SHARED_TABLES):
+        self.workers = max(1, int(workers or DEFAULT_WORKERS))
+        self.partition_size = partition_size
+        self.tables = list(tables)
+        self._pool = None
+        self._segment = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            initializer, initargs = None, ()
+            if pa is not None:
+                data, manifest = _pack_tables(self.tables)
+                if manifest:
+                    self._segment = SharedMemory(create=True, size=len(data))
+                    self._segment.buf[:len(data)] = data
+                    initializer, initargs = _attach_tables, (self._segment.name, manifest)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initializer, initargs=initargs)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Shuts the pool down and releases the shared-memory segment.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def partitions(self, df: pd.DataFrame) -> list:
+        """
+        Splits a frame into contiguous row partitions (input order preserved).
+        """
+        size = self.partition_size or math.ceil(len(df) / (self.workers * PARTITIONS_PER_WORKER))
+        size = max(1, size)
+        return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+    def map(self, func, items, **kwargs) -> list:
+        """
+        Calls func(item, **kwargs) for every item; results are in input order.
+        func must be importable at module level so it can be sent to workers.
+        """
+        tasks = [(func, item, kwargs) for item in items]
+        if self.workers == 1 or len(tasks) < 2:
+            return [_call(task) for task in tasks]
+        if self._pool is None:
+            with self:
+                return list(self._pool.map(_call, tasks))
+        return list(self._pool.map(_call, tasks))
+
+    def map_partitions(self, func, df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+        """
+        Runs a batch calculator (DataFrame in, DataFrame out, one row per input
+        row) on every partition and concatenates the results in input order.
+        """
+        if self.workers == 1 or len(df) < 2:
+            return func(df, **kwargs)
+        return pd.concat(self.map(func, self.partitions(df), **kwargs))
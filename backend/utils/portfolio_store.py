@@ -0,0 +1,235 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backend.calculators.epc import epc_version, estimated_stranding_year, infer_epc_bands
+from backend.utils.file_validator import memory_report, open_source, validate_csv_stream
+from backend.utils.incremental import IncrementalResults, PortfolioAggregates
+from backend.utils.instrumentation import register_cache, timed
+from backend.utils.result_store import default_store
+
+# Parsed uploads are cached per process and keyed by a hash of the file
+# content, so the same portfolio is parsed and validated once no matter how
+# many pages (or sessions) read it. Least recently used entries are evicted
+# once the cached frames exceed MAX_CACHE_BYTES or MAX_ENTRIES.
+MAX_CACHE_BYTES = 1024 * 1024 * 1024
+MAX_ENTRIES = 16
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Successive uploads under the same name in one session (e.g. an edited
+# re-upload) form a lineage; its IncrementalResults derives columns and KPIs
+# for changed rows only.
+DERIVED_COLUMNS = {"assets": ["Energy Intensity (kWh/m²)", "EPC Band (inferred)", "Stranding Year (est.)"]}
+SUMMARY_KPIS = {
+    "assets": {
+        "mean_columns": ["Carbon Intensity (kgCO2e/m²)", "Energy Intensity (kWh/m²)"],
+        "count_columns": ["Stranding Year (est.)", "EPC Band (inferred)"],
+        "top_column": "Carbon Intensity (kgCO2e/m²)",
+    },
+}
+
+# Keys of a load_portfolio result that belong to the loading session, not the shared entry
+SESSION_FIELDS = ("name", "summary", "incremental")
+
+_entries = OrderedDict()
+_lineages = OrderedDict()
+_lock = threading.RLock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def content_hash(source) -> str:
+    """
+    Returns the SHA-256 hex digest of a file path or binary buffer.
+
+    Buffers are read from the start and rewound afterwards.
+    """
+    handle, _, owned = open_source(source)
+    try:
+        digest = hashlib.sha256()
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        return digest.hexdigest()
+    finally:
+        if owned:
+            handle.close()
+        else:
+            handle.seek(0)
+
+
+def add_derived_columns(df: pd.DataFrame, file_type: str) -> pd.DataFrame:
+    """
+    Adds the columns shared by the portfolio pages, computed once per upload.
+
+    Assets get 'Energy Intensity (kWh/m²)', 'EPC Band (inferred)' (from the
+    carbon intensity and the country's EPC baseline, see
+    backend.calculators.epc) and 'Stranding Year (est.)' (from that band);
+    other file types are returned unchanged.
+    """
+    if file_type != "assets":
+        return df
+    if "Energy Consumption (kWh)" in df.columns:
+        df["Energy Intensity (kWh/m²)"] = df["Energy Consumption (kWh)"] / df["Floor Area (m²)"]
+    else:
+        df["Energy Intensity (kWh/m²)"] = np.float32(0)
+    df["EPC Band (inferred)"] = infer_epc_bands(df)
+    df["Stranding Year (est.)"] = estimated_stranding_year(df["EPC Band (inferred)"])
+    return df
+
+
+def _derive_incrementally(df: pd.DataFrame, file_type: str, name: str, session, key: str, cached: bool) -> tuple:
+    # Returns (frame with derived columns, KPI summary, recomputed/reused report); for a
+    # cached df (already derived), the frame is None when the lineage is already at key
+    lineage_key = (session, file_type, name)
+    with _lock:
+        lineage = _lineages.get(lineage_key)
+        if lineage is None:
+            lineage = (IncrementalResults(
+                lambda rows: add_derived_columns(rows, file_type),
+                DERIVED_COLUMNS[file_type],
+                PortfolioAggregates(**SUMMARY_KPIS[file_type]),
+            ), threading.Lock(), {})
+            _lineages[lineage_key] = lineage
+        _lineages.move_to_end(lineage_key)
+        while len(_lineages) > MAX_ENTRIES:
+            _lineages.popitem(last=False)
+    results, lineage_lock, last = lineage
+    # Held until the summary and report are read, so they belong to this update
+    with lineage_lock:
+        # Reruns with the lineage's latest upload keep its report instead of comparing it with itself
+        if cached and last.get("key") == key:
+            return None, last["summary"], last["report"]
+        # Derived columns depend on the EPC baselines, so a new baseline file recomputes them
+        data = results.update(df.drop(columns=DERIVED_COLUMNS[file_type], errors="ignore"), version=epc_version())
+        last.update(key=key, summary=results.aggregates.summary(), report=dict(results.report))
+        return data, last["summary"], last["report"]
+
+
+def _evict(max_bytes: int, max_entries: int):
+    total = sum(entry["bytes"] for entry in _entries.values())
+    # The most recent entry is always kept, even if it alone exceeds the cap
+    while len(_entries) > 1 and (total > max_bytes or len(_entries) > max_entries):
+        _, evicted = _entries.popitem(last=False)
+        total -= evicted["bytes"]
+        _stats["evictions"] += 1
+
+
+@timed("load", "load portfolio", rows=lambda entry: entry["rows"])
+def load_portfolio(source, file_type: str, name: str = None, progress=None, session: str = None) -> dict:
+    """
+    Parses and validates an upload once, then serves it from the cache.
+
+    The cached frame is shared between pages and sessions and must be treated
+    as read-only; take a .copy() or use .assign() before adding columns. The
+    returned dict itself is built per call, so 'name', 'summary' and
+    'incremental' belong to the calling session.
+
+    Args:
+        source: Path to the CSV file or a binary buffer (e.g. a Streamlit
+            UploadedFile).
+        file_type (str): One of ['assets', 'utilities']
+        name (str): Display name of the upload; defaults to the file name.
+        progress (callable): Passed to validate_csv_stream; only called when
+            the file is not cached yet.
+        session (str): Scope of the upload's lineage, e.g.
+            session_portfolio.session_id(); uploads of the same name in other
+            sessions are not compared with this one.
+
+    Returns:
+        dict: The validate_csv_stream result with the derived columns added
+        to 'data', plus 'key' (content hash), 'name', 'file_type' and
+        'bytes' (in-memory size of the frame). Assets also get 'summary'
+        (KPIs, see PortfolioAggregates.summary) and 'incremental' (rows
+        recomputed vs reused relative to the previous upload of the same name
+        in the session).
+    """
+    if name is None:
+        name = os.path.basename(source) if isinstance(source, (str, os.PathLike)) \
+            else getattr(source, "name", "upload")
+    key = f"{file_type}:{content_hash(source)}"
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+
+    if entry is None:
+        result = validate_csv_stream(source, file_type, progress=progress)
+        entry = {**result, "key": key, "file_type": file_type, "bytes": 0}
+        if result["status"] != "success":
+            return {**entry, "name": name}
+        if file_type in DERIVED_COLUMNS:
+            entry["data"], summary, report = _derive_incrementally(result["data"], file_type, name, session, key,
+                                                                   cached=False)
+        else:
+            entry["data"] = add_derived_columns(result["data"], file_type)
+        entry["bytes"] = memory_report(entry["data"])["bytes"]
+        with _lock:
+            _entries[key] = entry
+            _evict(MAX_CACHE_BYTES, MAX_ENTRIES)
+    elif file_type in DERIVED_COLUMNS:
+        _, summary, report = _derive_incrementally(entry["data"], file_type, name, session, key, cached=True)
+
+    # The parse is shared; the name and the lineage's summary and report are this session's
+    loaded = {**entry, "name": name}
+    if file_type in DERIVED_COLUMNS:
+        loaded["summary"], loaded["incremental"] = summary, report
+    return loaded
+
+
+def persist_portfolio(entry: dict, store=None) -> int:
+    """
+    Stores a loaded upload in the result database (see result_store) as a
+    portfolio with one run of analysis '<file_type>' holding its rows.
+
+    Uploads already stored (same content hash) are not written again. The
+    entry is not modified, as the cached upload is shared between sessions.
+
+    Returns:
+        int: The run id.
+    """
+    store = store or default_store()
+    portfolio_id = store.add_portfolio(entry["name"], entry["file_type"], entry["key"].split(":", 1)[1], entry["rows"])
+    run = store.latest_run(portfolio_id, entry["file_type"])
+    return int(run["id"]) if run else store.save_run(entry["file_type"], entry["data"], portfolio_id=portfolio_id)
+
+
+def get_portfolio(key: str):
+    """
+    Returns a cached upload by key, or None if it was evicted or never loaded.
+
+    This is the shared entry, without the per-session 'name', 'summary' and
+    'incremental' of load_portfolio's result.
+    """
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+        return entry
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: entries, bytes, hits, misses and evictions.
+    """
+    with _lock:
+        return {"entries": len(_entries), "bytes": sum(e["bytes"] for e in _entries.values()), **_stats}
+
+
+def clear_cache():
+    """
+    Drops every cached upload and upload lineage.
+    """
+    with _lock:
+        _entries.clear()
+        _lineages.clear()
+        _stats.update(hits=0, misses=0, evictions=0)
+
+
+register_cache("uploaded portfolios", cache_info)
@@ -0,0 +1,202 @@
+import os
+import threading
+
+import pandas as pd
+
+from backend.utils.instrumentation import register_cache, span
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+# Process-wide caches, shared by every Streamlit session running in this process.
+# Entries are keyed by (path, sheet) and carry the file's mtime so that edits to
+# the reference files are picked up on the next access.
+_tables = {}
+_indexes = {}
+_lock = threading.RLock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def resolve_path(name: str) -> str:
+    """
+    Resolves a reference file name relative to the data/ directory.
+
+    Args:
+        name (str): File name such as 'crrem_pathways.csv' or
+            'economics/Utility_Tariffs_CRREM_Compatible.xlsx', or an absolute path.
+
+    Returns:
+        str: Absolute path to the file.
+    """
+    if os.path.isabs(name):
+        return name
+    return os.path.join(DATA_DIR, name)
+
+
+def reference_version(name: str, sheet_name=0) -> tuple:
+    """
+    Returns the cache key of a reference table: (path, sheet, mtime_ns).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path = resolve_path(name)
+    return path, sheet_name, os.stat(path).st_mtime_ns
+
+
+def _read_source(path: str, sheet_name) -> pd.DataFrame:
+    # Imported here because reference_snapshot depends on this module
+    from backend.utils.reference_snapshot import load_snapshot_table
+
+    df = load_snapshot_table(path, sheet_name)
+    if df is not None:
+        return df
+    if path.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(path, sheet_name=sheet_name)
+    return pd.read_csv(path)
+
+
+def load_reference(name: str, sheet_name=0) -> pd.DataFrame:
+    """
+    Loads a reference table once per process and returns the cached frame.
+
+    The returned DataFrame is shared between callers and sessions and must be
+    treated as read-only; take a .copy() before modifying it.
+
+    Args:
+        name (str): File name relative to data/ (see resolve_path).
+        sheet_name: Excel sheet to read; ignored for CSV files.
+
+    Returns:
+        DataFrame: The parsed table.
+    """
+    path, sheet, mtime = reference_version(name, sheet_name)
+    key = (path, sheet)
+    with _lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == mtime:
+            _stats["hits"] += 1
+            return cached[1]
+        _stats["misses"] += 1
+        with span("load", os.path.basename(path)) as timing:
+            df = _read_source(path, sheet)
+            timing.add_rows(len(df))
+        _tables[key] = (mtime, df)
+        return df
+
+
+def register_table(name: str, df: pd.DataFrame, sheet_name=0, mtime_ns: int = None):
+    """
+    Seeds the cache with a table that was loaded elsewhere, e.g. by a parent
+    process that shares its reference tables with pool workers.
+
+    Args:
+        name (str): File name relative to data/, or an absolute path.
+        df (DataFrame): The table, treated as read-only like any cached frame.
+        sheet_name: Excel sheet the table was read from.
+        mtime_ns (int): Source mtime the table corresponds to; defaults to the
+            file's current mtime. A later change to the file still invalidates it.
+    """
+    path = resolve_path(name)
+    if mtime_ns is None:
+        mtime_ns = os.stat(path).st_mtime_ns
+    with _lock:
+        _tables[(path, sheet_name)] = (mtime_ns, df)
+
+
+def lookup_index(name: str, key_columns, value_column: str, sheet_name=0) -> dict:
+    """
+    Builds (once per file version) a hash index over a reference table.
+
+    The first row wins when keys are duplicated, matching the
+    `df[mask][column].values[0]` lookups used by the pages.
+
+    Args:
+        name (str): File name relative to data/.
+        key_columns (str or list): Column(s) forming the key. A single column
+            gives scalar keys, several columns give tuple keys.
+        value_column (str): Column returned by the lookup.
+        sheet_name: Excel sheet to read.
+
+    Returns:
+        dict: {key: value}
+    """
+    version = reference_version(name, sheet_name)
+    index_key = (version[0], sheet_name, str(key_columns), value_column)
+    with _lock:
+        cached = _indexes.get(index_key)
+        if cached is not None and cached[0] == version:
+            _stats["hits"] += 1
+            return cached[1]
+        df = load_reference(name, sheet_name).dropna(subset=[value_column])
+        if isinstance(key_columns, str):
+            keys = df[key_columns]
+        else:
+            keys = pd.MultiIndex.from_frame(df[list(key_columns)])
+        index = pd.Series(df[value_column].to_numpy(), index=keys)
+        index = index[~index.index.duplicated(keep="first")].to_dict()
+        _indexes[index_key] = (version, index)
+        return index
+
+
+def pathway_index() -> dict:
+    """
+    Returns CRREM pathway targets keyed by (region_code, asset_class, year).
+    """
+    return lookup_index(
+        "crrem_pathways.csv",
+        ["region_code", "asset_class", "year"],
+        "target_carbon_intensity_kgco2m2",
+    )
+
+
+def region_index() -> dict:
+    """
+    Returns CRREM regions keyed by country_code.
+    """
+    return lookup_index("crrem_country_reference.csv", "country_code", "crrem_region")
+
+
+def tariff_index() -> dict:
+    """
+    Returns utility tariffs (EUR/kWh) keyed by (Country, fuel).
+
+    The tariff workbook is wide (one '<Fuel>_EUR_per_kWh' column per fuel); it
+    is melted so fuels become keys, e.g. ('Germany', 'District Heating').
+    """
+    name = "Utility_Tariffs_CRREM_Compatible.xlsx"
+    version = reference_version(name)
+    index_key = (version[0], 0, "tariffs", None)
+    with _lock:
+        cached = _indexes.get(index_key)
+        if cached is not None and cached[0] == version:
+            _stats["hits"] += 1
+            return cached[1]
+        tariffs = load_reference(name)
+        long = tariffs.melt(id_vars="Country", var_name="fuel", value_name="price").dropna(subset=["price"])
+        long["fuel"] = long["fuel"].str.replace("_EUR_per_kWh", "", regex=False).str.replace("_", " ")
+        index = {}
+        for country, fuel, price in long[["Country", "fuel", "price"]].itertuples(index=False):
+            index.setdefault((country, fuel), float(price))
+        _indexes[index_key] = (version, index)
+        return index
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: cached tables, cached indexes, hits and misses.
+    """
+    with _lock:
+        return {"tables": len(_tables), "indexes": len(_indexes), **_stats}
+
+
+def clear_cache():
+    """
+    Drops every cached table and index.
+    """
+    with _lock:
+        _tables.clear()
+        _indexes.clear()
+        _stats.update(hits=0, misses=0)
+
+
+register_cache("reference tables", cache_info)
@@ -0,0 +1,389 @@
+"""
+Canonical keys for the country, fuel and asset-class columns of batches and
+reference tables.
+
+The reference files disagree on keys: countries appear as ISO2 codes
+('DE'), ISO3 codes ('USA', 'JPN'), CRREM codes ('UK', 'EU27', 'AUS1') and
+names; fuels as 'electricity', 'Natural Gas' or 'Gas'; asset classes as
+'Office' or 'Apartments'. A KeyIndex maps every normalized alias of a kind
+(case, accents, spacing and punctuation ignored) to one canonical key and
+is built once per version of its source files. Whole columns are resolved
+with one dictionary map over their distinct values, and values that match
+nothing are reported instead of silently failing later lookups.
+
+Canonical keys: countries use the CRREM code of crrem_country_codes.csv
+(with 'name', 'iso2', 'iso3' and CRREM 'region' attributes), fuels the
+Energy_Carrier names of Energy_Prices_CRREM_Compatible.csv and asset classes
+the CRREM pathway and EPC baseline classes.
+"""
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.instrumentation import register_cache
+from backend.utils.reference_data import load_reference, reference_version
+
+# (file, code column, name column) pairs that tie country codes to names
+COUNTRY_SOURCES = [
+    ("crrem_country_codes.csv", "Code", "Country_Name"),
+    ("crrem_country_reference.csv", "country_code", "country_name"),
+    ("emissions/Heating_Emissions_Factors_CRREM_Compatible.xlsx", "ISO", "Country"),
+]
+REGION_SOURCE = ("crrem_country_reference.csv", "country_code", "crrem_region")
+# ISO 3166 codes per CRREM country code (CRREM uses ISO2 in Europe, 'UK' and ISO3 elsewhere)
+ISO_CODES = {
+    "AT": ("AT", "AUT"), "BE": ("BE", "BEL"), "BG": ("BG", "BGR"), "HR": ("HR", "HRV"), "CY": ("CY", "CYP"),
+    "CZ": ("CZ", "CZE"), "DK": ("DK", "DNK"), "EE": ("EE", "EST"), "FI": ("FI", "FIN"), "FR": ("FR", "FRA"),
+    "DE": ("DE", "DEU"), "GR": ("GR", "GRC"), "HU": ("HU", "HUN"), "IE": ("IE", "IRL"), "IT": ("IT", "ITA"),
+    "LV": ("LV", "LVA"), "LT": ("LT", "LTU"), "LU": ("LU", "LUX"), "MT": ("MT", "MLT"), "NL": ("NL", "NLD"),
+    "PL": ("PL", "POL"), "PT": ("PT", "PRT"), "RO": ("RO", "ROU"), "SK": ("SK", "SVK"), "SI": ("SI", "SVN"),
+    "ES": ("ES", "ESP"), "SE": ("SE", "SWE"), "UK": ("GB", "GBR"), "USA": ("US", "USA"), "CAN": ("CA", "CAN"),
+    "CHN": ("CN", "CHN"), "IND": ("IN", "IND"), "IDN": ("ID", "IDN"), "JPN": ("JP", "JPN"), "KOR": ("KR", "KOR"),
+    "MEX": ("MX", "MEX"), "RUS": ("RU", "RUS"), "ZAF": ("ZA", "ZAF"), "TUR": ("TR", "TUR"), "BRA": ("BR", "BRA"),
+    "ARG": ("AR", "ARG"), "CHL": ("CL", "CHL"), "COL": ("CO", "COL"), "PER": ("PE", "PER"), "SAU": ("SA", "SAU"),
+    "ARE": ("AE", "ARE"), "ISR": ("IL", "ISR"), "SGP": ("SG", "SGP"), "THA": ("TH", "THA"), "VNM": ("VN", "VNM"),
+    "PHL": ("PH", "PHL"), "EGY": ("EG", "EGY"), "MAR": ("MA", "MAR"), "NGA": ("NG", "NGA"), "KEN": ("KE", "KEN"),
+    "GHA": ("GH", "GHA"),
+    # Used by tariff and scenario tables but not by CRREM
+    "CH": ("CH", "CHE"), "NO": ("NO", "NOR"),
+}
+# Countries of ISO_CODES missing from the country code list
+EXTRA_COUNTRIES = {"CH": "Switzerland", "NO": "Norway"}
+# Other spellings -> CRREM country code
+COUNTRY_ALIASES = {
+    "Czechia": "CZ", "Great Britain": "UK", "Britain": "UK", "England": "UK", "The Netherlands": "NL",
+    "Holland": "NL", "United States of America": "USA", "America": "USA", "Korea": "KOR",
+    "Republic of Korea": "KOR", "Russian Federation": "RUS", "Turkiye": "TUR", "UAE": "ARE", "Viet Nam": "VNM",
+}
+
+FUEL_SOURCE = ("Energy_Prices_CRREM_Compatible.csv", "Energy_Carrier")
+# Fuel spellings used by batches and reference files -> Energy_Carrier name
+FUEL_ALIASES = {
+    "electricity": "Electricity", "electric": "Electricity", "power": "Electricity", "grid": "Electricity",
+    "grid electricity": "Electricity", "grid mix": "Electricity",
+    "gas": "Natural Gas", "natural gas": "Natural Gas", "nat gas": "Natural Gas", "mains gas": "Natural Gas",
+    "oil": "Heating Oil", "heating oil": "Heating Oil", "fuel oil": "Heating Oil",
+    "district heating": "District Heating", "district heat": "District Heating", "dh": "District Heating",
+    "heat network": "District Heating",
+}
+
+ASSET_CLASS_SOURCES = [
+    ("crrem_pathways.csv", "asset_class"),
+    ("crrem_asset_classes.csv", "asset_class"),
+    ("Energy_Performance_Baselines_CRREM_ALL_COUNTRIES.xlsx", "asset_class"),
+]
+# Asset class spellings and sub-types -> CRREM asset class
+ASSET_CLASS_ALIASES = {
+    "offices": "Office", "office building": "Office",
+    "shop": "Retail", "shops": "Retail", "high street": "Retail", "shopping centre": "Retail",
+    "shopping center": "Retail",
+    "hotels": "Hotel", "hospitality": "Hotel",
+    "warehouse": "Logistics", "distribution warehouse": "Logistics", "industrial": "Logistics",
+    "apartments": "Residential", "apartment": "Residential", "multi family": "Residential",
+    "multifamily": "Residential", "single family": "Residential", "residential": "Residential",
+}
+
+_ACCENTS = "[\u0300-\u036f]"  # combining marks left by NFKD decomposition
+_SEPARATORS = r"[^0-9A-Za-z]+"
+
+_indexes = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_keys(values: pd.Series) -> pd.Series:
+    """
+    Normalizes key spellings: accents stripped, case folded and every run
+    of spaces or punctuation turned into one space ('Single-Family' ->
+    'single family').
+    """
+    return (values.astype(str).str.normalize("NFKD").str.replace(_ACCENTS, "", regex=True)
+            .str.replace(_SEPARATORS, " ", regex=True).str.strip().str.casefold())
+
+
+def _as_series(values) -> pd.Series:
+    return values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+
+
+@dataclass(frozen=True)
+class KeyIndex:
+    """
+    Normalized hash index from every known alias of one kind of key to its canonical key.
+
+    Attributes:
+        kind (str): 'country', 'fuel' or 'asset class'.
+        aliases (dict): Normalized alias -> canonical key.
+        attributes (DataFrame): One row per canonical key, e.g. the name,
+            ISO codes and CRREM region of a country.
+    """
+
+    kind: str
+    aliases: dict
+    attributes: pd.DataFrame
+
+    def _distinct(self, values) -> tuple:
+        # canonical key per distinct value (NaN when unresolved), and the codes broadcasting it back
+        series = _as_series(values)
+        codes, distinct = pd.factorize(series)
+        distinct = pd.Series(np.asarray(distinct, dtype=object))
+        return series, codes, distinct, normalize_keys(distinct).map(self.aliases).to_numpy(dtype=object)
+
+    def resolve(self, values, to: str = None) -> pd.Series:
+        """
+        Resolves a whole column to canonical keys (or to one of their attributes).
+
+        Args:
+            values: Series or array of raw keys.
+            to (str): Attribute column to return instead of the key, e.g.
+                'name' or 'region' for countries.
+
+        Returns:
+            Series: Aligned with `values`; NaN where the value is missing,
+            unknown, or has no such attribute.
+        """
+        series, codes, _, canonical = self._distinct(values)
+        if to is not None:
+            canonical = self.attributes[to].reindex(canonical).to_numpy(dtype=object)
+        return pd.Series(np.append(canonical, np.nan)[codes], index=series.index, dtype=object)
+
+    def unresolved(self, values) -> dict:
+        """
+        Lists the values that match no alias.
+
+        Returns:
+            dict: {raw value: number of rows}, most frequent first; missing values are not reported.
+        """
+        _, codes, distinct, canonical = self._distinct(values)
+        counts = np.bincount(codes[codes >= 0], minlength=len(distinct))
+        missing = [i for i in np.argsort(-counts, kind="stable") if pd.isna(canonical[i])]
+        return {distinct[i]: int(counts[i]) for i in missing}
+
+    def rekey(self, table, level: int = 0):
+        """
+        Re-keys a reference table by canonical key, so it can be reindexed by resolved batch keys.
+
+        Table keys that match no alias are kept as they are; where several
+        spellings resolve to the same key, the first row wins.
+
+        Args:
+            table: Series or DataFrame indexed by raw keys.
+            level (int): Index level holding the keys.
+
+        Returns:
+            The table (same type) with canonical keys on `level`.
+        """
+        index = table.index
+        raw = pd.Series(index.get_level_values(level), dtype=object)
+        keys = self.resolve(raw).fillna(raw).to_numpy(dtype=object)
+        if isinstance(index, pd.MultiIndex):
+            levels = [keys if i == level else index.get_level_values(i) for i in range(index.nlevels)]
+            table = table.set_axis(pd.MultiIndex.from_arrays(levels, names=index.names))
+        else:
+            table = table.set_axis(pd.Index(keys, name=index.name))
+        return table[~table.index.duplicated()]
+
+
+def _normalize(value) -> str:
+    # normalize_keys for one value, used while building the indexes
+    value = re.sub(_ACCENTS, "", unicodedata.normalize("NFKD", str(value)))
+    return re.sub(_SEPARATORS, " ", value).strip().casefold()
+
+
+def _add_alias(aliases: dict, alias, key):
+    if pd.notna(alias) and _normalize(alias):
+        aliases.setdefault(_normalize(alias), key)
+
+
+def build_country_keys(sources: list, regions: pd.DataFrame) -> KeyIndex:
+    """
+    Builds the country index from (code, name) tables.
+
+    The first source defines the canonical codes. Rows of later sources join
+    the country their code or name already resolves to, so their own
+    spelling of the other becomes an alias.
+
+    Args:
+        sources (list): (DataFrame, code column, name column) triples.
+        regions (DataFrame): crrem_country_reference.csv contents.
+
+    Returns:
+        KeyIndex
+    """
+    aliases, names = {}, {}
+    for table, code_column, name_column in sources:
+        for code, name in table[[code_column, name_column]].dropna().drop_duplicates().itertuples(index=False):
+            key = aliases.get(_normalize(code)) or aliases.get(_normalize(name)) or code
+            names.setdefault(key, name)
+            _add_alias(aliases, code, key)
+            _add_alias(aliases, name, key)
+    for key, name in EXTRA_COUNTRIES.items():
+        names.setdefault(key, name)
+        _add_alias(aliases, name, key)
+    for key, codes in ISO_CODES.items():
+        if key in names:
+            for code in codes:
+                _add_alias(aliases, code, key)
+    for alias, key in COUNTRY_ALIASES.items():
+        _add_alias(aliases, alias, key)
+
+    attributes = pd.DataFrame({"name": pd.Series(names, dtype=object)})
+    attributes = attributes.join(pd.DataFrame.from_dict(ISO_CODES, orient="index", columns=["iso2", "iso3"]))
+    _, code_column, region_column = REGION_SOURCE
+    regions = regions.dropna(subset=[code_column, region_column])
+    region = pd.Series(regions[region_column].to_numpy(dtype=object),
+                       index=[aliases.get(_normalize(code)) for code in regions[code_column]])
+    attributes["region"] = region[~region.index.duplicated()].reindex(attributes.index)
+    return KeyIndex("country", aliases, attributes)
+
+
+def build_named_keys(kind: str, canonical, aliases: dict) -> KeyIndex:
+    """
+    Builds an index over canonical names plus an alias table; aliases whose
+    target is not a canonical name are ignored.
+    """
+    canonical = pd.Index(pd.Series(list(canonical), dtype=object).dropna().unique())
+    index = {}
+    for key in canonical:
+        _add_alias(index, key, key)
+    for alias, key in aliases.items():
+        if key in canonical:
+            _add_alias(index, alias, key)
+    return KeyIndex(kind, index, pd.DataFrame(index=canonical))
+
+
+def _cached(kind: str, names: list, build) -> KeyIndex:
+    version = tuple(reference_version(name) for name in names)
+    with _lock:
+        cached = _indexes.get(kind)
+        if cached is not None and cached[0] == version:
+            _stats["hits"] += 1
+            return cached[1]
+        _stats["misses"] += 1
+        index = build()
+        _indexes[kind] = (version, index)
+        return index
+
+
+def country_keys() -> KeyIndex:
+    """
+    Returns the country index (COUNTRY_SOURCES, ISO_CODES and COUNTRY_ALIASES),
+    cached until a source file changes.
+    """
+    def build():
+        sources = [(load_reference(name), code, label) for name, code, label in COUNTRY_SOURCES]
+        return build_country_keys(sources, load_reference(REGION_SOURCE[0]))
+
+    return _cached("country", [name for name, _, _ in COUNTRY_SOURCES], build)
+
+
+def fuel_keys() -> KeyIndex:
+    """
+    Returns the fuel index (Energy_Carrier names and FUEL_ALIASES).
+    """
+    name, column = FUEL_SOURCE
+    return _cached("fuel", [name], lambda: build_named_keys("fuel", load_reference(name)[column], FUEL_ALIASES))
+
+
+def asset_class_keys() -> KeyIndex:
+    """
+    Returns the asset class index (ASSET_CLASS_SOURCES and ASSET_CLASS_ALIASES).
+    """
+    def build():
+        classes = pd.concat([load_reference(name)[column] for name, column in ASSET_CLASS_SOURCES])
+        return build_named_keys("asset class", classes, ASSET_CLASS_ALIASES)
+
+    return _cached("asset class", [name for name, _ in ASSET_CLASS_SOURCES], build)
+
+
+# Batch and portfolio columns holding keys, by kind
+KEY_COLUMNS = {
+    "country_code": country_keys,
+    "Location": country_keys,
+    "asset_class": asset_class_keys,
+    "Property Type": asset_class_keys,
+    "fuel_type": fuel_keys,
+}
+
+
+def canonical_countries(values) -> pd.Series:
+    """
+    Returns canonical country codes ('GB' and 'United Kingdom' -> 'UK'), keeping unknown values as they are.
+    """
+    values = _as_series(values)
+    return country_keys().resolve(values).fillna(values)
+
+
+def country_names(values) -> pd.Series:
+    """
+    Returns country names for codes or names in any known spelling, keeping unknown values as they are.
+    """
+    values = _as_series(values)
+    return country_keys().resolve(values, to="name").fillna(values)
+
+
+def country_positions(countries: pd.Index, values) -> np.ndarray:
+    """
+    Returns each value's position in a reference table's countries, matched
+    by name, else by the raw value; -1 where neither is listed.
+    """
+    values = _as_series(values).astype(object)
+    ids = countries.get_indexer(country_names(values))
+    return np.where(ids >= 0, ids, countries.get_indexer(values))
+
+
+def unresolved_keys(df: pd.DataFrame, columns: dict = None) -> dict:
+    """
+    Reports the key values of a batch that no reference file knows.
+
+    Args:
+        df (DataFrame): Batch or portfolio.
+        columns (dict): Column -> index loader; defaults to KEY_COLUMNS.
+
+    Returns:
+        dict: {column: {raw value: number of rows}} for the columns present
+        that have unresolved values.
+    """
+    report = {}
+    for column, keys in (columns or KEY_COLUMNS).items():
+        if column in df.columns:
+            missing = keys().unresolved(df[column])
+            if missing:
+                report[column] = missing
+    return report
+
+
+def format_unresolved(report: dict, limit: int = 5) -> str:
+    """
+    Describes an unresolved_keys() report in one line, listing at most
+    `limit` values per column (most frequent first).
+    """
+    parts = []
+    for column, values in report.items():
+        shown = ", ".join(f"{value!r} ({count:,} rows)" for value, count in list(values.items())[:limit])
+        more = f" and {len(values) - limit} more" if len(values) > limit else ""
+        parts.append(f"{column}: {shown}{more}")
+    return "Values not found in the reference data: " + "; ".join(parts)
+
+
+def cache_info() -> dict:
+    """
+    Returns cache statistics: cached indexes, hits and misses.
+    """
+    with _lock:
+        return {"indexes": len(_indexes), **_stats}
+
+
+def clear_cache():
+    """
+    Drops every cached index.
+    """
+    with _lock:
+        _indexes.clear()
+        _stats.update(hits=0, misses=0)
+
+
+register_cache("reference keys", cache_info)
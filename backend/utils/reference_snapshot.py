@@ -0,0 +1,228 @@
+"""
+Columnar snapshot of the data/ reference files.
+
+`python -m backend.utils.reference_snapshot` compiles every reference CSV and
+Excel sheet under data/ into one Arrow IPC file plus a JSON manifest holding
+each source's size, mtime and SHA-256. At runtime the snapshot is memory-mapped
+and individual tables are read from it on demand; a table whose source file no
+longer matches the manifest is ignored so callers fall back to the source.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - snapshot support is optional
+    pa = None
+
+from backend.utils.reference_data import DATA_DIR
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshot")
+SNAPSHOT_FILE = "reference_snapshot.arrow"
+MANIFEST_FILE = "reference_snapshot.json"
+SOURCE_EXTENSIONS = (".csv", ".xlsx")
+EXCLUDED_DIRS = {"snapshot", "exports", "raw_uploads"}
+FORMAT_VERSION = 1
+_ALIGNMENT = 64
+
+_state = {"manifest_mtime": None, "entries": {}, "buffer": None, "verified": {}}
+_lock = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    """
+    Returns the hex SHA-256 digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_sources(data_dir: str = DATA_DIR) -> list:
+    """
+    Lists reference files under data_dir as paths relative to it, sorted.
+    """
+    sources = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            if name.lower().endswith(SOURCE_EXTENSIONS):
+                sources.append(os.path.relpath(os.path.join(root, name), data_dir).replace(os.sep, "/"))
+    return sources
+
+
+def _read_sheets(path: str) -> dict:
+    if path.lower().endswith(".xlsx"):
+        return pd.read_excel(path, sheet_name=None)
+    return {None: pd.read_csv(path)}
+
+
+def build_snapshot(output_dir: str = SNAPSHOT_DIR) -> dict:
+    """
+    Compiles all reference files under data/ into a single Arrow snapshot and manifest.
+
+    Args:
+        output_dir (str): Directory receiving the snapshot and manifest.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to build the reference snapshot")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tables, skipped = [], []
+    snapshot_path = os.path.join(output_dir, SNAPSHOT_FILE)
+    tmp_path = snapshot_path + ".tmp"
+    offset = 0
+
+    with open(tmp_path, "wb") as out:
+        for rel in find_sources():
+            path = os.path.join(DATA_DIR, rel)
+            stat = os.stat(path)
+            source = {"source": rel, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+            try:
+                sheets = _read_sheets(path)
+            except Exception as e:
+                skipped.append({"source": rel, "reason": str(e)})
+                continue
+
+            for sheet_index, (sheet_name, df) in enumerate(sheets.items()):
+                try:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    skipped.append({"source": rel, "sheet_name": sheet_name, "reason": str(e)})
+                    continue
+
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                payload = sink.getvalue()
+
+                padding = -offset % _ALIGNMENT
+                out.write(b"\0" * padding)
+                offset += padding
+                out.write(payload)
+
+                tables.append({
+                    **source,
+                    "sheet_index": sheet_index,
+                    "sheet_name": sheet_name,
+                    "int_columns": [i for i, col in enumerate(df.columns) if isinstance(col, int)],
+                    "offset": offset,
+                    "length": payload.size,
+                })
+                offset += payload.size
+
+    manifest = {"format": FORMAT_VERSION, "snapshot": SNAPSHOT_FILE, "tables": tables, "skipped": skipped}
+    os.replace(tmp_path, snapshot_path)
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def _load_manifest(output_dir: str) -> dict:
+    """
+    Memory-maps the snapshot and indexes the manifest, reloading if it changed.
+    Must be called with _lock held.
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        _state.update(manifest_mtime=None, entries={}, buffer=None, verified={})
+        return _state["entries"]
+
+    if _state["manifest_mtime"] != (manifest_path, mtime):
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+        entries = {}
+        if manifest.get("format") == FORMAT_VERSION:
+            for entry in manifest["tables"]:
+                path = os.path.normpath(os.path.join(DATA_DIR, entry["source"]))
+                entries[(path, entry["sheet_index"])] = entry
+                if entry["sheet_name"] is not None:
+                    entries[(path, entry["sheet_name"])] = entry
+        source = pa.memory_map(os.path.join(output_dir, manifest["snapshot"]), "r")
+        _state.update(manifest_mtime=(manifest_path, mtime), entries=entries, buffer=source.read_buffer(), verified={})
+    return _state["entries"]
+
+
+def _is_current(path: str, entry: dict) -> bool:
+    """
+    Checks a source file against the manifest: size and mtime first, hash only
+    when the stat information differs. Must be called with _lock held.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _state["verified"]:
+        if stat.st_size != entry["size"]:
+            current = False
+        elif stat.st_mtime_ns == entry["mtime_ns"]:
+            current = True
+        else:
+            current = file_sha256(path) == entry["sha256"]
+        _state["verified"][key] = current
+    return _state["verified"][key]
+
+
+def load_snapshot_table(path: str, sheet_name=0, output_dir: str = SNAPSHOT_DIR):
+    """
+    Reads one table from the memory-mapped snapshot.
+
+    Args:
+        path (str): Absolute path of the source file.
+        sheet_name: Excel sheet index or name; ignored for CSV files.
+        output_dir (str): Directory holding the snapshot.
+
+    Returns:
+        DataFrame or None: None when there is no snapshot, pyarrow is missing, or
+        the source file has changed since the snapshot was built.
+    """
+    if pa is None:
+        return None
+    path = os.path.normpath(path)
+    if path.lower().endswith(".csv"):
+        sheet_name = 0
+
+    with _lock:
+        try:
+            entry = _load_manifest(output_dir).get((path, sheet_name))
+        except (OSError, ValueError, pa.ArrowException):
+            return None
+        if entry is None or not _is_current(path, entry):
+            return None
+        payload = _state["buffer"].slice(entry["offset"], entry["length"])
+
+    df = pa.ipc.open_file(payload).read_all().to_pandas()
+    if entry["int_columns"]:
+        columns = list(df.columns)
+        for i in entry["int_columns"]:
+            columns[i] = int(columns[i])
+        df.columns = columns
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile data/ reference files into a columnar snapshot.")
+    parser.add_argument("--output-dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    manifest = build_snapshot(args.output_dir)
+    print(f"Wrote {len(manifest['tables'])} tables to {os.path.join(args.output_dir, SNAPSHOT_FILE)}")
+    for item in manifest["skipped"]:
+        print(f"Skipped {item['source']}: {item['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+File-backed store for portfolios, analysis runs and per-asset results.
+
+Results live in a local SQLite database (data/results.sqlite by default, or
+the TA_RESULTS_DB environment variable), so they survive restarts and work
+fully offline. Every analysis gets its own results table
+('results_<analysis>') whose columns follow the first batch stored, plus the
+key columns run_id, row_num, asset, country_code and asset_class, which are
+indexed. Pages page through and aggregate results with SQL instead of
+loading whole runs into pandas:
+
+    store = ResultStore()
+    run_id = store.save_run("crrem", results)
+    store.page(run_id, offset=0, limit=50, order_by="stranding_year")
+    store.aggregate(run_id, {"carbon_intensity": "avg"}, group_by="country_code")
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.reference_data import DATA_DIR
+
+DEFAULT_DB_PATH = os.environ.get("TA_RESULTS_DB", os.path.join(DATA_DIR, "results.sqlite"))
+INSERT_CHUNK_ROWS = 50_000
+MAX_PAGE_ROWS = 10_000
+
+# Key columns every results table carries, filled from the first matching input column
+KEY_COLUMNS = {
+    "asset": ["asset_id", "Asset Name", "asset_name", "asset"],
+    "country_code": ["country_code", "Country", "Location"],
+    "asset_class": ["asset_class", "Asset Class", "Property Type"],
+}
+AGGREGATES = {"avg", "sum", "min", "max", "count"}
+
+_stores = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    content_hash TEXT,
+    rows INTEGER,
+    created_at REAL NOT NULL,
+    UNIQUE (file_type, content_hash)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    portfolio_id INTEGER REFERENCES portfolios (id) ON DELETE CASCADE,
+    analysis TEXT NOT NULL,
+    parameters TEXT,
+    rows INTEGER,
+    errors INTEGER,
+    seconds REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_portfolio ON runs (portfolio_id, analysis);
+"""
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _table_name(analysis: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_]+", analysis):
+        raise ValueError(f"Invalid analysis name: {analysis}")
+    return f"results_{analysis.lower()}"
+
+
+def _column_values(values: pd.Series) -> list:
+    # Python scalars with None for missing values, as sqlite3 expects
+    if pd.api.types.is_float_dtype(values.dtype):
+        return values.to_numpy(dtype="float64").tolist()  # SQLite stores NaN as NULL
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iub":
+        return values.to_numpy().tolist()
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        values = values.astype(str)
+    values = values.astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+class ResultStore:
+    """
+    Embedded result database; see the module docstring.
+
+    Args:
+        path (str): SQLite file, created on first use. ':memory:' is not
+            supported because every call opens its own connection (so the
+            store can be shared between Streamlit session threads).
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -------------------- portfolios and runs --------------------
+
+    def add_portfolio(self, name: str, file_type: str, content_hash: str = None, rows: int = None) -> int:
+        """
+        Registers an uploaded portfolio and returns its id; a portfolio with
+        the same file type and content hash is registered only once.
+        """
+        with self._connect() as conn:
+            if content_hash is not None:
+                found = conn.execute("SELECT id FROM portfolios WHERE file_type = ? AND content_hash = ?",
+                                     (file_type, content_hash)).fetchone()
+                if found:
+                    return found[0]
+            cursor = conn.execute(
+                "INSERT INTO portfolios (name, file_type, content_hash, rows, created_at) VALUES (?, ?, ?, ?, ?)",
+                (name, file_type, content_hash, rows, time.time()),
+            )
+            return cursor.lastrowid
+
+    def portfolios(self) -> pd.DataFrame:
+        """
+        Lists the stored portfolios, newest first.
+        """
+        return self._query("SELECT * FROM portfolios ORDER BY id DESC")
+
+    def save_run(self, analysis: str, results: pd.DataFrame, portfolio_id: int = None, parameters: dict = None,
+                 seconds: float = None, chunk_rows: int = INSERT_CHUNK_ROWS) -> int:
+        """
+        Stores a batch of per-asset results as a new run.
+
+        Rows are inserted in chunks of chunk_rows within one transaction.
+        Columns not seen before in this analysis' table are added to it.
+
+        Args:
+            analysis (str): Analysis name, e.g. 'crrem', 'roi' or 'assets'.
+            results (DataFrame): One row per asset.
+            portfolio_id (int): Portfolio the run was computed from, if any.
+            parameters (dict): Run options, stored as JSON.
+            seconds (float): Computation time, for the run listing.
+
+        Returns:
+            int: The run id.
+        """
+        table = _table_name(analysis)
+        keys = {key: next((col for col in aliases if col in results.columns), None)
+                for key, aliases in KEY_COLUMNS.items()}
+        data = results.drop(columns=[col for col in KEY_COLUMNS if col in results.columns])
+        errors = int(results["error"].notna().sum()) if "error" in results.columns else None
+
+        with self._connect() as conn:
+            # Take the write lock before reading the schema, so concurrent writers do not race on it
+            conn.execute("BEGIN IMMEDIATE")
+            self._ensure_table(conn, table, data)
+            cursor = conn.execute(
+                "INSERT INTO runs (portfolio_id, analysis, parameters, rows, errors, seconds, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (portfolio_id, analysis, json.dumps(parameters or {}, default=str), len(results), errors,
+                 seconds, time.time()),
+            )
+            run_id = cursor.lastrowid
+
+            columns = ["run_id", "row_num", *KEY_COLUMNS, *data.columns]
+            insert = (f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))}) "
+                      f"VALUES ({', '.join('?' * len(columns))})")
+            for start in range(0, len(results), chunk_rows):
+                chunk = results.iloc[start:start + chunk_rows]
+                values = [[run_id] * len(chunk), list(range(start, start + len(chunk)))]
+                values += [_column_values(chunk[col]) if col else [None] * len(chunk) for col in keys.values()]
+                values += [_column_values(chunk[col]) for col in data.columns]
+                conn.executemany(insert, zip(*values))
+        return run_id
+
+    def _ensure_table(self, conn, table: str, data: pd.DataFrame):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+        if not existing:
+            columns = ["run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE", "row_num INTEGER NOT NULL",
+                       *(f"{key} TEXT" for key in KEY_COLUMNS),
+                       *(f"{_quote(col)} {_sql_type(data[col].dtype)}" for col in data.columns)]
+            conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(columns)})")
+            conn.execute(f"CREATE INDEX {_quote(table + '_run')} ON {_quote(table)} (run_id, row_num)")
+            for key in KEY_COLUMNS:
+                conn.execute(f"CREATE INDEX {_quote(f'{table}_{key}')} ON {_quote(table)} (run_id, {key})")
+            return
+        for col in data.columns:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(col)} {_sql_type(data[col].dtype)}")
+
+    def runs(self, analysis: str = None, portfolio_id: int = None) -> pd.DataFrame:
+        """
+        Lists runs, newest first, optionally for one analysis or portfolio.
+        """
+        clauses, params = [], []
+        if analysis is not None:
+            clauses.append("analysis = ?")
+            params.append(analysis)
+        if portfolio_id is not None:
+            clauses.append("portfolio_id = ?")
+            params.append(portfolio_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT * FROM runs{where} ORDER BY id DESC", params)
+
+    def latest_run(self, portfolio_id: int, analysis: str):
+        """
+        Returns the newest run of an analysis on a portfolio as a dict, or None.
+        """
+        runs = self._query("SELECT * FROM runs WHERE portfolio_id = ? AND analysis = ? ORDER BY id DESC LIMIT 1",
+                           [portfolio_id, analysis])
+        return runs.iloc[0].to_dict() if len(runs) else None
+
+    def delete_run(self, run_id: int):
+        """
+        Deletes a run and its results.
+        """
+        with self._connect() as conn:
+            analysis = conn.execute("SELECT analysis FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if analysis is None:
+                return
+            conn.execute(f"DELETE FROM {_quote(_table_name(analysis[0]))} WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    # -------------------- queries --------------------
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        with self._connect() as conn:
+            cursor = conn.execute(sql, list(params))
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+
+    def _run_table(self, run_id: int) -> tuple:
+        # Returns (table, columns) of the run's results table
+        with self._connect() as conn:
+            analysis = conn.execute("SELECT analysis FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if analysis is None:
+                raise KeyError(f"Unknown run: {run_id}")
+            table = _table_name(analysis[0])
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+        return table, columns
+
+    @staticmethod
+    def _check(columns, names):
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise KeyError(f"Unknown result columns: {', '.join(map(str, unknown))}")
+
+    def _where(self, run_id: int, columns, filters: dict) -> tuple:
+        clauses, params = ["run_id = ?"], [run_id]
+        self._check(columns, filters or {})
+        for col, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f"{_quote(col)} IS NULL")
+            else:
+                clauses.append(f"{_quote(col)} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def count(self, run_id: int, filters: dict = None) -> int:
+        """
+        Counts a run's result rows, optionally filtered ({column: value or list}).
+        """
+        table, columns = self._run_table(run_id)
+        where, params = self._where(run_id, columns, filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {_quote(table)} WHERE {where}", params).fetchone()[0]
+
+    def page(self, run_id: int, offset: int = 0, limit: int = 100, order_by: str = None, descending: bool = False,
+             filters: dict = None, columns: list = None) -> pd.DataFrame:
+        """
+        Returns one page of a run's results.
+
+        Args:
+            run_id (int): Run to read.
+            offset (int): Rows to skip.
+            limit (int): Page size, at most MAX_PAGE_ROWS.
+            order_by (str): Column to sort by; defaults to input row order.
+            descending (bool): Sort order.
+            filters (dict): {column: value or list of values}.
+            columns (list): Columns to return; defaults to all but run_id and row_num.
+
+        Returns:
+            DataFrame: At most `limit` rows.
+        """
+        table, all_columns = self._run_table(run_id)
+        columns = columns or [col for col in all_columns if col not in ("run_id", "row_num")]
+        self._check(all_columns, columns + ([order_by] if order_by else []))
+        where, params = self._where(run_id, all_columns, filters)
+        order = f"{_quote(order_by)} {'DESC' if descending else 'ASC'}, row_num" if order_by else "row_num"
+        sql = (f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table)} WHERE {where} "
+               f"ORDER BY {order} LIMIT ? OFFSET ?")
+        return self._query(sql, params + [min(int(limit), MAX_PAGE_ROWS), int(offset)])
+
+    def top(self, run_id: int, column: str, n: int = 5, filters: dict = None) -> pd.DataFrame:
+        """
+        Returns the n rows with the largest values of a column.
+        """
+        return self.page(run_id, limit=n, order_by=column, descending=True, filters=filters)
+
+    def aggregate(self, run_id: int, metrics: dict, group_by=None, filters: dict = None) -> pd.DataFrame:
+        """
+        Aggregates a run's results in SQL.
+
+        Args:
+            run_id (int): Run to read.
+            metrics (dict): {column: function}, function one of AGGREGATES
+                ('avg', 'sum', 'min', 'max', 'count'). Result columns are
+                named '<function>_<column>'.
+            group_by (str or list): Column(s) to group by; None for one row.
+            filters (dict): {column: value or list of values}.
+
+        Returns:
+            DataFrame: One row per group, with 'rows' holding the group size.
+        """
+        table, columns = self._run_table(run_id)
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        self._check(columns, list(metrics) + group_by)
+        bad = [func for func in metrics.values() if func.lower() not in AGGREGATES]
+        if bad:
+            raise ValueError(f"Unknown aggregate: {', '.join(bad)} (expected one of {', '.join(sorted(AGGREGATES))})")
+        where, params = self._where(run_id, columns, filters)
+        select = [*map(_quote, group_by), "COUNT(*) AS rows",
+                  *(f"{func.upper()}({_quote(col)}) AS {_quote(f'{func.lower()}_{col}')}" for col, func in metrics.items())]
+        sql = f"SELECT {', '.join(select)} FROM {_quote(table)} WHERE {where}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(map(_quote, group_by))} ORDER BY {', '.join(map(_quote, group_by))}"
+        return self._query(sql, params)
+
+    def value_counts(self, run_id: int, column: str, filters: dict = None) -> pd.Series:
+        """
+        Counts rows per value of a column, like Series.value_counts().
+        """
+        counts = self.aggregate(run_id, {}, group_by=column, filters=filters).set_index(column)["rows"]
+        return counts[counts.index.notna()].sort_values(ascending=False, kind="stable")
+
+
+def default_store(path: str = None) -> ResultStore:
+    """
+    Returns the process-wide store for a database file (DEFAULT_DB_PATH by default).
+    """
+    path = os.path.abspath(path or DEFAULT_DB_PATH)
+    if path not in _stores:
+        _stores[path] = ResultStore(path)
+    return _stores[path]
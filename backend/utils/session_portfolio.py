@@ -0,0 +1,78 @@
+import uuid
+
+import streamlit as st
+
+from backend.utils.portfolio_store import SESSION_FIELDS, get_portfolio, load_portfolio
+
+LABELS = {"assets": "asset", "utilities": "utilities"}
+
+
+def session_key(file_type: str) -> str:
+    return f"portfolio_{file_type}"
+
+
+def session_id() -> str:
+    """
+    Returns an id for this browser session, scoping the upload lineages kept by portfolio_store.
+    """
+    if "portfolio_session" not in st.session_state:
+        st.session_state["portfolio_session"] = uuid.uuid4().hex
+    return st.session_state["portfolio_session"]
+
+
+def set_active_portfolio(entry: dict):
+    """
+    Makes a loaded upload the one every page of this session works on.
+
+    Only the cache key and the session's own fields (see
+    portfolio_store.SESSION_FIELDS) are kept; the frame stays in the shared cache.
+    """
+    st.session_state[session_key(entry["file_type"])] = {
+        "key": entry["key"], **{field: entry[field] for field in SESSION_FIELDS if field in entry}}
+
+
+def _session_portfolio(file_type: str) -> tuple:
+    # Returns (key, entry merged with this session's fields or None if evicted); key is None if nothing is loaded
+    state = st.session_state.get(session_key(file_type))
+    if not state:
+        return None, None
+    entry = get_portfolio(state["key"])
+    return state["key"], {**entry, **state} if entry is not None else None
+
+
+def loaded_portfolio(file_type: str):
+    """
+    Returns the session's validated upload of a file type without prompting
+    for one, or None if none is loaded (or it was evicted from the cache).
+    """
+    return _session_portfolio(file_type)[1]
+
+
+def active_portfolio(file_type: str = "assets"):
+    """
+    Returns the session's validated upload, falling back to an uploader.
+
+    Pages call this instead of parsing the CSV themselves: the file uploaded
+    on the Upload page is read from the portfolio store, so reruns (e.g. a
+    selectbox change) do not parse or validate it again.
+
+    Returns:
+        dict or None: The portfolio_store entry ('data' holds the validated
+        frame with derived columns), or None if nothing is loaded yet.
+    """
+    key, entry = _session_portfolio(file_type)
+    if entry is not None:
+        st.caption(f"Using **{entry['name']}** ({entry['rows']:,} rows) loaded on the Upload page.")
+        return entry
+
+    if key:
+        st.info("The previously uploaded file was evicted from the cache; please upload it again.")
+    uploaded_file = st.file_uploader(f"Upload validated {LABELS[file_type]} CSV (or use the Upload page)", type=["csv"])
+    if not uploaded_file:
+        return None
+    entry = load_portfolio(uploaded_file, file_type, session=session_id())
+    if entry["status"] != "success":
+        st.error(entry["message"])
+        return None
+    set_active_portfolio(entry)
+    return entry
@@ -0,0 +1,51 @@
+"""
+Benchmark of the process-pool executor on synthetic ROI and CRREM batches.
+
+Times the batch ROI and CRREM stranding calculators on 1, 2, 4 and 8 workers
+(capped at the machine's cores unless --workers is given) and checks that
+every parallel result equals the single-process one.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel --assets 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.api import run_crrem, run_roi
+from benchmarks.synthetic import portfolio_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=1_000_000)
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[n for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)])
+    args = parser.parse_args(argv)
+
+    batch = portfolio_batch(args.assets)
+    batch.insert(0, "asset_id", np.arange(args.assets))
+
+    print(f"{args.assets:,} assets, {os.cpu_count()} cores available")
+    for name, run, options in [
+        ("roi", run_roi, {"horizon_years": args.horizon}),
+        ("crrem", run_crrem, {}),
+    ]:
+        baseline, baseline_time = None, None
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = run(batch, workers=workers, **options)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline, baseline_time = results, elapsed
+            else:
+                pd.testing.assert_frame_equal(results, baseline)
+            print(f"  {name:<6} {workers} workers: {elapsed:6.2f} s  speedup {baseline_time / elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark of the pathway engine on a synthetic CRREM batch.
+
+Run from the repository root:
+    python -m benchmarks.bench_pathways --assets 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.calculators.pathways import load_pathway_grid, stranding_years
+from backend.utils.reference_data import load_reference
+from benchmarks.synthetic import crrem_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    grid = load_pathway_grid()
+    reference = load_reference("crrem_country_reference.csv").drop_duplicates("country_code")
+    batch = crrem_batch(args.assets)
+    regions = batch["country_code"].map(reference.set_index("country_code")["crrem_region"]).to_numpy(dtype=object)
+    asset_classes = batch["asset_class"].to_numpy(dtype=object)
+    intensities = batch["carbon_intensity"].to_numpy()
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        curve_ids = grid.curve_ids(regions, asset_classes)
+        years = stranding_years(grid, curve_ids, intensities)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{args.assets:,} assets x {len(grid.years)} years: best {min(timings) * 1000:.1f} ms, "
+          f"median {np.median(timings) * 1000:.1f} ms; with pathway {np.count_nonzero(curve_ids >= 0):,}, "
+          f"stranded {np.count_nonzero(~np.isnan(years)):,}")
+
+
+if __name__ == "__main__":
+    main()
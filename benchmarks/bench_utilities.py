@@ -0,0 +1,49 @@
+"""
+Benchmark of the utilities time-series pipeline on a synthetic monthly file.
+
+Writes a utilities CSV with --assets assets x --months monthly readings to a
+temporary file, then streams it through utilities_kpis and reports the time
+and the peak resident memory of the run.
+
+Run from the repository root:
+    python -m benchmarks.bench_utilities --assets 84000 --months 120
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from backend.calculators.utilities import utilities_kpis
+from backend.utils.file_validator import DEFAULT_CHUNKSIZE
+from benchmarks.synthetic import assets, write_csv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=84_000)
+    parser.add_argument("--months", type=int, default=120)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    portfolio = assets(args.assets)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "utilities.csv")
+        write_csv(path, "utilities", args.assets * args.months, months=args.months)
+        size = os.path.getsize(path)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        kpis = utilities_kpis(path, portfolio, chunksize=args.chunksize)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    rows = args.assets * args.months
+    print(f"{rows:,} monthly rows ({size / 1e6:,.0f} MB CSV): {elapsed:.1f} s "
+          f"({rows / elapsed / 1e6:.2f} M rows/s), peak RSS {peak / 1024:,.0f} MB "
+          f"(+{(peak - baseline) / 1024:,.0f} MB); "
+          f"mean 12-month energy intensity {kpis['latest']['energy_intensity_12m'].mean():.1f} kWh/m²")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Rerun latency and process memory of a chart page over many reruns.
+
+The page runs under streamlit's AppTest with a synthetic assets portfolio
+in the session, then reruns --reruns times (default 1,000). Each rerun
+selects the next of --assets values in the page's first selectbox, like a
+user clicking through assets. Reported: p50 / p95 / max rerun time;
+resident memory (RSS) before the first rerun, once every asset has been
+shown and at the end; open pyplot figures; and the chart cache stats.
+--uncached clears the chart cache before every rerun, so every rerun draws
+its figure: the cost the cache saves.
+
+Run from the repository root:
+    python -m benchmarks.chart_reruns
+    python -m benchmarks.chart_reruns --uncached --reruns 200
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from backend.utils import charts
+from backend.utils.portfolio_store import SESSION_FIELDS, load_portfolio
+from backend.utils.session_portfolio import session_key
+from benchmarks.synthetic import assets
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_PAGE = "pages/CRREM_Calculator.py"
+
+
+def rss_mb() -> float:
+    """
+    Returns the current resident set size in MB (the peak where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_figures() -> int:
+    # Only counts figures when something imported pyplot
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    return len(pyplot.get_fignums()) if pyplot else 0
+
+
+def measure_reruns(page: str = DEFAULT_PAGE, reruns: int = 1000, n_assets: int = 20, rows: int = 1000,
+                   uncached: bool = False) -> dict:
+    """
+    Reruns a page, cycling its first selectbox over n_assets options.
+
+    Returns:
+        dict: {'seconds' (per rerun), 'rss_start_mb', 'rss_warm_mb' (after
+        the first n_assets reruns), 'rss_end_mb', 'figures', 'cache'}
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "assets.csv")
+        assets(rows).to_csv(path, index=False)
+        entry = load_portfolio(path, "assets")
+    charts.clear_cache()
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+    at.session_state[session_key("assets")] = {"key": entry["key"], **{field: entry[field] for field in SESSION_FIELDS}}
+    at.run()
+    options = at.selectbox[0].options[:n_assets]
+    rss_start = rss_mb()
+    seconds, rss_warm = [], rss_start
+    for i in range(reruns):
+        if uncached:
+            charts.clear_cache()
+        start = time.perf_counter()
+        at.selectbox[0].set_value(options[i % len(options)]).run()
+        seconds.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if i + 1 == len(options):
+            rss_warm = rss_mb()
+    return {
+        "seconds": np.array(seconds),
+        "rss_start_mb": rss_start,
+        "rss_warm_mb": rss_warm,
+        "rss_end_mb": rss_mb(),
+        "figures": open_figures(),
+        "cache": charts.cache_info(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page", default=DEFAULT_PAGE)
+    parser.add_argument("--reruns", type=int, default=1000)
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=1000, help="Portfolio size")
+    parser.add_argument("--uncached", action="store_true", help="Clear the chart cache before every rerun")
+    args = parser.parse_args(argv)
+
+    result = measure_reruns(args.page, args.reruns, args.assets, args.rows, args.uncached)
+    ms = result["seconds"] * 1000
+    print(f"{args.page}: {args.reruns:,} reruns over {args.assets} assets ({'uncached' if args.uncached else 'cached'})")
+    print(f"  rerun  p50 {np.percentile(ms, 50):7.1f} ms  p95 {np.percentile(ms, 95):7.1f} ms  max {ms.max():7.1f} ms")
+    print(f"  RSS    start {result['rss_start_mb']:.0f} MB  after {args.assets} assets {result['rss_warm_mb']:.0f} MB  "
+          f"end {result['rss_end_mb']:.0f} MB  (growth after warm-up {result['rss_end_mb'] - result['rss_warm_mb']:+.1f} MB)")
+    print(f"  open pyplot figures {result['figures']}, chart cache {result['cache']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Import-time budget for the Streamlit pages.
+
+For every page, the page's module-level imports run in a fresh interpreter
+with `-X importtime` after BASELINE_MODULES (streamlit, which the server
+has always loaded, and pandas and numpy, which every data page needs and a
+process loads once), and the cumulative time of the modules the page adds
+on top is reported with the largest contributors. A page fails when it
+exceeds --budget-ms (best of --repeat runs) or when a module that should
+only load when its chart or export is shown (HEAVY_MODULES) is imported at
+startup. Exits non-zero on any failure, so it can gate CI.
+
+Run from the repository root:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 250 --pages pages/Dashboard.py
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_PAGES = ["TA_app.py", *sorted(glob.glob("pages/*.py", root_dir=ROOT)), "backend/calculators/crrem.py"]
+BASELINE_MODULES = ["streamlit", "pandas", "numpy"]
+DEFAULT_BUDGET_MS = 100
+# Loaded on demand by the charts and exports that need them (streamlit itself imports plotly's base package)
+HEAVY_MODULES = ["matplotlib", "plotly.express", "openpyxl", "scipy"]
+
+
+def page_imports(path: str) -> str:
+    """
+    Returns the import statements at the top level of a page's source.
+    """
+    with open(os.path.join(ROOT, path), encoding="utf-8") as handle:
+        tree = ast.parse(handle.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def _import_report(stderr: str) -> list:
+    # -X importtime lines: 'import time: self [us] | cumulative | imported package'
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # top-level import (nested ones are indented)
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return modules
+
+
+def measure_page(path: str) -> dict:
+    """
+    Imports a page's modules once in a fresh interpreter.
+
+    Returns:
+        dict: {'ms' (cumulative import time on top of BASELINE_MODULES),
+        'modules' [(top-level module, ms)], 'heavy' (HEAVY_MODULES the page loads)}
+    """
+    code = "\n".join([
+        *(f"import {name}" for name in BASELINE_MODULES),
+        "import json, sys",
+        "loaded = set(sys.modules)",
+        page_imports(path),
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules and name not in loaded]))",
+    ])
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    modules = _import_report(done.stderr)
+    # Everything imported after the baseline belongs to the page (modules
+    # already loaded by an earlier baseline import are not reported again)
+    names = [name for name, _ in modules]
+    start = max(names.index(name) for name in BASELINE_MODULES if name in names) + 1
+    page_modules = [(name, ms) for name, ms in modules[start:] if name != "json"]
+    return {
+        "ms": sum(ms for _, ms in page_modules),
+        "modules": sorted(page_modules, key=lambda item: item[1], reverse=True),
+        "heavy": json.loads(done.stdout.strip().splitlines()[-1]),
+    }
+
+
+def check_pages(pages, budget_ms: float = DEFAULT_BUDGET_MS, repeat: int = 3) -> list:
+    """
+    Measures every page (best of `repeat`) against the budget.
+
+    Returns:
+        list: One dict per page: 'page', 'ms', 'top' (largest contributors),
+        'heavy' and 'ok'.
+    """
+    results = []
+    for path in pages:
+        runs = [measure_page(path) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["ms"])
+        results.append({
+            "page": path,
+            "ms": best["ms"],
+            "top": best["modules"][:3],
+            "heavy": best["heavy"],
+            "ok": best["ms"] <= budget_ms and not best["heavy"],
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=DEFAULT_PAGES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = check_pages(args.pages, args.budget_ms, args.repeat)
+    for result in results:
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in result["top"])
+        heavy = f"  loads {', '.join(result['heavy'])} at startup" if result["heavy"] else ""
+        print(f"{'ok  ' if result['ok'] else 'FAIL'} {result['page']:<36} {result['ms']:7.0f} ms  ({top}){heavy}")
+    failed = [result["page"] for result in results if not result["ok"]]
+    print(f"{len(results) - len(failed)} of {len(results)} pages within {args.budget_ms:.0f} ms on top of "
+          f"{', '.join(BASELINE_MODULES)}, without {', '.join(HEAVY_MODULES)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
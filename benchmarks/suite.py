@@ -0,0 +1,269 @@
+"""
+Benchmark suite: times and memory-profiles the main calculators across sizes.
+
+Cases (see CASES): CSV validation of an assets file, the CRREM and ROI
+batch calculators, the annual carbon trajectories of a CRREM batch with an
+energy mix and their per-pathway chart bands, EPC inference and the
+dashboard aggregations, each on synthetic inputs from
+benchmarks.synthetic. After a warm-up call (which loads the cached
+reference tables) every case is timed (best of --repeat)
+and measured twice for memory: 'peak_mb' is the tracemalloc peak of one
+extra run (Python and NumPy allocations; deterministic, but Arrow buffers
+are not seen), 'rss_peak_mb' the resident-set peak above the level before
+the call, measured by resetting the kernel's peak-RSS counter (Linux; it
+undercounts memory the allocator reuses from earlier cases).
+Results go to a JSON file named after the current commit, and --compare
+reports changes between two such files.
+
+Run from the repository root:
+    python -m benchmarks.suite --sizes 10 1000 100000 1000000
+    python -m benchmarks.suite --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from backend.api import run_crrem, run_roi
+from backend.calculators.crrem_batch import pathway_bands
+from backend.calculators.epc import infer_epc_bands
+from backend.calculators.pathways import load_pathway_grid
+from backend.calculators.trajectories import carbon_trajectories, load_emission_factor_grid
+from backend.utils.dashboard_data import downsample, group_columns, grouped_kpis, histogram
+from backend.utils.file_validator import validate_csv_stream
+from backend.utils.portfolio_store import add_derived_columns
+from benchmarks.synthetic import crrem_batch, roi_batch, write_csv
+from benchmarks.synthetic import assets as synthetic_assets
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+# --compare flags cases slower or larger than this ratio...
+REGRESSION_RATIO = 1.2
+# ...ignoring timings and peaks too small to compare reliably
+MIN_SECONDS = 0.05
+MIN_MB = 1.0
+
+
+def _validate_csv(n: int, tmp: str):
+    path = write_csv(os.path.join(tmp, f"assets_{n}.csv"), "assets", n)
+    return lambda: validate_csv_stream(path, "assets")
+
+
+def _crrem_batch(n: int, tmp: str):
+    batch = crrem_batch(n)
+    return lambda: run_crrem(batch)
+
+
+def _roi_batch(n: int, tmp: str):
+    batch = roi_batch(n)
+    return lambda: run_roi(batch)
+
+
+def _carbon_trajectories(n: int, tmp: str):
+    batch = crrem_batch(n, energy_mix=True)
+    factors = load_emission_factor_grid(load_pathway_grid().years)
+    return lambda: carbon_trajectories(batch, factors)
+
+
+def _pathway_bands(n: int, tmp: str):
+    batch = crrem_batch(n, energy_mix=True)
+    grid = load_pathway_grid()
+    return lambda: pathway_bands(batch, grid)
+
+
+def _epc_inference(n: int, tmp: str):
+    assets = synthetic_assets(n)
+    return lambda: infer_epc_bands(assets)
+
+
+def _dashboard_aggregation(n: int, tmp: str):
+    assets = synthetic_assets(n)
+
+    def run():
+        df = add_derived_columns(assets.copy(), "assets")
+        for column in group_columns(df).values():
+            grouped_kpis(df, column, {"Carbon Intensity (kgCO2e/m²)": "mean", "Energy Intensity (kWh/m²)": "mean",
+                                      "Floor Area (m²)": "sum"})
+        histogram(df["Carbon Intensity (kgCO2e/m²)"])
+        downsample(df[["Energy Intensity (kWh/m²)", "Carbon Intensity (kgCO2e/m²)"]])
+
+    return run
+
+
+# Case name -> setup(rows, temporary directory) returning the call to measure
+CASES = {
+    "validate_csv": _validate_csv,
+    "crrem_batch": _crrem_batch,
+    "roi_batch": _roi_batch,
+    "carbon_trajectories": _carbon_trajectories,
+    "pathway_bands": _pathway_bands,
+    "epc_inference": _epc_inference,
+    "dashboard_aggregation": _dashboard_aggregation,
+}
+
+
+def _memory_kb(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _reset_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(func) -> dict:
+    """
+    Runs func once and returns {'seconds', 'rss_peak_mb'} (peak resident
+    memory above the level before the call).
+    """
+    gc.collect()
+    if _reset_peak():
+        before = _memory_kb("VmRSS")
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        peak_kb = _memory_kb("VmHWM") - before
+    else:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    return {"seconds": seconds, "rss_peak_mb": max(peak_kb, 0) / 1024}
+
+
+def traced_peak_mb(func) -> float:
+    """
+    Runs func once under tracemalloc and returns its allocation peak in MB.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def environment() -> dict:
+    """
+    Returns the commit and machine details stored with every result file.
+    """
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(__file__)).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(sizes, cases=None, repeat: int = 3, progress=print) -> dict:
+    """
+    Runs every case at every size.
+
+    Returns:
+        dict: {'environment': {...}, 'results': [{'case', 'rows', 'seconds'
+        (best of `repeat`), 'rows_per_second', 'peak_mb' (tracemalloc),
+        'rss_peak_mb' (largest)}]}
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in cases or list(CASES):
+            for rows in sizes:
+                func = CASES[name](rows, tmp)
+                func()  # warm-up: loads and caches the reference tables
+                runs = [measure(func) for _ in range(repeat)]
+                seconds = min(run["seconds"] for run in runs)
+                result = {
+                    "case": name,
+                    "rows": rows,
+                    "seconds": seconds,
+                    "rows_per_second": rows / seconds if seconds > 0 else None,
+                    "peak_mb": traced_peak_mb(func),
+                    "rss_peak_mb": max(run["rss_peak_mb"] for run in runs),
+                }
+                results.append(result)
+                progress(f"{name:<22} {rows:>12,} rows  {seconds:9.4f} s  {result['peak_mb']:9.1f} MB "
+                         f"(RSS +{result['rss_peak_mb']:,.1f} MB)")
+                del func
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = REGRESSION_RATIO) -> pd.DataFrame:
+    """
+    Joins two result files on (case, rows).
+
+    Returns:
+        DataFrame: Seconds and peak MB of both runs, their ratios (current /
+        baseline) and 'regression' where either ratio exceeds threshold
+        (ignoring runs under MIN_SECONDS and peaks under MIN_MB).
+    """
+    key = ["case", "rows"]
+    table = pd.DataFrame(baseline["results"]).merge(pd.DataFrame(current["results"]), on=key,
+                                                     suffixes=("_baseline", "_current"))
+    table["time_ratio"] = table["seconds_current"].clip(lower=MIN_SECONDS) / table["seconds_baseline"].clip(lower=MIN_SECONDS)
+    table["memory_ratio"] = table["peak_mb_current"].clip(lower=MIN_MB) / table["peak_mb_baseline"].clip(lower=MIN_MB)
+    table["regression"] = (table["time_ratio"] > threshold) | (table["memory_ratio"] > threshold)
+    return table[key + ["seconds_baseline", "seconds_current", "time_ratio",
+                        "peak_mb_baseline", "peak_mb_current", "memory_ratio", "regression"]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_RATIO)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            table = compare(json.load(baseline), json.load(current), args.threshold)
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(table.to_string(index=False, float_format=lambda v: f"{v:,.4g}"))
+        return 1 if table["regression"].any() else 0
+
+    report = run_suite(args.sizes, args.cases, args.repeat)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Synthetic portfolios for benchmarks and load tests.
+
+Generates asset, utilities, CRREM and ROI batches (and ROI batches with
+CRREM columns) of any size from the
+countries, asset classes, archetype typologies and fuels in the reference
+data, with plausible distributions (log-normal floor areas, carbon
+intensities by asset class, EPC ratings consistent with the intensity).
+Every generator takes (n, seed, start) so large files can be written in
+blocks with write_csv; the same seed always gives the same rows.
+
+Run from the repository root to write sample files:
+    python -m benchmarks.synthetic --kind assets --rows 1000000 --output assets.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from backend.calculators.epc import load_epc_thresholds
+from backend.utils.reference_data import load_reference
+
+BLOCK_ROWS = 1_000_000
+
+# Median carbon intensity by asset class (kgCO2e/m²); other classes use the overall median
+MEDIAN_INTENSITY = {"Office": 70, "Retail": 90, "Hotel": 110, "Logistics": 50, "Residential": 40}
+DEFAULT_MEDIAN_INTENSITY = 70
+# Average grid factor used to turn carbon into energy (kgCO2e/kWh)
+GRID_FACTOR = 0.3
+
+
+def reference_domains() -> dict:
+    """
+    Returns the value domains the generators draw from: 'countries' (codes),
+    'country_names', 'asset_classes', 'typologies' and 'fuels'.
+    """
+    countries = load_reference("crrem_country_reference.csv")
+    return {
+        "countries": countries["country_code"].astype(object).to_numpy(),
+        "country_names": countries["country_name"].astype(object).to_numpy(),
+        "asset_classes": np.array(sorted(load_epc_thresholds().asset_classes), dtype=object),
+        "typologies": load_reference("Building_Archetypes_CRREM_Compatible.xlsx")["Typology"].dropna().astype(object).unique(),
+        "fuels": load_reference("crrem_conversion_factors.csv")["fuel_type"].dropna().astype(object).unique(),
+    }
+
+
+def _intensities(rng: np.random.Generator, asset_classes: np.ndarray) -> np.ndarray:
+    medians = pd.Series(asset_classes).map(MEDIAN_INTENSITY).fillna(DEFAULT_MEDIAN_INTENSITY).to_numpy(dtype=float)
+    return (medians * rng.lognormal(0, 0.35, len(asset_classes))).round(1)
+
+
+def assets(n: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    Assets file rows (the validator's required columns plus 'country_code',
+    'asset_class' and 'Typology'), named 'Asset <start>'...'Asset <start + n - 1>'.
+    """
+    rng = np.random.default_rng([seed, start])
+    domains = reference_domains()
+    country = rng.integers(0, len(domains["countries"]), n)
+    asset_classes = rng.choice(domains["asset_classes"], n)
+    floor_area = rng.lognormal(np.log(3000), 0.8, n).round(0)
+    intensity = _intensities(rng, asset_classes)
+    # Rated band = band implied by the intensity, sometimes one band off
+    codes = np.asarray(load_epc_thresholds().classify(intensity, domains["countries"][country], asset_classes).codes)
+    codes = np.clip(codes + rng.choice([-1, 0, 0, 0, 1], n), 0, 6)
+    return pd.DataFrame({
+        "Asset Name": np.char.add("Asset ", np.arange(start, start + n).astype(str)),
+        "Location": domains["country_names"][country],
+        "Floor Area (m²)": floor_area,
+        "Carbon Intensity (kgCO2e/m²)": intensity,
+        "EPC Rating": np.array(list("ABCDEFG"))[codes],
+        "Energy Consumption (kWh)": (intensity / GRID_FACTOR * floor_area * rng.uniform(0.8, 1.2, n)).round(0),
+        "country_code": domains["countries"][country],
+        "asset_class": asset_classes,
+        "Typology": rng.choice(domains["typologies"], n),
+    })
+
+
+def utilities(n: int, seed: int = 0, start: int = 0, months: int = 24) -> pd.DataFrame:
+    """
+    Monthly utilities rows: row i is month i % months of asset i // months,
+    so n rows cover n / months assets of 'assets'.
+    """
+    rng = np.random.default_rng([seed, start])
+    index = np.arange(start, start + n)
+    labels = pd.period_range("2023-01", periods=months, freq="M").strftime("%Y-%m").to_numpy()
+    season = 1 + 0.25 * np.cos(2 * np.pi * (index % months % 12) / 12)
+    return pd.DataFrame({
+        "Asset Name": np.char.add("Asset ", (index // months).astype(str)),
+        "Month": labels[index % months],
+        "Energy Consumption (kWh)": (rng.lognormal(np.log(60_000), 0.9, n) * season).round(1),
+        "Water Consumption (m³)": rng.lognormal(np.log(150), 0.7, n).round(2),
+        "Waste (kg)": rng.lognormal(np.log(800), 0.6, n).round(1),
+    })
+
+
+def crrem_batch(n: int, seed: int = 0, start: int = 0, energy_mix: bool = False) -> pd.DataFrame:
+    """
+    CRREM batch rows (asset_class, country_code, carbon_intensity, floor_area, capex).
+
+    With energy_mix, annual kWh per fuel (trajectories.FUEL_COLUMNS) are
+    added, splitting the energy implied by the carbon intensity randomly
+    across the fuels; oil is used by about one asset in five.
+    """
+    rng = np.random.default_rng([seed, start])
+    domains = reference_domains()
+    asset_classes = rng.choice(domains["asset_classes"], n)
+    floor_area = rng.lognormal(np.log(3000), 0.8, n).round(0)
+    batch = pd.DataFrame({
+        "asset_class": asset_classes,
+        "country_code": rng.choice(domains["countries"], n),
+        "carbon_intensity": _intensities(rng, asset_classes),
+        "floor_area": floor_area,
+        "capex": (floor_area * rng.uniform(50, 400, n)).round(0),
+    })
+    if energy_mix:
+        energy = batch["carbon_intensity"].to_numpy() / GRID_FACTOR * floor_area
+        split = rng.dirichlet([4, 3, 1, 1], n)
+        split[:, 3] *= rng.random(n) < 0.2
+        split /= split.sum(axis=1, keepdims=True)
+        for k, column in enumerate(["electricity_kwh", "gas_kwh", "district_heat_kwh", "oil_kwh"]):
+            batch[column] = (energy * split[:, k]).round(0)
+    return batch
+
+
+def roi_batch(n: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    ROI batch rows (capex, kwh_before, kwh_after, country_code, fuel_type, year).
+    """
+    rng = np.random.default_rng([seed, start])
+    domains = reference_domains()
+    kwh_before = rng.lognormal(np.log(500_000), 0.9, n).round(0)
+    return pd.DataFrame({
+        "capex": (kwh_before * rng.uniform(0.2, 1.5, n)).round(0),
+        "kwh_before": kwh_before,
+        "kwh_after": (kwh_before * rng.uniform(0.4, 0.95, n)).round(0),
+        "country_code": rng.choice(domains["countries"], n),
+        "fuel_type": rng.choice(domains["fuels"], n),
+        "year": rng.integers(2024, 2036, n),
+    })
+
+
+def portfolio_batch(n: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    ROI batch rows plus the CRREM batch's asset_class, carbon_intensity and
+    floor_area, for calculators that need both (scenarios, process pool).
+    """
+    crrem = crrem_batch(n, seed, start)
+    return roi_batch(n, seed, start).assign(**{col: crrem[col].to_numpy() for col in
+                                               ["asset_class", "carbon_intensity", "floor_area"]})
+
+
+GENERATORS = {"assets": assets, "utilities": utilities, "crrem": crrem_batch, "roi": roi_batch,
+              "portfolio": portfolio_batch}
+
+
+def generate(kind: str, n: int, seed: int = 0, block: int = BLOCK_ROWS, **options):
+    """
+    Yields n rows of a GENERATORS kind in blocks of at most `block` rows;
+    options (e.g. months, energy_mix) are passed to the generator.
+    """
+    for start in range(0, n, block):
+        yield GENERATORS[kind](min(block, n - start), seed=seed, start=start, **options)
+
+
+def write_csv(path: str, kind: str, n: int, seed: int = 0, block: int = BLOCK_ROWS, **options) -> str:
+    """
+    Writes n generated rows to a CSV file block by block, so memory stays
+    bounded by the block size.
+    """
+    for i, frame in enumerate(generate(kind, n, seed, block, **options)):
+        frame.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--kind", choices=list(GENERATORS), default="assets")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args(argv)
+    write_csv(args.output, args.kind, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} {args.kind} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,55 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import tempfile
-from backend.utils.file_validator import validate_csv
+import numpy as np
+from backend.calculators.pathways import load_pathway_grid, trajectory_stranding_years
+from backend.calculators.trajectories import FUEL_COLUMNS, carbon_trajectories, load_emission_factor_grid
+from backend.utils.charts import array_key, show_chart
+from backend.utils.session_portfolio import active_portfolio
 
 st.set_page_config(layout="wide")
 st.title("📉 CRREM Stranding Plot Per Asset")
 
-uploaded_file = st.file_uploader("Upload validated asset CSV", type=["csv"])
-
-if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    result = validate_csv(tmp_path, "assets")
-
-    if result["status"] == "success":
-        df = result["data"]
-
-        asset_names = df["Asset Name"].unique()
-        selected_asset = st.selectbox("Select an asset to plot", asset_names)
-
-        asset_df = df[df["Asset Name"] == selected_asset].iloc[0]
-
-        # Placeholder: CRREM pathway for this asset type
-        crrem_years = list(range(2020, 2051))
-        crrem_threshold = [100 - (i - 2020) * 1.2 for i in crrem_years]  # Sample decreasing line
-
-        fig, ax = plt.subplots()
+portfolio = active_portfolio("assets")
+
+if portfolio:
+    df = portfolio["data"]
+
+    asset_names = df["Asset Name"].unique()
+    selected_asset = st.selectbox("Select an asset to plot", asset_names)
+
+    asset_df = df[df["Asset Name"] == selected_asset].iloc[0]
+
+    # CRREM pathway for this asset type
+    grid = load_pathway_grid()
+    region, asset_class = st.selectbox("CRREM pathway (region – asset class)", grid.available(),
+                                       format_func=lambda pair: f"{pair[0]} – {pair[1]}")
+    curve_id = grid.curve_ids([region], [asset_class])[0]
+    crrem_years = grid.years
+    crrem_threshold = grid.flat_targets()[curve_id]
+
+    # Intensity trajectory: the asset's kWh by fuel when the portfolio has them, otherwise its
+    # current intensity with the chosen share following the grid's decarbonization
+    electricity_share = st.slider("Grid electricity share of emissions (%)", min_value=0, max_value=100, value=0,
+                                  disabled=any(col in df.columns for col in FUEL_COLUMNS.values()))
+    asset = pd.DataFrame([{
+        "country_code": asset_df.get("country_code", asset_df.get("Location")),
+        "floor_area": asset_df.get("Floor Area (m²)"),
+        "carbon_intensity": asset_df["Carbon Intensity (kgCO2e/m²)"],
+        "electricity_share": electricity_share / 100,
+        **{col: asset_df[col] for col in FUEL_COLUMNS.values() if col in df.columns},
+    }])
+    trajectory = carbon_trajectories(asset, load_emission_factor_grid(crrem_years))["intensity"][0]
+
+    # Estimate stranding year
+    crossing = trajectory_stranding_years(grid, [curve_id], trajectory[None])[0]
+    stranding_year = f"{crrem_years[-1]}+" if np.isnan(crossing) else int(crossing)
+    st.metric("Estimated Stranding Year", stranding_year)
+
+    def draw(fig):
+        ax = fig.subplots()
         ax.plot(crrem_years, crrem_threshold, label="CRREM Target Pathway", color="green")
-        ax.hlines(asset_df["Carbon Intensity (kgCO2e/m²)"], 2020, 2050, colors="red", linestyles="--", label="Current Intensity")
+        ax.plot(crrem_years, trajectory, color="red", linestyle="--", label="Asset Intensity Trajectory")
 
         ax.set_title(f"Stranding Year Estimation for {selected_asset}")
         ax.set_xlabel("Year")
@@ -39,12 +57,5 @@ if uploaded_file:
         ax.legend()
         ax.grid(True)
 
-        # Estimate stranding year
-        stranding_year = next((year for year, target in zip(crrem_years, crrem_threshold)
-                               if asset_df["Carbon Intensity (kgCO2e/m²)"] > target), "2050+")
-        st.metric("Estimated Stranding Year", stranding_year)
-
-        st.pyplot(fig)
-
-    else:
-        st.error(result["message"])
+    # Keyed by the plotted curves, so reruns and revisits of an asset reuse its image
+    show_chart("stranding plot", (str(selected_asset), array_key(crrem_years, crrem_threshold, trajectory)), draw)
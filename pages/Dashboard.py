@@ -1,46 +1,100 @@
-
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import tempfile
-from backend.utils.file_validator import validate_csv
+from backend.utils.dashboard_data import (
+    HISTOGRAM_BINS, MAX_CHART_POINTS, PAGE_SIZE, downsample, group_columns, grouped_kpis, histogram, memoized, page,
+)
+from backend.calculators.utilities import utilities_kpis, with_measured_energy
+from backend.utils.instrumentation import span
+from backend.utils.session_portfolio import active_portfolio, loaded_portfolio
 
 st.title("📊 Portfolio ESG Dashboard")
 
 st.markdown("Upload your validated asset CSV file to view KPIs like carbon intensity, energy use, and stranding year.")
 
-uploaded_file = st.file_uploader("Upload validated asset CSV", type=["csv"])
+portfolio = active_portfolio("assets")
+
+if portfolio:
+    # Validated frame with energy intensity and stranding year already derived.
+    # Only aggregates, one table page and downsampled points are sent to the browser.
+    df = portfolio["data"]
+    key = portfolio["key"]
 
-if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
+    st.success("Data loaded successfully.")
 
-    result = validate_csv(tmp_path, "assets")
+    # With a utilities file loaded, energy intensity comes from its trailing 12 months of readings
+    utilities = loaded_portfolio("utilities")
+    if utilities is not None:
+        with st.spinner("Aggregating utilities data…"):
+            measured = memoized((key, utilities["key"], "utilities"), utilities_kpis, utilities["data"], df)
+            df = memoized((key, utilities["key"], "measured energy"), with_measured_energy, df, measured["latest"])
+        key = (key, utilities["key"])
+        covered = int((df["Energy Intensity Source"] == "utilities").sum())
+        st.caption(f"Energy intensity: rolling 12-month totals from **{utilities['name']}** for {covered:,} of "
+                   f"{len(df):,} assets; the others use their static annual consumption.")
 
-    if result["status"] == "success":
-        df = result["data"]
+    report = portfolio["incremental"]
+    if not report["reset"]:
+        st.caption(f"Re-upload: {report['recomputed']:,} rows recomputed, {report['reused']:,} reused.")
 
-        # Compute additional KPIs if needed
-        df["Energy Intensity (kWh/m²)"] = df.get("Energy Consumption (kWh)", 0) / df["Floor Area (m²)"]
-        df["Stranding Year (est.)"] = df["Carbon Intensity (kgCO2e/m²)"].apply(
-            lambda x: 2025 if x > 80 else (2030 if x > 60 else 2040)
-        )
+    page_number = st.number_input(f"Page ({PAGE_SIZE} assets per page)", min_value=1,
+                                  max_value=max(1, -(-len(df) // PAGE_SIZE)), value=1)
+    rows, pages = page(df, page_number)
+    st.dataframe(rows)
+    st.caption(f"Page {page_number:,} of {pages:,} ({len(df):,} assets)")
 
-        st.success("Data loaded successfully.")
-        st.dataframe(df.head(20))
+    # KPIs are maintained incrementally across re-uploads of the same file
+    summary = portfolio["summary"]
+    kpi1 = summary["means"]["Carbon Intensity (kgCO2e/m²)"]
+    if utilities is not None:
+        kpi2 = memoized((key, "mean", "Energy Intensity (kWh/m²)"), df["Energy Intensity (kWh/m²)"].mean)
+    else:
+        kpi2 = summary["means"]["Energy Intensity (kWh/m²)"]
+    kpi3 = summary["value_counts"]["Stranding Year (est.)"].idxmax()
 
-        kpi1 = df["Carbon Intensity (kgCO2e/m²)"].mean()
-        kpi2 = df["Energy Intensity (kWh/m²)"].mean()
-        kpi3 = df["Stranding Year (est.)"].value_counts().idxmax()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Avg. Carbon Intensity", f"{kpi1:.1f} kgCO2e/m²")
+    col2.metric("Avg. Energy Intensity", f"{kpi2:.1f} kWh/m²")
+    col3.metric("Most Common Stranding Year", f"{kpi3}")
 
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Avg. Carbon Intensity", f"{kpi1:.1f} kgCO2e/m²")
-        col2.metric("Avg. Energy Intensity", f"{kpi2:.1f} kWh/m²")
-        col3.metric("Most Common Stranding Year", f"{kpi3}")
+    # Only needed once a portfolio is loaded
+    import plotly.express as px
 
-        fig = px.histogram(df, x="Stranding Year (est.)", title="Stranding Year Distribution")
+    # Pre-binned: one bar per stranding year instead of one point per asset
+    stranding = summary["value_counts"]["Stranding Year (est.)"].sort_index()
+    with span("render", "stranding distribution"):
+        fig = px.bar(x=stranding.index.astype(str), y=stranding.values, title="Stranding Year Distribution",
+                     labels={"x": "Stranding Year (est.)", "y": "count"})
         st.plotly_chart(fig)
 
-    else:
-        st.error(result["message"])
+    carbon_bins = memoized((key, "histogram", "Carbon Intensity (kgCO2e/m²)"), histogram,
+                           df["Carbon Intensity (kgCO2e/m²)"], HISTOGRAM_BINS)
+    with span("render", "carbon histogram"):
+        fig = px.bar(carbon_bins, x="bin_mid", y="count", title="Carbon Intensity Distribution",
+                     labels={"bin_mid": "Carbon Intensity (kgCO2e/m²)"})
+        fig.update_layout(bargap=0)
+        st.plotly_chart(fig)
+
+    dimensions = group_columns(df)
+    if dimensions:
+        st.subheader("KPIs by Group")
+        label = st.selectbox("Group by", list(dimensions))
+        kpis = memoized((key, "grouped", dimensions[label]), grouped_kpis, df, dimensions[label], {
+            "Carbon Intensity (kgCO2e/m²)": "mean",
+            "Energy Intensity (kWh/m²)": "mean",
+            "Floor Area (m²)": "sum",
+            "Stranding Year (est.)": "median",
+        })
+        st.dataframe(kpis)
+        with span("render", "grouped kpis"):
+            fig = px.bar(kpis, x=dimensions[label], y="Carbon Intensity (kgCO2e/m²)",
+                         title=f"Avg. Carbon Intensity by {label}")
+            st.plotly_chart(fig)
+
+    points = memoized((key, "downsample"), downsample,
+                      df[["Energy Intensity (kWh/m²)", "Carbon Intensity (kgCO2e/m²)"]], MAX_CHART_POINTS)
+    with span("render", "energy vs carbon"):
+        fig = px.scatter(points, x="Energy Intensity (kWh/m²)", y="Carbon Intensity (kgCO2e/m²)",
+                         title="Energy vs Carbon Intensity", opacity=0.5)
+        st.plotly_chart(fig)
+    if len(points) < len(df):
+        st.caption(f"Showing a sample of {len(points):,} of {len(df):,} assets.")
@@ -1,23 +1,137 @@
-
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from backend.calculators.pathways import load_pathway_grid, target_at
+from backend.calculators.roi import DEFAULT_HORIZON_YEARS, compute_roi_batch, roi_cash_flows
+from backend.calculators.scenarios import DEFAULT_PERCENTILES, percentile_bands, simulate_roi, summarize_npv
+from backend.utils.charts import array_key, show_chart
+from backend.utils.downloads import download_buttons
+from backend.utils.job_panel import follow_job
+from backend.utils.jobs import JOB_MIN_ROWS, default_runner
+from backend.utils.parallel import PARALLEL_MIN_ROWS
+from backend.utils.reference_data import load_reference, lookup_index, region_index, tariff_index
+from backend.utils.reference_keys import format_unresolved, unresolved_keys
+from backend.utils.result_store import default_store
 
 # Configure Streamlit page
 st.set_page_config(page_title="💰 ROI & Carbon Payback", layout="wide")
 st.title("💰 Retrofit ROI + Carbon Payback Calculator")
 
-# Load datasets
+
+
+def draw_bands(fig, x, bands, xlabel, ylabel):
+    """
+    Draws a median line with the outer percentile band shaded.
+    """
+    ax = fig.subplots()
+    ax.fill_between(x, bands[0], bands[-1], color="#184999", alpha=0.25,
+                    label=f"P{DEFAULT_PERCENTILES[0]}–P{DEFAULT_PERCENTILES[-1]}")
+    ax.plot(x, bands[len(bands) // 2], color="#184999", label="Median")
+    ax.axhline(0, color="grey", linewidth=0.8)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+
+
+def show_bands(name, x, bands, xlabel, ylabel):
+    """
+    Shows draw_bands as a chart cached by its data.
+    """
+    show_chart(name, array_key(x, bands), lambda fig: draw_bands(fig, x, bands, xlabel, ylabel))
+
+
+def roi_chunk(rows, horizon_years: int, n_scenarios: int):
+    """
+    ROI results of one chunk of a batch with NPV percentiles, and the chunk's
+    discounted cash flows per scenario. Every chunk samples the same
+    scenarios (seed 0), as a single run over the whole batch does.
+    """
+    roi_df = compute_roi_batch(rows, horizon_years=horizon_years)
+    simulation = simulate_roi(rows, n_scenarios=n_scenarios, horizon_years=horizon_years, seed=0)
+    return summarize_npv(roi_df, simulation["npv"]), simulation["discounted_cash_flows"]
+
+
+def combine_roi(parts):
+    """
+    Joins roi_chunk results: the tables in order, the portfolio cash flows summed.
+    """
+    return pd.concat([part[0] for part in parts]), sum(part[1] for part in parts)
+
+
+mode = st.sidebar.radio("Mode", ["Single Asset", "Batch Upload"])
+
+if mode == "Batch Upload":
+    st.subheader("📂 Batch Processing")
+    uploaded_file = st.file_uploader(
+        "Upload CSV with: capex, kwh_before, kwh_after, country_code, fuel_type, year", type=["csv"]
+    )
+    horizon = st.slider("Horizon (years)", 5, 40, DEFAULT_HORIZON_YEARS)
+    n_scenarios = st.slider("Monte Carlo scenarios (0 = off)", 0, 5000, 0, step=250)
+
+    roi_df = None
+    if uploaded_file:
+        batch = pd.read_csv(uploaded_file)
+        unresolved = unresolved_keys(batch)
+        if unresolved:
+            st.warning(format_unresolved(unresolved))
+        if len(batch) >= JOB_MIN_ROWS:
+            # Large batches run as a background job (kept across reruns and
+            # page changes), showing progress and rows as chunks finish
+            if n_scenarios:
+                job_id = default_runner().submit(roi_chunk, batch, name="ROI batch", key=(horizon, n_scenarios),
+                                                 combine=combine_roi, horizon_years=horizon, n_scenarios=n_scenarios)
+            else:
+                job_id = default_runner().submit(compute_roi_batch, batch, name="ROI batch", key=(horizon, 0),
+                                                 workers=None if len(batch) >= PARALLEL_MIN_ROWS else 1,
+                                                 horizon_years=horizon)
+            st.session_state["roi_batch_job"] = (job_id, uploaded_file.name, horizon, n_scenarios)
+        else:
+            st.session_state.pop("roi_batch_job", None)
+            roi_df = compute_roi_batch(batch, horizon_years=horizon)
+            if n_scenarios:
+                simulation = simulate_roi(batch, n_scenarios=n_scenarios, horizon_years=horizon, seed=0)
+                roi_df = summarize_npv(roi_df, simulation["npv"])
+                flows = simulation["discounted_cash_flows"]
+            input_name = uploaded_file.name
+
+    if "roi_batch_job" in st.session_state:
+        job_id, input_name, horizon, n_scenarios = st.session_state["roi_batch_job"]
+        if not uploaded_file:
+            st.caption(f"Last background run: {input_name} ({horizon} years, {n_scenarios:,} scenarios)")
+        result = follow_job(job_id, preview=(lambda result: result[0]) if n_scenarios else None,
+                            state_key="roi_batch_job")
+        if result is not None:
+            roi_df, flows = result if n_scenarios else (result, None)
+
+    if roi_df is not None:
+        st.dataframe(roi_df)
+
+        valid = roi_df[roi_df["error"].isna()]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total NPV", f"€{valid['npv_eur'].sum():,.0f}")
+        col2.metric("Median IRR", f"{valid['irr'].median() * 100:.1f}%" if valid["irr"].notna().any() else "N/A")
+        col3.metric("Assets with errors", f"{len(roi_df) - len(valid):,}")
+
+        if n_scenarios:
+            st.subheader(f"🎲 Portfolio NPV across {n_scenarios:,} scenarios")
+            cumulative = flows.cumsum(axis=1)
+            show_bands("portfolio npv bands", np.arange(horizon + 1), percentile_bands(cumulative),
+                       "Years from retrofit", "Cumulative discounted cash flow (€)")
+
+        download_buttons(roi_df, "roi_results", formats=("csv", "json", "xlsx", "parquet"), label="📥 Download ROI Results")
+        if st.button("💾 Save run to the local results database"):
+            run_id = default_store().save_run("roi", roi_df, parameters={
+                "input": input_name, "horizon_years": horizon, "n_scenarios": n_scenarios,
+            })
+            st.success(f"Saved as run #{run_id}.")
+    st.stop()
+
+# Load datasets for the single-asset form (cached per process, shared across sessions)
 try:
-    retrofit_costs = pd.read_excel("data/Retrofit_Costs_CRREM_Compatible.xlsx")
-    tariffs = pd.read_excel("data/Utility_Tariffs_CRREM_Compatible.xlsx")
-    discount_rates = pd.read_excel("data/Discount_Rates_Risk_Premiums_CRREM_Compatible.xlsx")
-    energy_prices = pd.read_csv("data/Energy_Prices_CRREM_Compatible.csv")
-    emission_factors = pd.read_csv("data/crrem_emission_factors.csv")
-    crrem_pathways = pd.read_csv("data/crrem_pathways.csv")
-    baselines = pd.read_excel("data/Energy_Performance_Baselines_CRREM_Compatible.xlsx")
-    archetypes = pd.read_excel("data/Building_Archetypes_CRREM_Compatible.xlsx")
+    retrofit_costs = load_reference("Retrofit_Costs_CRREM_Compatible.xlsx")
+    tariffs = tariff_index()
+    archetypes = load_reference("Building_Archetypes_CRREM_Compatible.xlsx")
+    country_codes = lookup_index("crrem_country_codes.csv", "Country_Name", "Code")
 except Exception as e:
     st.error(f"❌ Error loading input files: {e}")
     st.stop()
@@ -27,7 +141,7 @@ with st.form("roi_form"):
     st.subheader("🏗️ Asset Details")
 
     col1, col2, col3 = st.columns(3)
-    country = col1.selectbox("Country", sorted(tariffs["Country"].dropna().unique()))
+    country = col1.selectbox("Country", sorted({c for c, _ in tariffs}))
     asset_class = col2.selectbox("Asset Class", sorted(archetypes["Asset_Class"].dropna().unique()))
     vintage = col3.selectbox("Vintage", sorted(archetypes["Vintage"].dropna().unique()))
 
@@ -44,12 +158,13 @@ with st.form("roi_form"):
     technology = col5.selectbox("Technology", retrofit_costs["Technology"].dropna().unique())
 
     col6, col7 = st.columns(2)
-    fuel_type = col6.selectbox("Fuel Type", sorted(tariffs["Fuel Type"].dropna().unique()))
+    fuel_type = col6.selectbox("Fuel Type", sorted(f for c, f in tariffs if c == country))
     floor_area = col7.number_input("Floor Area (m²)", min_value=100, value=1000)
 
     kwh_before = st.number_input("Annual Energy Use Before (kWh)", value=100000)
     kwh_after = st.number_input("Annual Energy Use After (kWh)", value=70000)
     year = st.slider("Start Year", 2024, 2035, 2025)
+    n_scenarios = st.slider("Monte Carlo scenarios (0 = off)", 0, 5000, 1000, step=250)
 
     submitted = st.form_submit_button("🔍 Calculate")
 
@@ -57,31 +172,36 @@ if submitted:
     try:
         # Fetch relevant rows
         capex_row = retrofit_costs.query("`Retrofit Category` == @retrofit_category and Technology == @technology").iloc[0]
-        tariff_row = tariffs.query("Country == @country and `Fuel Type` == @fuel_type").iloc[0]
-        discount_row = discount_rates.query("Country == @country").iloc[0]
-        factor_row = emission_factors.query("country == @country and fuel == @fuel_type").iloc[0]
-        price_row = energy_prices.query("Country == @country and Year == @year").iloc[0]
-
         capex_total = capex_row["Cost per m² (EUR)"] * floor_area
-        discount_rate = discount_row["Discount Rate"]
-        carbon_factor = factor_row["kgCO2/kWh"]
-        price_per_kwh = price_row["Price_EUR_per_kWh"]
-
-        savings_kwh = kwh_before - kwh_after
-        annual_savings_eur = savings_kwh * price_per_kwh
-        emissions_saved = savings_kwh * carbon_factor
-
-        # Financial model
-        cash_flows = np.array([-capex_total] + [annual_savings_eur] * 10)
-        discounted = [cf / (1 + discount_rate) ** i for i, cf in enumerate(cash_flows)]
-        npv = sum(discounted)
-        irr = np.irr(cash_flows)
-        roi = (sum(cash_flows[1:]) - capex_total) / capex_total
-        payback = capex_total / annual_savings_eur if annual_savings_eur > 0 else float("inf")
+
+        # Financial model (same engine as the batch mode, on a one-row batch)
+        asset = pd.DataFrame([{
+            "capex": capex_total,
+            "kwh_before": kwh_before,
+            "kwh_after": kwh_after,
+            "country_code": country_codes.get(country, country),
+            "fuel_type": fuel_type,
+            "year": year,
+        }])
+        result = compute_roi_batch(asset).iloc[0]
+        if pd.notna(result["error"]):
+            raise ValueError(result["error"])
+        flows = roi_cash_flows(asset)
+        savings = flows["cash_flows"][0, 1:]
+        discounted = savings / (1 + flows["rates"][0]) ** np.arange(1, len(savings) + 1)
+        cash_flow_years = flows["years"][0]
+
+        npv = result["npv_eur"]
+        irr = result["irr"]
+        payback = result["payback_years"]
+        emissions_saved = result["carbon_savings_kgco2"]
+        carbon_factor = emissions_saved / result["energy_savings_kwh"] if result["energy_savings_kwh"] else np.nan
 
         # CRREM
-        crrem_row = crrem_pathways.query("region_code == @country and asset_class == @asset_class and year == @year")
-        crrem_target = crrem_row["target_carbon_intensity_kgco2m2"].values[0] if not crrem_row.empty else None
+        grid = load_pathway_grid()
+        region = region_index().get(country_codes.get(country))
+        crrem_target = target_at(grid, grid.curve_ids([region], [asset_class]), year)[0]
+        crrem_target = None if np.isnan(crrem_target) else crrem_target
         actual_intensity = kwh_after / floor_area * carbon_factor
         stranded = crrem_target is not None and actual_intensity > crrem_target
 
@@ -92,8 +212,9 @@ if submitted:
         col2.metric("IRR", f"{irr*100:.1f}%" if not np.isnan(irr) else "N/A")
         col3.metric("Payback Period", f"{payback:.1f} yrs" if payback != float("inf") else "N/A")
 
-        st.markdown(f"💨 **Emissions Reduction**: {emissions_saved:,.0f} kgCO₂/year")
-        if crrem_target:
+        if not np.isnan(emissions_saved):
+            st.markdown(f"💨 **Emissions Reduction**: {emissions_saved:,.0f} kgCO₂/year")
+        if crrem_target and not np.isnan(actual_intensity):
             st.markdown(f"📉 **Post-Retrofit Intensity**: {actual_intensity:.1f} vs CRREM target {crrem_target:.1f} kgCO₂/m²")
             if stranded:
                 st.error("🚨 This asset remains **stranded** under CRREM.")
@@ -101,20 +222,34 @@ if submitted:
                 st.success("✅ Retrofit meets CRREM decarbonization target.")
 
         # Cash flow chart
-        st.subheader("📈 10-Year Cash Flow")
-        fig, ax = plt.subplots()
-        ax.bar(range(year, year + 10), [annual_savings_eur] * 10, color="#184999")
-        ax.set_ylabel("Annual Savings (€)")
-        ax.set_xlabel("Year")
-        st.pyplot(fig)
+        st.subheader(f"📈 {len(savings)}-Year Cash Flow")
+        def draw_cash_flow(fig):
+            ax = fig.subplots()
+            ax.bar(cash_flow_years, savings, color="#184999")
+            ax.set_ylabel("Annual Savings (€)")
+            ax.set_xlabel("Year")
+
+        show_chart("cash flow", array_key(cash_flow_years, savings), draw_cash_flow)
+
+        if n_scenarios:
+            simulation = simulate_roi(asset, n_scenarios=n_scenarios, horizon_years=len(savings), seed=0)
+            low, mid, high = percentile_bands(simulation["npv"][:, 0])
+            st.subheader(f"🎲 NPV across {n_scenarios:,} price, carbon and grid scenarios")
+            col1, col2, col3 = st.columns(3)
+            col1.metric(f"NPV P{DEFAULT_PERCENTILES[0]}", f"€{low:,.0f}")
+            col2.metric("NPV median", f"€{mid:,.0f}")
+            col3.metric(f"NPV P{DEFAULT_PERCENTILES[-1]}", f"€{high:,.0f}")
+            cumulative = simulation["discounted_cash_flows"].cumsum(axis=1)
+            show_bands("asset npv bands", np.arange(len(savings) + 1), percentile_bands(cumulative),
+                       "Years from retrofit", "Cumulative discounted cash flow (€)")
 
         # Export
         st.download_button(
             "📥 Download ROI Table",
             pd.DataFrame({
-                "Year": range(year, year + 10),
-                "Savings (€)": [annual_savings_eur]*10,
-                "Discounted (€)": discounted[1:]
+                "Year": cash_flow_years,
+                "Savings (€)": savings,
+                "Discounted (€)": discounted
             }).to_csv(index=False),
             file_name="roi_cashflow.csv"
         )
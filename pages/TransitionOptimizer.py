@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+from backend.calculators.optimizer import DEFAULT_VALUE_PER_M2, OBJECTIVES, assets_batch, optimize_transition
+from backend.calculators.pathways import load_pathway_grid
+from backend.utils.dashboard_data import PAGE_SIZE, page
+from backend.utils.downloads import download_buttons
+from backend.utils.instrumentation import span
+from backend.utils.session_portfolio import active_portfolio
+
+st.set_page_config(page_title="🗂️ Transition Optimizer", layout="wide")
+st.title("🗂️ Portfolio Transition Optimizer")
+
+st.markdown("Choose retrofit measures and their timing for the whole portfolio under an annual CapEx budget.")
+
+OBJECTIVE_LABELS = {
+    "stranded_years": "Minimize stranded years (CRREM)",
+    "value": "Maximize NPV + valuation uplift",
+}
+
+portfolio = active_portfolio("assets")
+
+if portfolio:
+    grid = load_pathway_grid()
+    with st.form("optimizer_form"):
+        col1, col2 = st.columns(2)
+        objective = col1.radio("Objective", OBJECTIVES, format_func=OBJECTIVE_LABELS.get)
+        budget = col2.number_input("Annual CapEx budget (€)", min_value=0, value=5_000_000, step=500_000)
+        col3, col4, col5 = st.columns(3)
+        start_year = col3.number_input("First year", min_value=int(grid.years[0]), max_value=int(grid.years[-1]), value=2025)
+        end_year = col4.number_input("Last year", min_value=int(grid.years[0]), max_value=int(grid.years[-1]),
+                                     value=int(grid.years[-1]))
+        value_per_m2 = col5.number_input("Asset value if not in the file (€/m²)", min_value=0.0, value=DEFAULT_VALUE_PER_M2)
+        submitted = st.form_submit_button("🧮 Optimize")
+
+    if submitted:
+        batch = assets_batch(portfolio["data"], value_per_m2=value_per_m2)
+        with st.spinner("Optimizing…"):
+            plan = optimize_transition(batch, budget, objective, start_year=start_year, end_year=end_year, grid=grid)
+        st.session_state["transition_optimizer_plan"] = (portfolio["key"], plan)
+
+    # A plan made for another upload is not shown
+    plan_key, plan = st.session_state.get("transition_optimizer_plan", (None, None))
+    if plan and plan_key == portfolio["key"]:
+        totals = plan["objective"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Stranded years", f"{totals['stranded_years_after']:,}",
+                    delta=f"{totals['stranded_years_after'] - totals['stranded_years_before']:,}", delta_color="inverse")
+        col2.metric("CapEx", f"€{totals['capex_eur']:,.0f}")
+        col3.metric("NPV of energy savings", f"€{totals['npv_eur']:,.0f}")
+        col4.metric("Valuation uplift", f"€{totals['valuation_uplift_eur']:,.0f}")
+        st.caption(f"Solved in {plan['seconds']:.2f} s for {len(plan['assets']):,} assets "
+                   f"({len(plan['actions']):,} measures funded).")
+        for file, countries in plan.get("unmatched", {}).items():
+            listed = ", ".join(f"{country!r} ({count:,} assets)" for country, count in countries.items())
+            st.info(f"No country in {file} for {listed}; planned with its defaults.")
+
+        import plotly.express as px
+
+        with span("render", "capex per year"):
+            fig = px.bar(x=plan["spend"].index, y=plan["spend"].values, title="CapEx per Year",
+                         labels={"x": "Year", "y": "CapEx (€)"})
+            st.plotly_chart(fig)
+
+        st.subheader("Funded Measures")
+        actions = plan["actions"]
+        page_number = st.number_input(f"Page ({PAGE_SIZE} measures per page)", min_value=1,
+                                      max_value=max(1, -(-len(actions) // PAGE_SIZE)), value=1)
+        rows, pages = page(actions, page_number)
+        st.dataframe(rows)
+        download_buttons(actions, "transition_portfolio_plan", formats=("csv", "xlsx", "parquet"), label="📥 Download Plan")
+
+        failed = plan["assets"]["error"].notna()
+        if failed.any():
+            st.warning(f"{failed.sum():,} assets could not be planned.")
+            st.dataframe(pd.DataFrame(plan["assets"].loc[failed, ["asset", "error"]]))
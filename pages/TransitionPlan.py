@@ -1,17 +1,21 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+from backend.calculators.epc import load_epc_thresholds
+from backend.calculators.pathways import load_pathway_grid
+from backend.calculators.scenarios import DEFAULT_PERCENTILES, simulate_stranding
+from backend.calculators.transition import compute_transition_batch
+from backend.utils.charts import array_key, show_chart
+from backend.utils.reference_data import load_reference
 
 st.set_page_config(page_title="📆 Transition Plan Tool", layout="wide")
 st.title("📆 ESG Transition Plan (with EPC Inference)")
 
-# Load datasets
+# Load datasets (cached per process, shared across sessions)
 try:
-    archetypes = pd.read_excel("data/Building_Archetypes_CRREM_Compatible.xlsx")
-    retrofit_costs = pd.read_excel("data/Retrofit_Costs_CRREM_Compatible.xlsx")
-    esg_uplift = pd.read_excel("data/ESG_Valuation_Impacts_CRREM_TEMPLATE.xlsx")
-    crrem_pathways = pd.read_csv("data/crrem_pathways.csv")
-    epc_baselines = pd.read_excel("data/Energy_Performance_Baselines_CRREM_ALL_COUNTRIES.xlsx")
+    archetypes = load_reference("Building_Archetypes_CRREM_Compatible.xlsx")
+    retrofit_costs = load_reference("Retrofit_Costs_CRREM_Compatible.xlsx")
 except Exception as e:
     st.error(f"❌ Data load error: {e}")
     st.stop()
@@ -55,57 +59,37 @@ if submitted:
         # Auto-infer EPC from intensity if selected
         if auto_epc:
             try:
-                baseline_match = epc_baselines[
-                    (epc_baselines["country_code"] == country) &
-                    (epc_baselines["asset_class"] == asset_class)
-                ]
-            if baseline_match.empty:
-                raise ValueError('EPC baseline lookup failed')
-            baseline_row = baseline_match.iloc[0]
-                current_epc = None
-                for epc_band in ["A", "B", "C", "D", "E", "F", "G"]:
-                    if current_intensity <= baseline_row[f"{epc_band}_max"]:
-                        current_epc = epc_band
-                        break
-                if current_epc:
-                    st.info(f"📡 Auto-inferred Current EPC: **{current_epc}**")
-                else:
-                    st.warning("Could not infer EPC from intensity.")
-                    current_epc = manual_epc
+                thresholds = load_epc_thresholds()
+                current_epc = thresholds.classify([current_intensity], [country], [asset_class])[0]
+                if pd.isna(current_epc):
+                    raise ValueError("no carbon intensity given")
+                st.info(f"📡 Auto-inferred Current EPC: **{current_epc}**")
+                if not thresholds.table_ids([country], [asset_class])[1][0]:
+                    st.caption(f"No EPC baseline for {country} / {asset_class}; the averaged fallback thresholds were used.")
             except Exception as e:
                 st.warning(f"⚠️ Inference failed: {e}")
                 current_epc = manual_epc
         else:
             current_epc = manual_epc
 
-        # Compute uplift
-        uplift_match = esg_uplift[
-            (esg_uplift["Country"] == country) &
-            (esg_uplift["From EPC"] == current_epc) &
-            (esg_uplift["To EPC"] == target_epc)
-        ]
-            if baseline_match.empty:
-                raise ValueError('EPC baseline lookup failed')
-            baseline_row = baseline_match.iloc[0]
-        uplift_pct = uplift_row["Valuation Uplift (%)"]
-        uplift_value = asset_value * uplift_pct / 100
-
-        # Estimate savings
-        carbon_saving = floor_area * 8  # kgCO2/m² assumption
-        post_intensity = current_intensity - (carbon_saving / floor_area)
-
-        # CRREM compliance
-        crrem_row = crrem_pathways[
-            (crrem_pathways["region_code"] == country) &
-            (crrem_pathways["asset_class"] == asset_class) &
-            (crrem_pathways["year"] == retrofit_year)
-        ]
-        if crrem_row.empty:
-            target_intensity = None
-            stranded = None
-        else:
-            target_intensity = crrem_row["target_carbon_intensity_kgco2m2"].values[0]
-            stranded = post_intensity > target_intensity
+        # Uplift, savings and CRREM compliance (same engine as the headless batch runner)
+        plan = compute_transition_batch(pd.DataFrame([{
+            "country_code": country,
+            "asset_class": asset_class,
+            "floor_area": floor_area,
+            "carbon_intensity": current_intensity,
+            "asset_value": asset_value,
+            "current_epc": current_epc,
+            "target_epc": target_epc,
+            "retrofit_year": retrofit_year,
+        }])).iloc[0]
+        if pd.notna(plan["error"]):
+            raise ValueError(plan["error"])
+        uplift_value = plan["valuation_uplift_eur"]
+        carbon_saving = plan["carbon_saving_kg"]
+        post_intensity = plan["post_intensity"]
+        target_intensity = None if np.isnan(plan["crrem_target"]) else plan["crrem_target"]
+        stranded = plan["stranded"]
 
         # Display results
         st.subheader("📊 Results")
@@ -121,6 +105,41 @@ if submitted:
             else:
                 st.success("✅ Compliant with CRREM pathway.")
 
+        # Intensity outlook under sampled grid decarbonization paths
+        grid = load_pathway_grid()
+        simulation = simulate_stranding(pd.DataFrame([{
+            "country_code": country,
+            "asset_class": asset_class,
+            "carbon_intensity": current_intensity,
+            "retrofit_year": retrofit_year,
+            "post_intensity": post_intensity,
+        }]), n_scenarios=1000, seed=0, grid=grid, percentiles=DEFAULT_PERCENTILES)
+        bands = simulation["intensity_bands"][:, 0]
+        stranding = simulation["stranding_year"][:, 0]
+
+        st.subheader("🎲 Intensity Outlook across 1,000 Grid Scenarios")
+        col1, col2 = st.columns(2)
+        col1.metric("Probability of Stranding", f"{np.mean(~np.isnan(stranding)):.0%}")
+        col2.metric("Median Stranding Year", f"{np.nanmedian(stranding):.0f}" if np.mean(~np.isnan(stranding)) >= 0.5
+                    else f"{grid.years[-1]}+")
+
+        curve_id = grid.asset_curve_ids([country], [asset_class])[0]
+        target = grid.flat_targets()[curve_id] if curve_id >= 0 else None
+
+        def draw_outlook(fig):
+            ax = fig.subplots()
+            ax.fill_between(grid.years, bands[0], bands[-1], color="#184999", alpha=0.25,
+                            label=f"P{DEFAULT_PERCENTILES[0]}–P{DEFAULT_PERCENTILES[-1]}")
+            ax.plot(grid.years, bands[len(bands) // 2], color="#184999", label="Median intensity")
+            if target is not None:
+                ax.plot(grid.years, target, color="green", label="CRREM Target Pathway")
+            ax.set_xlabel("Year")
+            ax.set_ylabel("kgCO₂/m²")
+            ax.legend()
+
+        show_chart("intensity outlook", array_key(grid.years, bands, *([] if target is None else [target])),
+                   draw_outlook)
+
         # Downloadable results
         result_df = pd.DataFrame([{
             "Country": country,
@@ -1,8 +1,8 @@
-
 import streamlit as st
 import pandas as pd
-import tempfile
-from backend.utils.file_validator import validate_csv
+from backend.utils.file_validator import memory_report
+from backend.utils.portfolio_store import load_portfolio, persist_portfolio
+from backend.utils.session_portfolio import session_id, set_active_portfolio
 
 st.title("📂 Upload ESG Data")
 
@@ -12,14 +12,40 @@ file_type = st.selectbox("Select file type to upload", ["assets", "utilities"])
 uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
 
 if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
+    progress_bar = st.progress(0.0, text="Validating…")
+
+    def show_progress(fraction, rows):
+        progress_bar.progress(fraction or 0.0, text=f"Validated {rows:,} rows")
 
-    result = validate_csv(tmp_path, file_type)
+    # Parsed once per file content; later reruns and other pages read the cached frame
+    result = load_portfolio(uploaded_file, file_type, progress=show_progress, session=session_id())
+    progress_bar.empty()
 
     if result["status"] == "success":
-        st.success(result["message"])
+        set_active_portfolio(result)
+        if st.button("💾 Save upload to the local results database"):
+            with st.spinner("Saving to the local results database…"):
+                run_id = persist_portfolio(result)
+            st.success(f"Saved as run #{run_id}.")
+        if result["row_errors"]:
+            st.warning(result["message"])
+            st.write({"Rows": result["rows"], **{f"Invalid {col}": n for col, n in result["row_errors"].items()}})
+            st.dataframe(pd.DataFrame(result["error_samples"]))
+        else:
+            st.success(result["message"])
+        incremental = result.get("incremental")
+        if incremental and not incremental["reset"]:
+            st.info(f"Compared with the previous upload of {result['name']}: {incremental['recomputed']:,} rows "
+                    f"recomputed, {incremental['reused']:,} reused, {incremental['removed']:,} removed.")
+        if result["missing_values"]:
+            st.info(f"Missing values: {result['missing_values']}")
         st.dataframe(result["data"].head(20))
+
+        report = memory_report(result["data"])
+        with st.expander(f"🧮 Memory: {report['bytes'] / 1e6:,.1f} MB ({report['bytes_per_row']:,.0f} bytes/row)"):
+            st.dataframe(pd.DataFrame({
+                "dtype": result["data"].dtypes.astype(str),
+                "bytes": pd.Series(report["columns"]),
+            }))
     else:
         st.error(result["message"])
@@ -0,0 +1,21 @@
+from backend.utils import charts
+
+
+def test_chart_is_drawn_once_per_key():
+    charts.clear_cache()
+    calls = []
+
+    def draw(fig):
+        calls.append(1)
+        fig.subplots().plot([0, 1], [1, 0])
+
+    first = charts.cached_chart("test", ("asset", 1), draw)
+    assert first.startswith(b"\x89PNG")
+    assert charts.cached_chart("test", ("asset", 1), draw) is first
+    charts.cached_chart("test", ("asset", 2), draw)
+    assert len(calls) == 2
+
+
+def test_array_key_depends_on_values_and_handles_nan():
+    assert charts.array_key([1.0, float("nan")]) == charts.array_key([1.0, float("nan")])
+    assert charts.array_key([1.0, 2.0]) != charts.array_key([1.0, 3.0])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from backend.calculators.crrem_batch import (
+    DEFAULT_CAPEX_PER_M2,
+    DEFAULT_TENANT_RATIO,
+    RETROFIT_LEAD_YEARS,
+    compute_batch_stranding,
+)
+from backend.calculators.pathways import load_pathway_grid
+from backend.utils.columns import numeric_column
+from backend.utils.reference_data import load_reference
+
+
+def _stranding(batch: pd.DataFrame) -> pd.DataFrame:
+    return compute_batch_stranding(batch, load_reference("crrem_country_reference.csv"), load_pathway_grid())
+
+
+def test_numeric_column_flags_unparseable_values_only():
+    values, invalid = numeric_column(pd.DataFrame({"x": ["1.5", None, "abc", 2]}), "x")
+    np.testing.assert_array_equal(values, [1.5, np.nan, np.nan, 2.0])
+    assert invalid.tolist() == [False, False, True, False]
+    values, invalid = numeric_column(pd.DataFrame({"x": [1]}), "missing")
+    assert np.isnan(values).all() and not invalid.any()
+
+
+def test_invalid_rows_get_an_error_and_no_results():
+    out = _stranding(pd.DataFrame({"country_code": "DE", "asset_class": "Office",
+                                   "carbon_intensity": ["55", "high", "55"], "floor_area": [1000, 1000, "n/a"]}))
+    assert out["error"].fillna("").tolist() == ["", "Invalid carbon_intensity", "Invalid capex or floor_area"]
+    assert out["stranding_year"].notna().tolist() == [True, False, False]
+    assert out["tenant_share"].iloc[0] == 1000 * DEFAULT_CAPEX_PER_M2 * DEFAULT_TENANT_RATIO
+
+
+def test_country_spellings_give_the_same_result_and_unknown_ones_an_error():
+    out = _stranding(pd.DataFrame({"country_code": ["DE", "DEU", "Germany", "Atlantis"],
+                                   "asset_class": "Office", "carbon_intensity": 60.0, "floor_area": 500.0}))
+    assert out["stranding_year"].iloc[:3].nunique() == 1
+    assert out["error"].fillna("").tolist() == ["", "", "", "Unknown country_code"]
+    assert np.isnan(out["stranding_year"].iloc[3])
+
+
+def test_retrofit_year_is_not_before_the_first_pathway_year():
+    out = _stranding(pd.DataFrame({"country_code": "DE", "asset_class": "Office",
+                                   "carbon_intensity": [55.0, 100.0], "floor_area": 500.0}))
+    first_year = load_pathway_grid().years[0]
+    assert out["stranding_year"].iloc[0] - RETROFIT_LEAD_YEARS > first_year
+    assert out["recommended_retrofit_year"].iloc[0] == out["stranding_year"].iloc[0] - RETROFIT_LEAD_YEARS
+    # Stranded from the start: retrofit now rather than RETROFIT_LEAD_YEARS before the pathways begin
+    assert out["stranding_year"].iloc[1] == first_year
+    assert out["recommended_retrofit_year"].iloc[1] == first_year
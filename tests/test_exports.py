@@ -0,0 +1,15 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.exports import CHUNK_ROWS, export_bytes
+
+
+def test_ndjson_export_has_one_record_per_line_across_chunks():
+    rows = 2 * CHUNK_ROWS + 20_000
+    df = pd.DataFrame({"asset": np.arange(rows), "error": np.where(np.arange(rows) % 7, None, "Invalid floor_area")})
+    lines = export_bytes(df, "ndjson").decode().splitlines()
+    assert len(lines) == rows
+    records = [json.loads(line) for line in lines]
+    assert [record["asset"] for record in records] == list(range(rows))
@@ -0,0 +1,49 @@
+import io
+
+from pandas.api.types import CategoricalDtype
+
+from backend.utils.file_validator import validate_csv_stream
+
+ASSETS_HEADER = "Asset Name,Location,Floor Area (m²),Carbon Intensity (kgCO2e/m²),EPC Rating\n"
+UTILITIES_HEADER = "Asset Name,Month,Energy Consumption (kWh),Water Consumption (m³),Waste (kg)\n"
+
+
+def _validate(text: str, file_type: str, chunksize: int = 2) -> dict:
+    return validate_csv_stream(io.BytesIO(text.encode()), file_type, chunksize=chunksize)
+
+
+def test_chunks_with_empty_categorical_column_are_merged():
+    result = _validate(ASSETS_HEADER + "A,DE,100,50,C\nB,DE,100,50,C\nC,,100,50,C\nD,,100,50,C\n", "assets")
+    assert result["status"] == "success"
+    assert isinstance(result["data"]["Location"].dtype, CategoricalDtype)
+    assert result["data"]["Location"].tolist()[:2] == ["DE", "DE"]
+    assert result["data"]["Location"].isna().sum() == 2
+
+
+def test_chunks_with_numeric_and_text_labels_are_merged():
+    result = _validate(UTILITIES_HEADER + "1001,2024-01,1,1,1\n1002,2024-02,1,1,1\nB-7,2024-01,1,1,1\n",
+                       "utilities")
+    assert result["status"] == "success"
+    assert result["data"]["Asset Name"].tolist() == ["1001", "1002", "B-7"]
+
+
+def test_empty_labels_stay_missing():
+    result = _validate(UTILITIES_HEADER + "A,2024-01,1,1,1\n,2024-02,1,1,1\n,,1,1,1\n", "utilities")
+    assert result["status"] == "success"
+    names = result["data"]["Asset Name"]
+    assert names.isna().tolist() == [False, True, True]
+    assert "nan" not in names.cat.categories
+    assert result["data"]["Month"].isna().sum() == 1
+
+
+def test_failure_after_parsing_is_reported_as_error():
+    result = validate_csv_stream(io.BytesIO((ASSETS_HEADER + "A,DE,100,50,C\n").encode()), "assets",
+                                 progress=lambda fraction, rows: 1 / 0)
+    assert result["status"] == "error"
+    assert result["data"] is None
+
+
+def test_missing_columns_are_rejected():
+    result = _validate("Asset Name,Location\nA,DE\n", "assets")
+    assert result["status"] == "error"
+    assert "Floor Area" in result["message"]
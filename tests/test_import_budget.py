@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.import_budget import DEFAULT_PAGES, check_pages
+
+
+@pytest.mark.parametrize("page", DEFAULT_PAGES)
+def test_page_imports_within_budget(page):
+    result = check_pages([page])[0]
+    assert result["ok"], f"{page}: {result['ms']:.0f} ms, heavy modules {result['heavy']}, top {result['top']}"
@@ -0,0 +1,51 @@
+import threading
+
+import pandas as pd
+
+from backend.utils.jobs import JobRunner
+
+
+def _double(chunk: pd.DataFrame, factor: int = 2) -> pd.DataFrame:
+    return chunk * factor
+
+
+def _wait(runner: JobRunner, job_id: str):
+    job = runner.get(job_id)
+    while job.active:
+        threading.Event().wait(0.01)
+    return job
+
+
+def test_job_combines_chunks_in_order_and_is_reused_on_resubmit():
+    runner = JobRunner(threads=1)
+    df = pd.DataFrame({"x": range(10)})
+    job_id = runner.submit(_double, df, chunk_rows=3, factor=3)
+    job = _wait(runner, job_id)
+    assert job.status == "done"
+    pd.testing.assert_frame_equal(job.result(), df * 3)
+    assert job.info()["chunks_done"] == 4
+    assert runner.submit(_double, df, chunk_rows=3, factor=3) == job_id
+    assert runner.submit(_double, df, chunk_rows=3, factor=4) != job_id
+    runner.shutdown()
+
+
+def test_cancelled_job_stops_at_a_chunk_boundary_and_can_restart():
+    release = threading.Event()
+
+    def blocked(chunk):
+        release.wait(5)
+        return chunk
+
+    runner = JobRunner(threads=1)
+    df = pd.DataFrame({"x": range(10)})
+    job_id = runner.submit(blocked, df, chunk_rows=2)
+    runner.cancel(job_id)
+    release.set()
+    job = _wait(runner, job_id)
+    assert job.status == "cancelled"
+    assert job.result() is None and job.info()["chunks_done"] < job.chunks
+    # Resubmitting returns the cancelled job; restart runs it again
+    assert runner.submit(blocked, df, chunk_rows=2) == job_id
+    restarted = _wait(runner, runner.restart(job_id))
+    pd.testing.assert_frame_equal(restarted.result(), df)
+    runner.shutdown()
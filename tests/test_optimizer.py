@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from backend.calculators.optimizer import COST_ESCALATION, VALUATION_IMPACTS, _escalation, _valuation_rates, \
+    optimize_transition
+
+
+def test_escalation_matches_table_spellings():
+    # The table spells these 'UK' and 'Czech Republic'
+    escalation, missing = _escalation(pd.Series(["UK", "CZ", "DE"], dtype=object), np.arange(2030, 2033))
+    assert not missing.any()
+    assert (escalation > 1.0).all()
+
+
+def test_valuation_rates_match_table_spellings():
+    # The table spells these 'United Kingdom', 'Czechia' and 'United States'
+    green, brown, missing = _valuation_rates(pd.Series(["UK", "CZ", "USA"], dtype=object),
+                                             pd.Series(["Office", "Apartments", "Office"], dtype=object))
+    assert not missing.any()
+    assert (green > 0).all() and (brown > 0).all()
+
+
+def test_plan_reports_unknown_and_unmatched_countries():
+    batch = pd.DataFrame({
+        "country_code": ["GB", "CZ", "CH", "Atlantis"],
+        "asset_class": "Office",
+        "floor_area": 1000.0,
+        "carbon_intensity": 80.0,
+        "asset_value": 3_000_000.0,
+    })
+    plan = optimize_transition(batch, 1_000_000, "value", start_year=2030, end_year=2032)
+    assert plan["assets"]["error"].fillna("").tolist() == ["", "", "", "Unknown country_code"]
+    assert plan["unmatched"] == {COST_ESCALATION: {"CH": 1}, VALUATION_IMPACTS: {"CH": 1}}
+
+
+def test_actions_name_assets_like_the_asset_results():
+    batch = pd.DataFrame({
+        "asset": ["Tower A", "Tower B"],
+        "country_code": "DE",
+        "asset_class": "Office",
+        "floor_area": 1000.0,
+        "carbon_intensity": 120.0,
+        "asset_value": 3_000_000.0,
+    }, index=[10, 11])
+    plan = optimize_transition(batch, 10_000_000, "stranded_years", start_year=2030, end_year=2032)
+    assert len(plan["actions"])
+    assert set(plan["actions"]["asset"]) <= set(plan["assets"]["asset"])
@@ -0,0 +1,40 @@
+import io
+
+from backend.utils import portfolio_store
+from backend.utils.portfolio_store import load_portfolio
+
+HEADER = "Asset Name,Location,Floor Area (m²),Carbon Intensity (kgCO2e/m²),EPC Rating\n"
+
+
+def _upload(rows: list, session: str, name: str = "assets.csv") -> dict:
+    buffer = io.BytesIO((HEADER + "".join(f"{row},DE,1000,{intensity},C\n" for row, intensity in rows)).encode())
+    buffer.name = name
+    return load_portfolio(buffer, "assets", session=session)
+
+
+def test_lineages_are_scoped_by_session():
+    portfolio_store.clear_cache()
+    first = [(f"A{i}", 40 + i) for i in range(10)]
+    _upload(first, "session-a")
+    # Same file name, unrelated content, in another session
+    _upload([(f"B{i}", 90 + i) for i in range(10)], "session-b")
+
+    edited = _upload(first[:-1] + [("A9", 99)], "session-a")
+    assert edited["incremental"]["reused"] == 9
+    assert edited["incremental"]["recomputed"] == 1
+    assert edited["summary"]["rows"] == 10
+
+
+def test_same_file_in_two_sessions_gets_its_own_name_and_lineage():
+    portfolio_store.clear_cache()
+    rows = [(f"A{i}", 40 + i) for i in range(10)]
+    first = _upload(rows, "session-a")
+    second = _upload(rows, "session-b", name="copy.csv")
+    assert portfolio_store.cache_info()["hits"] == 1
+    assert second["data"] is first["data"]
+    assert (first["name"], second["name"]) == ("assets.csv", "copy.csv")
+
+    # Session b's lineage started from its own load, so an edit there reuses the other rows
+    edited = _upload(rows[:-1] + [("A9", 99)], "session-b", name="copy.csv")
+    assert edited["incremental"]["reused"] == 9
+    assert first["incremental"]["reset"] and first["incremental"]["recomputed"] == 10
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from backend.utils.reference_keys import (
+    asset_class_keys,
+    canonical_countries,
+    country_keys,
+    country_names,
+    country_positions,
+    fuel_keys,
+)
+
+
+def test_country_spellings_resolve_to_one_key():
+    resolved = country_keys().resolve(["UK", "GB", "GBR", "United Kingdom", " united-kingdom ", "Czechia", "CZE"])
+    assert resolved.tolist() == ["UK"] * 5 + ["CZ", "CZ"]
+    assert country_keys().resolve(["GB"], to="name").tolist() == ["United Kingdom"]
+
+
+def test_unresolved_values_are_reported_and_missing_ones_are_not():
+    values = pd.Series(["DE", "Atlantis", None, "Atlantis", "Mordor"], dtype=object)
+    assert country_keys().unresolved(values) == {"Atlantis": 2, "Mordor": 1}
+    assert country_keys().resolve(values).isna().tolist() == [False, True, True, True, True]
+
+
+def test_fuel_and_asset_class_aliases():
+    assert fuel_keys().resolve(["natural_gas", "Electricity", "DH"]).tolist() == \
+        ["Natural Gas", "Electricity", "District Heating"]
+    assert asset_class_keys().resolve(["Apartments", "offices"]).tolist() == ["Residential", "Office"]
+
+
+def test_rekey_matches_tables_spelled_differently():
+    table = pd.Series([1.0, 2.0, 3.0], index=pd.MultiIndex.from_tuples(
+        [("United Kingdom", "Office"), ("Czech Republic", "Office"), ("UK", "Office")]))
+    rekeyed = country_keys().rekey(table)
+    assert rekeyed.to_dict() == {("UK", "Office"): 1.0, ("CZ", "Office"): 2.0}
+
+
+def test_country_helpers_keep_unknown_values():
+    assert canonical_countries(["GB", "Atlantis"]).tolist() == ["UK", "Atlantis"]
+    assert country_names(["CZE", "Atlantis"]).tolist() == ["Czech Republic", "Atlantis"]
+    countries = pd.Index(["Germany", "United Kingdom", "Czech Republic"])
+    assert country_positions(countries, pd.Series(["DE", "GB", "Czechia", "Atlantis"])).tolist() == [0, 1, 2, -1]
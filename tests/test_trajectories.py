@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from backend.calculators.trajectories import carbon_trajectories, load_emission_factor_grid
+
+YEARS = np.arange(2020, 2051)
+
+
+def test_electricity_share_is_anchored_at_the_reporting_year_argument():
+    batch = pd.DataFrame({"country_code": ["DE", "UK"], "carbon_intensity": [80.0, 50.0], "electricity_share": 0.6})
+    result = carbon_trajectories(batch, load_emission_factor_grid(YEARS), reporting_year=2025)
+    reported = result["intensity"][:, 2025 - 2020]
+    np.testing.assert_allclose(reported, [80.0, 50.0])
+    # The grid decarbonizes, so the intensity falls after the reporting year
+    assert (result["intensity"][:, -1] < reported).all()
+
+
+def test_electricity_share_is_anchored_at_the_first_grid_year_by_default():
+    batch = pd.DataFrame({"country_code": ["DE"], "carbon_intensity": [80.0], "electricity_share": 0.6})
+    result = carbon_trajectories(batch, load_emission_factor_grid(YEARS))
+    assert result["intensity"][0, 0] == 80.0
+
+
+def test_electricity_share_is_anchored_at_the_reporting_year_column():
+    batch = pd.DataFrame({"country_code": ["DE", "DE", "FR"], "carbon_intensity": [80.0, 80.0, 30.0],
+                          "electricity_share": [0.5, 0.5, 1.0], "reporting_year": [2022, None, 2030]})
+    result = carbon_trajectories(batch, load_emission_factor_grid(YEARS), reporting_year=2024)
+    intensity = result["intensity"]
+    assert intensity[0, 2022 - 2020] == 80.0
+    assert intensity[1, 2024 - 2020] == 80.0
+    assert intensity[2, 2030 - 2020] == 30.0
+
+
+def test_invalid_reporting_year_is_an_error():
+    batch = pd.DataFrame({"country_code": ["DE"], "carbon_intensity": [80.0], "electricity_share": [0.5],
+                          "reporting_year": ["last year"]})
+    result = carbon_trajectories(batch, load_emission_factor_grid(YEARS))
+    assert result["error"].tolist() == ["Invalid reporting_year"]
+    assert np.isnan(result["intensity"]).all()
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from backend.calculators.transition import compute_transition_batch
+
+
+def _batch(countries, current_epc="D", target_epc="B") -> pd.DataFrame:
+    return pd.DataFrame({
+        "country_code": countries,
+        "asset_class": "Office",
+        "floor_area": 1000.0,
+        "carbon_intensity": 60.0,
+        "asset_value": 1_000_000.0,
+        "current_epc": current_epc,
+        "target_epc": target_epc,
+        "retrofit_year": 2030,
+    })
+
+
+def test_valuation_uplift_matches_any_country_spelling():
+    out = compute_transition_batch(_batch(["UK", "GB", "GBR", "United Kingdom", "US", "USA", "JP", "JPN"]))
+    assert out["error"].isna().all()
+    uplift = out["valuation_uplift_pct"]
+    assert uplift.iloc[:4].nunique() == 1
+    assert uplift.iloc[4] == uplift.iloc[5]
+    assert uplift.iloc[6] == uplift.iloc[7]
+
+
+def test_unknown_country_is_an_error():
+    out = compute_transition_batch(_batch(["DE", "Atlantis"]))
+    assert out["error"].fillna("").tolist() == ["", "Unknown country_code"]
+    assert pd.isna(out["valuation_uplift_pct"].iloc[1])